@@ -88,8 +88,8 @@ class O3_ARM_v7a_FUP(FUPool):
               O3_ARM_v7a_Load(), O3_ARM_v7a_Store(), O3_ARM_v7a_FP()]
 
 
-class O3_ARM_v7a_3(DerivO3CPU):
-    predType = "tournament"
+# Tournament Branch Predictor
+class O3_ARM_v7a_BP(TournamentBP):
     localPredictorSize = 64
     localCtrBits = 2
     localHistoryTableSize = 64
@@ -99,6 +99,11 @@ class O3_ARM_v7a_3(DerivO3CPU):
     globalHistoryBits = 13
     choicePredictorSize = 8192
     choiceCtrBits = 2
+    instShiftAmt = 2
+
+
+class O3_ARM_v7a_3(DerivO3CPU):
+    branchPred = O3_ARM_v7a_BP()
     BTBEntries = 2048
     BTBTagSize = 18
     RASSize = 16
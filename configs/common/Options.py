@@ -148,6 +148,69 @@ def addSEOptions(parser):
     parser.add_option("--errout", default="",
                       help="Redirect stderr to a file.")
 
+def addBranchPredictorOptions(parser):
+    # Predictor options left unset keep the predictor's own defaults;
+    # giving one that the selected predictor does not have is an error.
+    parser.add_option("--pred-type", type="choice", default=None,
+                      choices=["local", "tournament", "gshare", "hybridpg",
+                               "perceptron", "hashed", "tage"],
+                      help="Branch predictor of the inorder and detailed "
+                           "CPUs (default: the CPU's own)")
+    parser.add_option("--shadow-pred-types", type="string", default=None,
+                      help="Comma separated list of predictor types to "
+                           "evaluate alongside --pred-type, without "
+                           "steering fetch; predictor options apply to "
+                           "those that have them")
+    parser.add_option("--bpred-budget", type="string", default=None,
+                      help="Size the branch predictors to the largest "
+                           "configuration that fits this much storage, "
+                           "e.g. 8kB; predictor options fix their "
+                           "parameters")
+    parser.add_option("--btb-entries", type="int",
+                      help="Number of BTB entries")
+    parser.add_option("--btb-assoc", type="int",
+                      help="Associativity of the BTB")
+    parser.add_option("--btb-repl-policy", type="choice",
+                      choices=["LRU", "Random", "PLRU"],
+                      help="Replacement policy of the BTB sets")
+    parser.add_option("--ras-size", type="int",
+                      help="Number of return address stack entries")
+    parser.add_option("--indirect-pred", action="store_true",
+                      help="Predict the targets of indirect branches other "
+                           "than returns with an ITTAGE-like predictor "
+                           "rather than the BTB")
+    parser.add_option("--loop-pred", action="store_true",
+                      help="Override the branch predictor with a loop "
+                           "predictor for branches with a learned trip "
+                           "count")
+    parser.add_option("--local-pred-size", type="int")
+    parser.add_option("--local-ctr-bits", type="int")
+    parser.add_option("--local-hist-table-size", type="int")
+    parser.add_option("--local-hist-bits", type="int")
+    parser.add_option("--global-pred-size", type="int")
+    parser.add_option("--global-ctr-bits", type="int")
+    parser.add_option("--global-hist-size", type="int")
+    parser.add_option("--choice-pred-size", type="int")
+    parser.add_option("--choice-ctr-bits", type="int")
+    parser.add_option("--num-pred-tables", type="int")
+    parser.add_option("--pred-table-entries", type="int")
+    parser.add_option("--branch-profile", type="string", default=None,
+                      help="Write a profile of the most mispredicted "
+                           "branches to this file in the output directory "
+                           "at every stats dump; see "
+                           "util/branch_profile.py")
+    parser.add_option("--branch-profile-size", type="int", default=1024,
+                      help="Number of static branches the profile tracks")
+    parser.add_option("--warm-bpred", action="store_true",
+                      help="Warm the branch predictor at commit while "
+                           "fast-forwarding, with no timing effect, and "
+                           "hand it to the switched-in CPU")
+    parser.add_option("--fork-pred-types", type="string", default=None,
+                      help="Comma separated list of predictor types to "
+                           "simulate after one shared --fast-forward, each "
+                           "in a forked process with its own output "
+                           "directory <outdir>/<type>")
+
 def addFSOptions(parser):
     # Simulation options
     parser.add_option("--timesync", action="store_true",
@@ -27,6 +27,8 @@
 #
 # Authors: Lisa Hsu
 
+import os
+import sys
 from os import getcwd
 from os.path import join as joinpath
 
@@ -34,6 +36,8 @@ import m5
 from m5.defines import buildEnv
 from m5.objects import *
 from m5.util import *
+from m5.util import convert
+from m5.util.bpredstorage import bestConfiguration, formatBreakdown
 from O3_ARM_v7a import *
 
 addToPath('../common')
@@ -53,6 +57,80 @@ def getCPUClass(cpu_type):
     else:
         return AtomicSimpleCPU, 'atomic'
 
+# Branch predictor for each --pred-type, and the predictor param each
+# predictor option sets
+bpredClasses = {
+    "local" : LocalBP,
+    "tournament" : TournamentBP,
+    "gshare" : GshareBP,
+    "hybridpg" : HybridpgBP,
+    "perceptron" : PerceptronBP,
+    "hashed" : HashedPerceptronBP,
+    "tage" : TAGEBP,
+}
+
+bpredOptions = [
+    ("local_pred_size", "localPredictorSize"),
+    ("local_ctr_bits", "localCtrBits"),
+    ("local_hist_table_size", "localHistoryTableSize"),
+    ("local_hist_bits", "localHistoryBits"),
+    ("global_pred_size", "globalPredictorSize"),
+    ("global_ctr_bits", "globalCtrBits"),
+    ("global_hist_size", "globalHistoryBits"),
+    ("choice_pred_size", "choicePredictorSize"),
+    ("choice_ctr_bits", "choiceCtrBits"),
+    ("num_pred_tables", "numTables"),
+    ("pred_table_entries", "tableEntries"),
+]
+
+def getBranchPredictor(options, pred_type=None):
+    """Returns a new branch predictor of the type selected by --pred-type,
+       or of pred_type if given, sized by the other predictor options.
+
+       Options the --pred-type predictor does not have are an error;
+       other predictors just leave them out.  With --bpred-budget, the
+       predictor's table sizes not given by options are picked to fill
+       the budget.
+    """
+
+    if pred_type is None:
+        pred_type = options.pred_type
+        strict = True
+    else:
+        strict = False
+
+    if pred_type not in bpredClasses:
+        fatal("unknown branch predictor type %s" % pred_type)
+
+    cls = bpredClasses[pred_type]
+    bpred = cls()
+    fixed = {}
+    for opt, param in bpredOptions:
+        value = getattr(options, opt, None)
+        if value is None:
+            continue
+        if param not in cls._params:
+            if strict:
+                fatal("--%s does not apply to the %s branch predictor" % \
+                      (opt.replace('_', '-'), pred_type))
+            continue
+        setattr(bpred, param, value)
+        fixed[param] = value
+
+    if getattr(options, "bpred_budget", None):
+        budget = convert.toMemorySize(options.bpred_budget) * 8
+        try:
+            params = bestConfiguration(cls.type, budget, fixed)
+        except ValueError, e:
+            fatal("--bpred-budget: %s" % e)
+        for param, value in params.iteritems():
+            if param not in fixed:
+                setattr(bpred, param, value)
+        print "%s branch predictor for a %d bit budget:" % (pred_type, budget)
+        for line in formatBreakdown(cls.type, params):
+            print "    " + line
+    return bpred
+
 def setCPUClass(options):
     """Returns two cpu classes and the initial mode of operation.
 
@@ -255,6 +333,102 @@ def repeatSwitch(testsys, repeat_switch_cpu_list, maxtick, switch_freq):
             exit_event = m5.simulate(maxtick - m5.curTick())
             return exit_event.getCause()
 
+def makeSwitchCpus(cpu_class, testsys, options):
+    """Returns CPUs of cpu_class to switch testsys's CPUs to."""
+    switch_cpus = [cpu_class(defer_registration=True, cpu_id=(i))
+                   for i in xrange(options.num_cpus)]
+
+    for i in xrange(options.num_cpus):
+        switch_cpus[i].system =  testsys
+        switch_cpus[i].workload = testsys.cpu[i].workload
+        switch_cpus[i].clock = testsys.cpu[i].clock
+        # simulation period
+        if options.maxinsts:
+            switch_cpus[i].max_insts_any_thread = options.maxinsts
+        # Add checker cpu if selected
+        if options.checker:
+            switch_cpus[i].addCheckerCpu()
+
+    return switch_cpus
+
+def setBranchPredictors(cpus, options, pred_type=None):
+    """Applies the branch predictor options to cpus, with a pred_type
+       predictor in place of the --pred-type one if given.
+    """
+
+    for cpu in cpus:
+        if pred_type:
+            bpred = getBranchPredictor(options, pred_type)
+        elif getattr(options, "pred_type", None):
+            bpred = getBranchPredictor(options)
+        elif getattr(options, "loop_pred", False):
+            # A copy of the CPU's own predictor, which can't be the
+            # child of both the CPU and the loop predictor
+            bpred = type(cpu.branchPred)()
+        else:
+            bpred = None
+        if bpred is not None:
+            if getattr(options, "loop_pred", False):
+                bpred = LoopBP(basePredictor=bpred)
+            cpu.branchPred = bpred
+
+        if getattr(options, "shadow_pred_types", None):
+            shadow_types = options.shadow_pred_types.split(',')
+            cpu.shadowPredictors = \
+                [ getBranchPredictor(options, t) for t in shadow_types ]
+
+        if getattr(options, "btb_entries", None):
+            cpu.BTBEntries = options.btb_entries
+        if getattr(options, "btb_assoc", None):
+            cpu.BTBAssoc = options.btb_assoc
+        if getattr(options, "btb_repl_policy", None):
+            cpu.BTBReplPolicy = options.btb_repl_policy
+        if getattr(options, "ras_size", None):
+            cpu.RASSize = options.ras_size
+
+        if getattr(options, "indirect_pred", False):
+            cpu.indirectPredictor = IndirectPredictor()
+
+def forkPredictors(testsys, fork_types, fork_cpus):
+    """Fast-forwards once, then forks a process per predictor type,
+       which switches to the CPUs with that predictor and goes on in the
+       output directory <outdir>/<type>.  Returns the predictor type in
+       the children; the parent waits for them and exits.
+    """
+
+    print "Switch at instruction count:%s" % \
+            str(testsys.cpu[0].max_insts_any_thread)
+    m5.simulate()
+    print "Forking %d predictors @ tick %s" % (len(fork_types), m5.curTick())
+
+    m5.doDrain(testsys)
+    m5.changeToTiming(testsys)
+
+    children = {}
+    for pred_type, cpus in zip(fork_types, fork_cpus):
+        pid = m5.fork(joinpath(m5.options.outdir, pred_type))
+        if pid == 0:
+            m5.switchCpus([ (testsys.cpu[i], cpus[i])
+                            for i in xrange(len(cpus)) ])
+            m5.resume(testsys)
+            return pred_type
+        print "%s simulating in process %d" % (pred_type, pid)
+        children[pid] = pred_type
+
+    failed = []
+    while children:
+        pid, status = os.waitpid(-1, 0)
+        if pid not in children:
+            continue
+        pred_type = children.pop(pid)
+        if status:
+            print "%s failed with status %d" % (pred_type, status)
+            failed.append(pred_type)
+        else:
+            print "%s done" % pred_type
+    sys.stdout.flush()
+    sys.exit(bool(failed))
+
 def run(options, root, testsys, cpu_class):
     if options.maxtick:
         maxtick = options.maxtick
@@ -284,6 +458,24 @@ def run(options, root, testsys, cpu_class):
     if options.repeat_switch and options.take_checkpoints:
         fatal("Can't specify both --repeat-switch and --take-checkpoints")
 
+    fork_types = []
+    if getattr(options, "fork_pred_types", None):
+        if not (cpu_class and options.fast_forward) or \
+           options.standard_switch or options.repeat_switch or \
+           options.take_checkpoints != None:
+            fatal("--fork-pred-types needs --fast-forward to a detailed "
+                  "--cpu-type, without other switching or checkpoints")
+        for opt in ("warm_bpred", "branch_trace", "branch_profile"):
+            if getattr(options, opt, None):
+                fatal("Can't specify both --fork-pred-types and --%s" %
+                      opt.replace('_', '-'))
+        fork_types = options.fork_pred_types.split(',')
+        for t in fork_types:
+            if t not in bpredClasses:
+                fatal("unknown branch predictor type %s" % t)
+        if len(set(fork_types)) != len(fork_types):
+            fatal("--fork-pred-types lists a predictor more than once")
+
     np = options.num_cpus
     switch_cpus = None
 
@@ -295,38 +487,24 @@ def run(options, root, testsys, cpu_class):
         for i in xrange(np):
             testsys.cpu[i].max_insts_any_thread = options.maxinsts
 
-    if options.pred_type:
-        for i in xrange(np):
-            testsys.cpu[i].predType = options.pred_type
-
-    if options.global_hist_size:	
-	      for i in xrange(np):
-		        testsys.cpu[i].globalHistoryBits = options.global_hist_size
-
-    if options.global_pred_size:
-        for i in xrange(np):
-            testsys.cpu[i].globalPredictorSize = options.global_pred_size
-    
-    if options.local_pred_size:
+    if cpu_class and fork_types:
+        # One set of detailed CPUs per predictor, all built and
+        # instantiated up front; each forked process switches to its own
         for i in xrange(np):
-            testsys.cpu[i].localPredictorSize = options.local_pred_size
+            testsys.cpu[i].max_insts_any_thread = int(options.fast_forward)
 
-    if cpu_class:
-        switch_cpus = [cpu_class(defer_registration=True, cpu_id=(i))
-                       for i in xrange(np)]
+        fork_cpus = []
+        for t in fork_types:
+            cpus = makeSwitchCpus(cpu_class, testsys, options)
+            setBranchPredictors(cpus, options, t)
+            setattr(testsys, "switch_cpus_%s" % t, cpus)
+            fork_cpus.append(cpus)
+    elif cpu_class:
+        switch_cpus = makeSwitchCpus(cpu_class, testsys, options)
 
         for i in xrange(np):
             if options.fast_forward:
                 testsys.cpu[i].max_insts_any_thread = int(options.fast_forward)
-            switch_cpus[i].system =  testsys
-            switch_cpus[i].workload = testsys.cpu[i].workload
-            switch_cpus[i].clock = testsys.cpu[i].clock
-            # simulation period
-            if options.maxinsts:
-                switch_cpus[i].max_insts_any_thread = options.maxinsts
-            # Add checker cpu if selected
-            if options.checker:
-                switch_cpus[i].addCheckerCpu()
 
         testsys.switch_cpus = switch_cpus
         switch_cpu_list = [(testsys.cpu[i], switch_cpus[i]) for i in xrange(np)]
@@ -424,6 +602,50 @@ def run(options, root, testsys, cpu_class):
         switch_cpu_list = [(testsys.cpu[i], switch_cpus[i]) for i in xrange(np)]
         switch_cpu_list1 = [(switch_cpus[i], switch_cpus_1[i]) for i in xrange(np)]
 
+    # The branch predictor options apply to the CPUs that end up doing
+    # the detailed simulation; the forked predictors' CPUs are already
+    # set up
+    if fork_types:
+        bpred_cpus = []
+    elif options.standard_switch:
+        bpred_cpus = switch_cpus_1
+    elif cpu_class:
+        bpred_cpus = switch_cpus
+    else:
+        bpred_cpus = testsys.cpu
+
+    setBranchPredictors(bpred_cpus, options)
+
+    if getattr(options, "branch_trace", None):
+        if "branchTracer" not in type(bpred_cpus[0])._params:
+            fatal("--branch-trace needs the inorder CPU")
+        for i in xrange(np):
+            if np > 1:
+                trace_file = "%s.%d" % (options.branch_trace, i)
+            else:
+                trace_file = options.branch_trace
+            bpred_cpus[i].branchTracer = BranchTracer(file=trace_file)
+
+    if getattr(options, "branch_profile", None):
+        if "branchProfiler" not in type(bpred_cpus[0])._params:
+            fatal("--branch-profile needs the inorder or a detailed CPU")
+        for i in xrange(np):
+            if np > 1:
+                profile_file = "%s.%d" % (options.branch_profile, i)
+            else:
+                profile_file = options.branch_profile
+            bpred_cpus[i].branchProfiler = BranchProfiler(
+                file=profile_file, size=options.branch_profile_size)
+
+    # Let the fast-forwarding atomic CPUs train the detailed CPUs'
+    # predictors; switching CPUs then hands over warm tables.  With
+    # --standard-switch the timing CPUs in between leave them alone.
+    if getattr(options, "warm_bpred", False):
+        if not (cpu_class and options.fast_forward):
+            fatal("--warm-bpred only applies with --fast-forward")
+        for i in xrange(np):
+            testsys.cpu[i].branchPred = bpred_cpus[i].branchPred
+
     # set the checkpoint in the cpu before m5.instantiate is called
     if options.take_checkpoints != None and \
            (options.simpoint or options.at_instruction):
@@ -449,7 +671,12 @@ def run(options, root, testsys, cpu_class):
         maxtick, checkpoint_dir = findCptDir(options, maxtick, cptdir, testsys)
     m5.instantiate(checkpoint_dir)
 
-    if options.standard_switch or cpu_class:
+    if fork_types:
+        forkPredictors(testsys, fork_types, fork_cpus)
+        # Each predictor checkpoints in its own output directory
+        if not options.checkpoint_dir:
+            cptdir = m5.options.outdir
+    elif options.standard_switch or cpu_class:
         if options.standard_switch:
             print "Switch at instruction count:%s" % \
                     str(testsys.cpu[0].max_insts_any_thread)
@@ -0,0 +1,99 @@
+# Replay a branch trace recorded with configs/spec2k6/run.py --branch-trace
+# through a branch predictor, without simulating a CPU.
+#
+# "gem5.opt configs/example/bpred_replay.py --pred-type=gshare m5out/bzip2.bt"
+
+import optparse
+import sys
+import time
+
+import m5
+from m5.objects import *
+from m5.util import addToPath, fatal
+
+addToPath('../common')
+
+import Options
+import Simulation
+
+try:
+    from m5.internal.bpred_replay import BranchTraceReplay
+except ImportError:
+    BranchTraceReplay = None
+
+parser = optparse.OptionParser(usage="%prog [options] <trace> [<trace> ...]")
+
+# Predictors are built with the same params as for a full run, so that a
+# replay and a full run of the same configuration see the same predictor.
+Options.addBranchPredictorOptions(parser)
+parser.set_defaults(pred_type="tournament")
+parser.add_option("--max-branches", type="int", default=0,
+                  help="Stop after this many branches per trace "
+                       "(default: whole trace)")
+parser.add_option("--batch", action="store_true",
+                  help="Use the NumPy batch engine (perceptron and "
+                       "hybridpg only)")
+parser.add_option("--batch-chunk", type="int", default=1 << 16,
+                  help="Branches per chunk for --batch")
+
+(options, args) = parser.parse_args()
+
+if not args:
+    parser.error("no branch trace given")
+
+if not options.batch and BranchTraceReplay is None:
+    fatal("This gem5 binary was built without the branch predictors "
+          "(InOrderCPU or O3CPU)")
+
+bpred = Simulation.getBranchPredictor(options)
+
+if options.batch:
+    from m5.util.branchtrace import BranchTrace, TAKEN, UNCOND
+    from m5.util.perceptron import BatchPerceptron
+
+    if options.pred_type == "perceptron":
+        factory = BatchPerceptron.fromPerceptronTop
+    elif options.pred_type == "hybridpg":
+        factory = BatchPerceptron.fromHybridpg
+    else:
+        fatal("--batch only supports the perceptron and hybridpg predictors")
+    replay = factory(int(bpred.globalPredictorSize),
+                     int(bpred.globalHistoryBits),
+                     weightBits=int(bpred.weightBits),
+                     theta=int(bpred.theta),
+                     adaptiveTheta=bool(bpred.adaptiveTheta),
+                     thetaCtrBits=int(bpred.thetaCtrBits))
+else:
+    root = Root(full_system=False)
+    root.bpred = bpred
+    m5.instantiate()
+    replay = BranchTraceReplay(bpred.getCCObject())
+
+start = time.time()
+for trace in args:
+    if options.batch:
+        trace = BranchTrace(trace)
+        records = trace.records
+        if options.max_branches:
+            records = records[:options.max_branches]
+        for first in xrange(0, len(records), options.batch_chunk):
+            chunk = records[first:first + options.batch_chunk]
+            replay.predict(chunk['pc'], chunk['flags'] & TAKEN,
+                           chunk['flags'] & UNCOND)
+        trace.close()
+    else:
+        replay.run(trace, options.max_branches)
+elapsed = time.time() - start
+
+branches = replay.branches
+predicted = replay.condPredicted
+incorrect = replay.condIncorrect
+
+print "predType         %s" % options.pred_type
+print "branches         %d" % branches
+print "condPredicted    %d" % predicted
+print "condIncorrect    %d" % incorrect
+if predicted:
+    print "condAccuracy     %.6f" % (1.0 - float(incorrect) / predicted)
+if elapsed > 0:
+    print "branchesPerSec   %.0f" % (branches / elapsed)
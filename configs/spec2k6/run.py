@@ -66,6 +66,7 @@ execfile(os.path.join(config_root, "ruby", "Ruby.py"))
 parser = optparse.OptionParser()
 Options.addCommonOptions(parser)
 Options.addSEOptions(parser)
+Options.addBranchPredictorOptions(parser)
 Ruby.define_options(parser)
 
 # Benchmark options
@@ -73,10 +74,10 @@ Ruby.define_options(parser)
 parser.add_option("-b", "--benchmark", default="",
                  help="The benchmark to be loaded.")
 
-parser.add_option("", "--pred-type", default="local")
-parser.add_option("", "--global-hist-size", default=13)
-parser.add_option("", "--global-pred-size", default=8192)
-parser.add_option("", "--local-pred-size", default=8192)
+parser.set_defaults(pred_type="local")
+parser.add_option("", "--branch-trace", default="",
+                  help="Record resolved branches to this file in the "
+                       "output directory for configs/example/bpred_replay.py")
 
 (options, args) = parser.parse_args()
 
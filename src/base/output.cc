@@ -126,9 +126,6 @@ OutputDirectory::close(ostream *openStream) {
 void
 OutputDirectory::setDirectory(const string &d)
 {
-    if (!dir.empty())
-        panic("Output directory already set!\n");
-
     dir = d;
 
     // guarantee that directory ends with a path separator
@@ -92,7 +92,9 @@ class OutputDirectory
                         std::ios_base::openmode mode = std::ios::trunc);
 
     /**
-     * Sets name of this directory.
+     * Sets name of this directory.  Files that are already open stay
+     * where they are; a forked simulator sets a new directory so that
+     * the files it creates afterwards do not clobber its parent's.
      * @param dir name of this directory
      */
     void setDirectory(const std::string &dir);
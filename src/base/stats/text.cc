@@ -130,6 +130,17 @@ Text::open(const std::string &file)
         fatal("Unable to open statistics file for writing\n");
 }
 
+void
+Text::close()
+{
+    if (mystream) {
+        assert(stream);
+        delete stream;
+    }
+    mystream = false;
+    stream = NULL;
+}
+
 bool
 Text::valid() const
 {
@@ -684,16 +695,19 @@ Output *
 initText(const string &filename, bool desc)
 {
     static Text text;
-    static bool connected = false;
+    static ostream *connected = NULL;
 
-    if (!connected) {
-        ostream *os = simout.find(filename);
-        if (!os)
-            os = simout.create(filename);
+    ostream *os = simout.find(filename);
+    if (!os)
+        os = simout.create(filename);
 
+    // After a fork changes the output directory, the same name resolves
+    // to a new file, and the stats move there.
+    if (os != connected) {
+        text.close();
         text.open(*os);
         text.descriptions = desc;
-        connected = true;
+        connected = os;
     }
 
     return &text;
@@ -59,6 +59,7 @@ class Text : public Output
 
     void open(std::ostream &stream);
     void open(const std::string &file);
+    void close();
 
     // Implement Visit
     virtual void visit(const ScalarInfo &info);
@@ -29,6 +29,7 @@
 from m5.params import *
 from m5.proxy import *
 from BaseCPU import BaseCPU
+from BranchPredictor import TournamentBP
 
 class ThreadModel(Enum):
     vals = ['Single', 'SMT', 'SwitchOnCacheMiss']
@@ -45,22 +46,28 @@ class InOrderCPU(BaseCPU):
     fetchBuffSize = Param.Unsigned(4, "Fetch Buffer Size (Number of Cache Blocks Stored)")
     memBlockSize = Param.Unsigned(64, "Memory Block Size")
 
-    predType = Param.String("tournament", "Branch predictor type ('local', 'tournament', 'gshare')")
-    localPredictorSize = Param.Unsigned(2048, "Size of local predictor")
-    localCtrBits = Param.Unsigned(2, "Bits per counter")
-    localHistoryTableSize = Param.Unsigned(2048, "Size of local history table")
-    localHistoryBits = Param.Unsigned(11, "Bits for the local history")
-    globalPredictorSize = Param.Unsigned(8192, "Size of global predictor")
-    globalCtrBits = Param.Unsigned(2, "Bits per counter")
-    globalHistoryBits = Param.Unsigned(13, "Bits of history")
-    choicePredictorSize = Param.Unsigned(8192, "Size of choice predictor")
-    choiceCtrBits = Param.Unsigned(2, "Bits of choice counters")
+    branchPred = Param.BranchPredictor(TournamentBP(), "Branch Predictor")
+    shadowPredictors = VectorParam.BranchPredictor([],
+        "Predictors trained alongside branchPred to compare their accuracy; "
+        "they don't steer fetch")
 
     BTBEntries = Param.Unsigned(16384, "Number of BTB entries")
     BTBTagSize = Param.Unsigned(15, "Size of the BTB tags, in bits")
+    BTBAssoc = Param.Unsigned(1, "Associativity of the BTB")
+    BTBReplPolicy = Param.BTBReplacementPolicy('LRU',
+        "Replacement policy of the BTB sets")
 
     RASSize = Param.Unsigned(16, "RAS size")
 
+    indirectPredictor = Param.IndirectPredictor(NULL,
+        "Target predictor for indirect branches other than returns; "
+        "the BTB predicts them if there is none")
+
+    branchTracer = Param.BranchTracer(NULL,
+        "Tracer to record resolved branches to for trace replay")
+    branchProfiler = Param.BranchProfiler(NULL,
+        "Per-branch profile of executions and mispredictions")
+
     instShiftAmt = Param.Unsigned(2, "Number of bits to shift instructions by")
 
     stageTracing = Param.Bool(False, "Enable tracing of each stage in CPU")
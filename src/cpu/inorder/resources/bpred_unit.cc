@@ -43,50 +43,23 @@ using namespace std;
 using namespace ThePipeline;
 
 BPredUnit::BPredUnit(Resource *_res, ThePipeline::Params *params)
-    : res(_res), 
-      BTB(params->BTBEntries, params->BTBTagSize, params->instShiftAmt)
+    : res(_res), tracer(params->branchTracer),
+      profiler(params->branchProfiler), shadows(NULL),
+      indirect(params->indirectPredictor),
+      bpred(params->branchPred),
+      historyPool(bpred->getHistoryPool()),
+      BTB(params->BTBEntries, params->BTBTagSize, params->instShiftAmt,
+          params->BTBAssoc, params->BTBReplPolicy)
 {
-    // Setup the selected predictor.
-    if (params->predType == "local") {
-        localBP = new LocalBP(params->localPredictorSize,
-                              params->localCtrBits,
-                              params->instShiftAmt);
-        predictor = Local;
-    } else if (params->predType == "tournament") {
-        tournamentBP = new TournamentBP(params->localPredictorSize,
-                                        params->localCtrBits,
-                                        params->localHistoryTableSize,
-                                        params->localHistoryBits,
-                                        params->globalPredictorSize,
-                                        params->globalHistoryBits,
-                                        params->globalCtrBits,
-                                        params->choicePredictorSize,
-                                        params->choiceCtrBits,
-                                        params->instShiftAmt);
-        predictor = Tournament;
-    } else if (params->predType == "gshare") {
-      gshareBP = new GshareBP(params->globalPredictorSize,
-                              params->globalCtrBits,
-                              params->globalHistoryBits);
-        predictor = Gshare;
-    } else if (params->predType == "hybridpg"){
-      hybridBP = new HybridpgBP(params->globalPredictorSize,
-                                  params->globalHistoryBits,
-				                          2 * params->globalHistoryBits + 14);
-      predictor = HybridPG;
-    } else if (params->predType == "perceptron") {
-      perceptronBP = new PerceptronBP_Top(params->globalPredictorSize,
-                              params->globalHistoryBits,
-                              2 * params->globalHistoryBits + 14);
-      predictor = Perceptron;
-    } else {
-        fatal("Invalid BP selected!");
-    }
-
     for (int i=0; i < ThePipeline::MaxThreads; i++)
         RAS[i].init(params->RASSize);
 
     instSize = sizeof(TheISA::MachInst);
+
+    if (!params->shadowPredictors.empty()) {
+        shadows = new ShadowPredictors(name(), params->shadowPredictors,
+                                       bpred);
+    }
 }
 
 std::string
@@ -123,6 +96,8 @@ BPredUnit::regStats()
         .desc("Number of BTB hits")
         ;
 
+    BTB.regStats(name());
+
     BTBHitPct
         .name(name() + ".BTBHitPct")
         .desc("BTB Hit Percentage")
@@ -138,6 +113,61 @@ BPredUnit::regStats()
         .name(name() + ".RASInCorrect")
         .desc("Number of incorrect RAS predictions.")
         ;
+
+    RASOverflows
+        .name(name() + ".RASOverflows")
+        .desc("Number of calls that overwrote the oldest RAS entry")
+        ;
+
+    RASUnderflows
+        .name(name() + ".RASUnderflows")
+        .desc("Number of returns predicted from an empty RAS")
+        ;
+
+    RASCorrupted
+        .name(name() + ".RASCorrupted")
+        .desc("Number of returns mispredicted from a non-empty RAS")
+        ;
+
+    indirectLookups
+        .name(name() + ".indirectLookups")
+        .desc("Number of indirect branches predicted, excluding returns")
+        ;
+
+    indirectHits
+        .name(name() + ".indirectHits")
+        .desc("Number of targets from the indirect predictor")
+        ;
+
+    indirectIncorrect
+        .name(name() + ".indirectIncorrect")
+        .desc("Number of indirect branches predicted incorrectly, "
+              "excluding returns")
+        ;
+
+    indirectIncorrectShare
+        .name(name() + ".indirectIncorrectShare")
+        .desc("Fraction of incorrect predictions from indirect branches")
+        .precision(6)
+        ;
+    indirectIncorrectShare = indirectIncorrect / condIncorrect;
+
+    const HistoryPoolBase &pool = historyPool ? *historyPool : noHistoryPool;
+
+    historyPeakOutstanding
+        .name(name() + ".historyPeakOutstanding")
+        .desc("Peak number of outstanding predictor history records")
+        .scalar(pool.peakOutstanding)
+        ;
+
+    historyCapacity
+        .name(name() + ".historyCapacity")
+        .desc("Number of predictor history records allocated")
+        .scalar(pool.capacity)
+        ;
+
+    if (shadows)
+        shadows->regStats();
 }
 
 
@@ -188,6 +218,7 @@ BPredUnit::predict(DynInstPtr &inst, TheISA::PCState &predPC, ThreadID tid)
 
 
     void *bp_history = NULL;
+    bool is_uncond = false;
 
     if (inst->isUncondCtrl()) {
         DPRINTF(InOrderBPred, "[tid:%i] Unconditional control.\n",
@@ -195,11 +226,13 @@ BPredUnit::predict(DynInstPtr &inst, TheISA::PCState &predPC, ThreadID tid)
         pred_taken = true;
         // Tell the BP there was an unconditional branch.
         BPUncond(bp_history);
+        is_uncond = true;
 
         if (inst->isReturn() && RAS[tid].empty()) {
             DPRINTF(InOrderBPred, "[tid:%i] RAS is empty, predicting "
                     "false.\n", tid);
             pred_taken = false;
+            ++RASUnderflows;
         }
     } else {
         ++condPredicted;
@@ -209,6 +242,14 @@ BPredUnit::predict(DynInstPtr &inst, TheISA::PCState &predPC, ThreadID tid)
 
     PredictorHistory predict_record(inst->seqNum, predPC, pred_taken,
                                     bp_history, tid);
+    predict_record.wasUncond = is_uncond;
+    predict_record.wasIndirect = inst->isIndirectCtrl() && !inst->isReturn();
+
+    if (predict_record.wasIndirect)
+        ++indirectLookups;
+
+    if (inst->isCall() || inst->isReturn())
+        predict_record.rasState = RAS[tid].save();
 
     // Now lookup in the BTB or RAS.
     if (pred_taken) {
@@ -220,25 +261,21 @@ BPredUnit::predict(DynInstPtr &inst, TheISA::PCState &predPC, ThreadID tid)
             TheISA::PCState rasTop = RAS[tid].top();
             target = TheISA::buildRetPC(inst->pcState(), rasTop);
 
-            // Record the top entry of the RAS, and its index.
             predict_record.usedRAS = true;
-            predict_record.RASIndex = RAS[tid].topIdx();
-            predict_record.rasTarget = rasTop;
-
-            assert(predict_record.RASIndex < 16);
 
             RAS[tid].pop();
 
             DPRINTF(InOrderBPred, "[tid:%i]: Instruction %s is a return, "
                     "RAS predicted target: %s, RAS index: %i.\n",
                     tid, inst->pcState(), target,
-                    predict_record.RASIndex);
+                    predict_record.rasState.tos);
         } else {
             ++BTBLookups;
 
             if (inst->isCall()) {
 
-                RAS[tid].push(inst->pcState());
+                if (RAS[tid].push(inst->pcState()))
+                    ++RASOverflows;
 
                 // Record that it was a call so that the top RAS entry can
                 // be popped off if the speculation is incorrect.
@@ -254,6 +291,14 @@ BPredUnit::predict(DynInstPtr &inst, TheISA::PCState &predPC, ThreadID tid)
                 inst->isUncondCtrl() &&
                 inst->isDirectCtrl()) {
                 target = inst->branchTarget();
+            } else if (indirect && predict_record.wasIndirect &&
+                       indirect->lookup(predPC.instAddr(), target,
+                                        predict_record.indirectHistory)) {
+                ++indirectHits;
+
+                DPRINTF(InOrderBPred, "[tid:%i]: Instruction %s indirect "
+                        "predictor predicted target is %s.\n",
+                        tid, inst->pcState(), target);
             } else if (BTB.valid(predPC.instAddr(), asid)) {
                 ++BTBHits;
 
@@ -267,6 +312,16 @@ BPredUnit::predict(DynInstPtr &inst, TheISA::PCState &predPC, ThreadID tid)
                 DPRINTF(InOrderBPred, "[tid:%i]: BTB doesn't have a "
                         "valid entry, predicting false.\n",tid);
                 pred_taken = false;
+                // The branch falls through after all, so the taken
+                // outcome the predictor put in its speculative history
+                // has to be made not taken
+                if (!inst->isCall() && !inst->isReturn()) {
+                    BPBTBUpdate(predPC.instAddr(), bp_history);
+                    predict_record.bpHistory = bp_history;
+                    DPRINTF(InOrderBPred, "[tid:%i]: [sn:%i] BPBTBUpdate "
+                            "called for %s\n",
+                            tid, inst->seqNum, inst->pcState());
+                }
             }
         }
     }
@@ -275,6 +330,9 @@ BPredUnit::predict(DynInstPtr &inst, TheISA::PCState &predPC, ThreadID tid)
         // Set the PC and the instruction's predicted target.
         predPC = target;
     }
+    predict_record.target = predPC;
+    if (predict_record.indirectHistory && pred_taken)
+        indirect->recordTarget(predict_record.indirectHistory, predPC);
     DPRINTF(InOrderBPred, "[tid:%i]: [sn:%i]: Setting Predicted PC to %s.\n",
             tid, inst->seqNum, predPC);
 
@@ -296,11 +354,41 @@ BPredUnit::update(const InstSeqNum &done_sn, ThreadID tid)
 
     while (!predHist[tid].empty() &&
            predHist[tid].back().seqNum <= done_sn) {
-        // Update the branch predictor with the correct results.
-        BPUpdate(predHist[tid].back().pc.instAddr(),
-                 predHist[tid].back().predTaken,
-                 predHist[tid].back().bpHistory,
-                 false);
+        // A mispredicted branch trained the predictor when it was
+        // squashed, and is only left to train the shadow predictors and
+        // be traced in commit order.
+        if (!predHist[tid].back().resolved) {
+            if (profiler) {
+                profiler->record(predHist[tid].back().pc.instAddr(), false,
+                    bpred->lowConfidence(predHist[tid].back().bpHistory));
+            }
+
+            // Update the branch predictor with the correct results.
+            BPUpdate(predHist[tid].back().pc.instAddr(),
+                     predHist[tid].back().predTaken,
+                     predHist[tid].back().bpHistory,
+                     false);
+
+            if (predHist[tid].back().indirectHistory) {
+                indirect->update(predHist[tid].back().indirectHistory,
+                                 predHist[tid].back().predTaken,
+                                 predHist[tid].back().target, false);
+            }
+        }
+
+        if (shadows) {
+            shadows->update(predHist[tid].back().pc.instAddr(),
+                            predHist[tid].back().predTaken,
+                            predHist[tid].back().wasUncond);
+        }
+
+        if (tracer) {
+            tracer->record(predHist[tid].back().pc.instAddr(),
+                           predHist[tid].back().target.instAddr(),
+                           predHist[tid].back().predTaken,
+                           predHist[tid].back().wasUncond,
+                           predHist[tid].back().seqNum);
+        }
 
         predHist[tid].pop_back();
     }
@@ -314,25 +402,22 @@ BPredUnit::squash(const InstSeqNum &squashed_sn, ThreadID tid, ThreadID asid)
 
     while (!pred_hist.empty() &&
            pred_hist.front().seqNum > squashed_sn) {
-        if (pred_hist.front().usedRAS) {
+        // Branches are undone youngest first, so each one puts the RAS
+        // back exactly as it found it.
+        if (pred_hist.front().usedRAS || pred_hist.front().wasCall) {
             DPRINTF(InOrderBPred, "BranchPred: [tid:%i]: Restoring top of RAS "
-                    "to: %i, target: %s.\n",
-                    tid,
-                    pred_hist.front().RASIndex,
-                    pred_hist.front().rasTarget);
-
-            RAS[tid].restore(pred_hist.front().RASIndex,
-                             pred_hist.front().rasTarget);
-
-        } else if (pred_hist.front().wasCall) {
-            DPRINTF(InOrderBPred, "BranchPred: [tid:%i]: Removing speculative "
-                    "entry added to the RAS.\n",tid);
+                    "to: %i.\n", tid, pred_hist.front().rasState.tos);
 
-            RAS[tid].pop();
+            RAS[tid].restore(pred_hist.front().rasState);
         }
 
-        // This call should delete the bpHistory.
-        BPSquash(pred_hist.front().bpHistory);
+        // This call should delete the bpHistory, unless the predictor
+        // already took it back when the branch was found mispredicted.
+        if (!pred_hist.front().resolved)
+            BPSquash(pred_hist.front().bpHistory);
+
+        if (pred_hist.front().indirectHistory)
+            indirect->squash(pred_hist.front().indirectHistory);
 
         pred_hist.pop_front();
     }
@@ -380,22 +465,49 @@ BPredUnit::squash(const InstSeqNum &squashed_sn,
 
         if ((*hist_it).usedRAS) {
             ++RASIncorrect;
+            if (actually_taken && (*hist_it).rasState.usedEntries > 0)
+                ++RASCorrupted;
+        }
+
+        // A call or return that was not taken after all must not have
+        // changed the RAS.
+        if (!actually_taken &&
+            ((*hist_it).usedRAS || (*hist_it).wasCall)) {
+            RAS[tid].restore((*hist_it).rasState);
+        }
+
+        if ((*hist_it).wasIndirect) {
+            ++indirectIncorrect;
+        }
+
+        if (profiler) {
+            profiler->record((*hist_it).pc.instAddr(), true,
+                             bpred->lowConfidence((*hist_it).bpHistory));
         }
 
         BPUpdate((*hist_it).pc.instAddr(), actually_taken,
                  pred_hist.front().bpHistory, true);
 
+        if ((*hist_it).indirectHistory) {
+            indirect->update((*hist_it).indirectHistory, actually_taken,
+                             corrTarget, true);
+        }
+
         // only update BTB on branch taken right???
         if (actually_taken)
             BTB.update((*hist_it).pc.instAddr(), corrTarget, asid);
 
-        DPRINTF(InOrderBPred, "[tid:%i]: Removing history for [sn:%i] "
+        // Keep the branch, with its corrected outcome, until it commits,
+        // so that the shadow predictors learn it and it is traced in
+        // commit order along with the older branches still in flight.
+        DPRINTF(InOrderBPred, "[tid:%i]: Resolving history for [sn:%i] "
                 "PC %s.\n", tid, (*hist_it).seqNum, (*hist_it).pc);
 
-        pred_hist.erase(hist_it);
-
-        DPRINTF(InOrderBPred, "[tid:%i]: predHist.size(): %i\n", tid,
-                predHist[tid].size());
+        (*hist_it).predTaken = actually_taken;
+        (*hist_it).target = corrTarget;
+        (*hist_it).bpHistory = NULL;
+        (*hist_it).indirectHistory = NULL;
+        (*hist_it).resolved = true;
 
     } else {
         DPRINTF(InOrderBPred, "[tid:%i]: [sn:%i] pred_hist empty, can't "
@@ -407,76 +519,35 @@ BPredUnit::squash(const InstSeqNum &squashed_sn,
 void
 BPredUnit::BPUncond(void * &bp_history)
 {
-    // Only the tournament predictor cares about unconditional branches.
-    if (predictor == Tournament) {
-        tournamentBP->uncondBr(bp_history);
-    } else if (predictor == Perceptron) {
-        perceptronBP->uncondBr(bp_history);
-    } else if (predictor == Gshare) {
-        gshareBP->uncondBr(bp_history);
-    } else if (predictor == HybridPG) {
-        hybridBP->uncondBr(bp_history);
-    } 
-    
+    bpred->uncondBr(bp_history);
 }
 
 
 void
 BPredUnit::BPSquash(void *bp_history)
 {
-    if (predictor == Local) {
-        localBP->squash(bp_history);
-    } else if (predictor == Tournament) {
-        tournamentBP->squash(bp_history);
-    } else if (predictor == Gshare) {
-        gshareBP->squash(bp_history);
-    } else if (predictor == HybridPG) {
-        hybridBP->squash(bp_history);
-    } else if (predictor == Perceptron) {
-        perceptronBP->squash(bp_history);
-    } else {
-        panic("Predictor type is unexpected value!");
-    }    
+    bpred->squash(bp_history);
 }
 
 
 bool
 BPredUnit::BPLookup(Addr inst_PC, void * &bp_history)
 {
-    
-    if (predictor == Local) {
-        return localBP->lookup(inst_PC, bp_history);
-    } else if (predictor == Tournament) {
-        return tournamentBP->lookup(inst_PC, bp_history);
-    } else if (predictor == Gshare) {
-        return gshareBP->lookup(inst_PC, bp_history);
-    } else if (predictor == HybridPG) {
-        return hybridBP->lookup(inst_PC, bp_history);
-    } else if (predictor == Perceptron) {
-        return perceptronBP->lookup(inst_PC, bp_history);
-    } else {
-        panic("Predictor type is unexpected value!");
-    }
+    return bpred->lookup(inst_PC, bp_history);
 }
 
 
 void
-BPredUnit::BPUpdate(Addr inst_PC, bool taken, void *bp_history, bool squashed)
+BPredUnit::BPBTBUpdate(Addr inst_PC, void * &bp_history)
 {
+    bpred->BTBUpdate(inst_PC, bp_history);
+}
 
-    if (predictor == Local) {
-        localBP->update(inst_PC, taken, bp_history);
-    } else if (predictor == Tournament) {
-        tournamentBP->update(inst_PC, taken, bp_history, squashed);
-    } else if (predictor == Gshare) {
-        gshareBP->update(inst_PC, taken, bp_history);
-    } else if (predictor == HybridPG) {
-        hybridBP->update(inst_PC, taken, bp_history);
-    } else if (predictor == Perceptron) {
-        perceptronBP->update(inst_PC, taken, bp_history);
-    } else {
-        panic("Predictor type is unexpected value!");
-    }
+
+void
+BPredUnit::BPUpdate(Addr inst_PC, bool taken, void *bp_history, bool squashed)
+{
+    bpred->update(inst_PC, taken, bp_history, squashed);
 }
 
 
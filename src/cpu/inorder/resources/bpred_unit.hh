@@ -39,13 +39,13 @@
 #include "cpu/inorder/inorder_dyn_inst.hh"
 #include "cpu/inorder/pipeline_traits.hh"
 #include "cpu/inorder/resource.hh"
-#include "cpu/pred/2bit_local.hh"
+#include "cpu/pred/branch_predictor.hh"
+#include "cpu/pred/branch_profiler.hh"
+#include "cpu/pred/branch_tracer.hh"
 #include "cpu/pred/btb.hh"
+#include "cpu/pred/indirect_predictor.hh"
 #include "cpu/pred/ras.hh"
-#include "cpu/pred/tournament.hh"
-#include "cpu/pred/gshare.hh"
-#include "cpu/pred/hybrid_pg.hh"
-#include "cpu/pred/perceptron_top.hh"
+#include "cpu/pred/shadow_predictors.hh"
 #include "cpu/inst_seq.hh"
 #include "params/InOrderCPU.hh"
 
@@ -55,18 +55,6 @@
  */
 class BPredUnit
 {
-  private:
-
-    enum PredType {
-        Local,
-        Tournament,
-        Gshare,
-        HybridPG,
-        Perceptron
-    };
-
-    PredType predictor;
-
   public:
 
     /**
@@ -144,6 +132,16 @@ class BPredUnit
      */
     bool BPLookup(Addr instPC, void * &bp_history);
 
+    /**
+     * If a branch is not taken, because the BTB address is invalid or missing,
+     * this function sets the appropriate counter in the global and local
+     * predictors to not taken.
+     * @param inst_PC The PC to look up the local predictor.
+     * @param bp_history Pointer that will be set to an object that
+     * has the branch predictor state associated with the lookup.
+     */
+    void BPBTBUpdate(Addr instPC, void * &bp_history);
+
     /**
      * Looks up a given PC in the BTB to see if a matching entry exists.
      * @param inst_PC The PC to look up.
@@ -184,7 +182,7 @@ class BPredUnit
   private:
     int instSize;
     Resource *res;
-    
+
     struct PredictorHistory {
         /**
          * Makes a predictor history struct that contains any
@@ -193,9 +191,10 @@ class BPredUnit
         PredictorHistory(const InstSeqNum &seq_num,
                          const TheISA::PCState &instPC, bool pred_taken,
                          void *bp_history, ThreadID _tid)
-            : seqNum(seq_num), pc(instPC), rasTarget(0), RASIndex(0),
-              tid(_tid), predTaken(pred_taken), usedRAS(0), wasCall(0),
-              bpHistory(bp_history)
+            : seqNum(seq_num), pc(instPC), target(instPC), tid(_tid),
+              predTaken(pred_taken), usedRAS(0),
+              wasCall(0), wasUncond(0), wasIndirect(0), resolved(0),
+              bpHistory(bp_history), indirectHistory(NULL)
         {}
 
         /** The sequence number for the predictor history entry. */
@@ -204,11 +203,13 @@ class BPredUnit
         /** The PC associated with the sequence number. */
         TheISA::PCState pc;
 
-        /** The RAS target (only valid if a return). */
-        TheISA::PCState rasTarget;
+        /** The predicted next PC. */
+        TheISA::PCState target;
 
-        /** The RAS index of the instruction (only valid if a call). */
-        unsigned RASIndex;
+        /** The RAS state before the instruction pushed or popped it
+         * (only valid if a call or return).
+         */
+        ReturnAddrStack::State rasState;
 
         /** The thread id. */
         ThreadID tid;
@@ -222,11 +223,31 @@ class BPredUnit
         /** Whether or not the instruction was a call. */
         bool wasCall;
 
+        /** Whether or not the instruction was an unconditional branch. */
+        bool wasUncond;
+
+        /** Whether or not the instruction was an indirect branch other
+         * than a return.
+         */
+        bool wasIndirect;
+
+        /** Whether the branch was mispredicted and the predictors were
+         * already trained with its outcome when it was squashed, in which
+         * case predTaken and target hold the corrected outcome until the
+         * branch commits.
+         */
+        bool resolved;
+
         /** Pointer to the history object passed back from the branch
          * predictor.  It is used to update or restore state of the
          * branch predictor.
          */
         void *bpHistory;
+
+        /** History record of the indirect predictor, NULL if it was not
+         * looked up.
+         */
+        void *indirectHistory;
     };
 
     typedef std::list<PredictorHistory> History;
@@ -239,20 +260,32 @@ class BPredUnit
      */
     History predHist[ThePipeline::MaxThreads];
 
-    /** The local branch predictor. */
-    LocalBP *localBP;
+    /** Tracer resolved branches are recorded to, NULL if not tracing. */
+    BranchTracer *tracer;
 
-    /** The tournament branch predictor. */
-    TournamentBP *tournamentBP;
+    /** Profile resolved branches are counted in, NULL if not profiling. */
+    BranchProfiler *profiler;
+
+    /**
+     * Predictors evaluated alongside bpred without steering fetch, NULL
+     * if there are none.
+     */
+    ShadowPredictors *shadows;
+
+    /**
+     * Target predictor for indirect branches other than returns, NULL
+     * if the BTB predicts them.
+     */
+    IndirectPredictor *indirect;
 
-    /** The gshare branch predictor. */
-    GshareBP *gshareBP; 
+    /** The branch direction predictor. */
+    BPredictor *bpred;
 
-    /** The perceptron branch predictor. */
-    PerceptronBP_Top *perceptronBP;
+    /** History record pool of the selected predictor. */
+    const HistoryPoolBase *historyPool;
 
-    /** The hybrid gshare / perceptron branch predictor. */
-    HybridpgBP *hybridBP;
+    /** Stands in for historyPool for predictors without history records. */
+    HistoryPoolBase noHistoryPool;
 
     /** The BTB. */
     DefaultBTB BTB;
@@ -276,7 +309,25 @@ class BPredUnit
     Stats::Scalar usedRAS;
     /** Stat for number of times the RAS is incorrect. */
     Stats::Scalar RASIncorrect;
+    /** Stat for number of calls that overwrote the oldest RAS entry. */
+    Stats::Scalar RASOverflows;
+    /** Stat for number of returns predicted from an empty RAS. */
+    Stats::Scalar RASUnderflows;
+    /** Stat for number of wrong targets from a non-empty RAS. */
+    Stats::Scalar RASCorrupted;
+    /** Stat for number of indirect branches predicted. */
+    Stats::Scalar indirectLookups;
+    /** Stat for number of targets from the indirect predictor. */
+    Stats::Scalar indirectHits;
+    /** Stat for number of indirect branches predicted incorrectly. */
+    Stats::Scalar indirectIncorrect;
+    /** Stat for the share of mispredictions from indirect branches. */
+    Stats::Formula indirectIncorrectShare;
     Stats::Formula BTBHitPct;
+    /** Stat for peak number of outstanding predictor history records. */
+    Stats::Value historyPeakOutstanding;
+    /** Stat for number of predictor history records allocated. */
+    Stats::Value historyCapacity;
 };
 
 #endif // __CPU_INORDER_BPRED_UNIT_HH__
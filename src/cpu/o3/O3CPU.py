@@ -30,6 +30,7 @@ from m5.defines import buildEnv
 from m5.params import *
 from m5.proxy import *
 from BaseCPU import BaseCPU
+from BranchPredictor import TournamentBP
 from FUPool import *
 from O3Checker import O3Checker
 
@@ -82,22 +83,26 @@ class DerivO3CPU(BaseCPU):
     backComSize = Param.Unsigned(5, "Time buffer size for backwards communication")
     forwardComSize = Param.Unsigned(5, "Time buffer size for forward communication")
 
-    predType = Param.String("tournament", "Branch predictor type ('local', 'tournament')")
-    localPredictorSize = Param.Unsigned(2048, "Size of local predictor")
-    localCtrBits = Param.Unsigned(2, "Bits per counter")
-    localHistoryTableSize = Param.Unsigned(2048, "Size of local history table")
-    localHistoryBits = Param.Unsigned(11, "Bits for the local history")
-    globalPredictorSize = Param.Unsigned(8192, "Size of global predictor")
-    globalCtrBits = Param.Unsigned(2, "Bits per counter")
-    globalHistoryBits = Param.Unsigned(13, "Bits of history")
-    choicePredictorSize = Param.Unsigned(8192, "Size of choice predictor")
-    choiceCtrBits = Param.Unsigned(2, "Bits of choice counters")
+    branchPred = Param.BranchPredictor(TournamentBP(), "Branch Predictor")
+    shadowPredictors = VectorParam.BranchPredictor([],
+        "Predictors trained alongside branchPred to compare their accuracy; "
+        "they don't steer fetch")
 
     BTBEntries = Param.Unsigned(4096, "Number of BTB entries")
     BTBTagSize = Param.Unsigned(16, "Size of the BTB tags, in bits")
+    BTBAssoc = Param.Unsigned(1, "Associativity of the BTB")
+    BTBReplPolicy = Param.BTBReplacementPolicy('LRU',
+        "Replacement policy of the BTB sets")
 
     RASSize = Param.Unsigned(16, "RAS size")
 
+    indirectPredictor = Param.IndirectPredictor(NULL,
+        "Target predictor for indirect branches other than returns; "
+        "the BTB predicts them if there is none")
+
+    branchProfiler = Param.BranchProfiler(NULL,
+        "Per-branch profile of executions and mispredictions")
+
     LQEntries = Param.Unsigned(32, "Number of load queue entries")
     SQEntries = Param.Unsigned(32, "Number of store queue entries")
     LSQDepCheckShift = Param.Unsigned(4, "Number of places to shift addr before check")
@@ -47,10 +47,12 @@
 
 #include "base/statistics.hh"
 #include "base/types.hh"
-#include "cpu/pred/2bit_local.hh"
+#include "cpu/pred/branch_predictor.hh"
+#include "cpu/pred/branch_profiler.hh"
 #include "cpu/pred/btb.hh"
+#include "cpu/pred/indirect_predictor.hh"
 #include "cpu/pred/ras.hh"
-#include "cpu/pred/tournament.hh"
+#include "cpu/pred/shadow_predictors.hh"
 #include "cpu/inst_seq.hh"
 
 struct DerivO3CPUParams;
@@ -65,13 +67,6 @@ class BPredUnit
   private:
     typedef typename Impl::DynInstPtr DynInstPtr;
 
-    enum PredType {
-        Local,
-        Tournament
-    };
-
-    PredType predictor;
-
     const std::string _name;
 
   public:
@@ -92,6 +87,15 @@ class BPredUnit
 
     void takeOverFrom();
 
+    /**
+     * Writes the BTB and return address stacks to a checkpoint.  The
+     * direction predictor is a SimObject and checkpoints itself.
+     */
+    void serialize(std::ostream &os);
+
+    /** Restores the BTB and return address stacks from a checkpoint. */
+    void unserialize(Checkpoint *cp, const std::string &section);
+
     /**
      * Predicts whether or not the instruction is a taken branch, and the
      * target of the branch if it is taken.
@@ -206,9 +210,11 @@ class BPredUnit
         PredictorHistory(const InstSeqNum &seq_num, Addr instPC,
                          bool pred_taken, void *bp_history,
                          ThreadID _tid)
-            : seqNum(seq_num), pc(instPC), bpHistory(bp_history), RASTarget(0),
-              RASIndex(0), tid(_tid), predTaken(pred_taken), usedRAS(0), pushedRAS(0),
-              wasCall(0), wasReturn(0), validBTB(0)
+            : seqNum(seq_num), pc(instPC), bpHistory(bp_history),
+              indirectHistory(NULL), target(0), tid(_tid),
+              predTaken(pred_taken), usedRAS(0), pushedRAS(0),
+              wasCall(0), wasReturn(0), wasUncond(0), wasIndirect(0),
+              validBTB(0), resolved(0)
         {}
 
         bool operator==(const PredictorHistory &entry) const {
@@ -227,11 +233,18 @@ class BPredUnit
          */
         void *bpHistory;
 
-        /** The RAS target (only valid if a return). */
-        TheISA::PCState RASTarget;
+        /** History record of the indirect predictor, NULL if it was not
+         * looked up.
+         */
+        void *indirectHistory;
+
+        /** The predicted next PC. */
+        TheISA::PCState target;
 
-        /** The RAS index of the instruction (only valid if a call). */
-        unsigned RASIndex;
+        /** The RAS state before the instruction pushed or popped it
+         * (only valid if a call or return).
+         */
+        ReturnAddrStack::State RASState;
 
         /** The thread id. */
         ThreadID tid;
@@ -250,8 +263,24 @@ class BPredUnit
 
         /** Whether or not the instruction was a return. */
         bool wasReturn;
+
+        /** Whether or not the instruction was an unconditional branch. */
+        bool wasUncond;
+
+        /** Whether or not the instruction was an indirect branch other
+         * than a return.
+         */
+        bool wasIndirect;
+
         /** Whether or not the instruction had a valid BTB entry. */
         bool validBTB;
+
+        /** Whether the branch was mispredicted and the predictor was
+         * already trained with its outcome when it was squashed, in which
+         * case predTaken and target hold the corrected outcome until the
+         * branch commits.
+         */
+        bool resolved;
     };
 
     typedef std::list<PredictorHistory> History;
@@ -264,11 +293,29 @@ class BPredUnit
      */
     History predHist[Impl::MaxThreads];
 
-    /** The local branch predictor. */
-    LocalBP *localBP;
+    /** The branch direction predictor. */
+    BPredictor *bpred;
+
+    /** Profile resolved branches are counted in, NULL if not profiling. */
+    BranchProfiler *profiler;
+
+    /**
+     * Predictors evaluated alongside bpred without steering fetch, NULL
+     * if there are none.
+     */
+    ShadowPredictors *shadows;
+
+    /**
+     * Target predictor for indirect branches other than returns, NULL
+     * if the BTB predicts them.
+     */
+    IndirectPredictor *indirect;
+
+    /** History record pool of the selected predictor. */
+    const HistoryPoolBase *historyPool;
 
-    /** The tournament branch predictor. */
-    TournamentBP *tournamentBP;
+    /** Stands in for historyPool for predictors without history records. */
+    HistoryPoolBase noHistoryPool;
 
     /** The BTB. */
     DefaultBTB BTB;
@@ -292,6 +339,24 @@ class BPredUnit
     Stats::Scalar usedRAS;
     /** Stat for number of times the RAS is incorrect. */
     Stats::Scalar RASIncorrect;
+    /** Stat for number of calls that overwrote the oldest RAS entry. */
+    Stats::Scalar RASOverflows;
+    /** Stat for number of returns predicted from an empty RAS. */
+    Stats::Scalar RASUnderflows;
+    /** Stat for number of wrong targets from a non-empty RAS. */
+    Stats::Scalar RASCorrupted;
+    /** Stat for number of indirect branches predicted. */
+    Stats::Scalar indirectLookups;
+    /** Stat for number of targets from the indirect predictor. */
+    Stats::Scalar indirectHits;
+    /** Stat for number of indirect branches predicted incorrectly. */
+    Stats::Scalar indirectIncorrect;
+    /** Stat for the share of mispredictions from indirect branches. */
+    Stats::Formula indirectIncorrectShare;
+    /** Stat for peak number of outstanding predictor history records. */
+    Stats::Value historyPeakOutstanding;
+    /** Stat for number of predictor history records allocated. */
+    Stats::Value historyCapacity;
 };
 
 #endif // __CPU_O3_BPRED_UNIT_HH__
@@ -45,6 +45,7 @@
 #include "arch/isa_traits.hh"
 #include "arch/types.hh"
 #include "arch/utility.hh"
+#include "base/cprintf.hh"
 #include "base/trace.hh"
 #include "config/the_isa.hh"
 #include "cpu/o3/bpred_unit.hh"
@@ -54,34 +55,24 @@
 template<class Impl>
 BPredUnit<Impl>::BPredUnit(DerivO3CPUParams *params)
     : _name(params->name + ".BPredUnit"),
+      bpred(params->branchPred),
+      profiler(params->branchProfiler),
+      shadows(NULL),
+      indirect(params->indirectPredictor),
+      historyPool(bpred->getHistoryPool()),
       BTB(params->BTBEntries,
           params->BTBTagSize,
-          params->instShiftAmt)
+          params->instShiftAmt,
+          params->BTBAssoc,
+          params->BTBReplPolicy)
 {
-    // Setup the selected predictor.
-    if (params->predType == "local") {
-        localBP = new LocalBP(params->localPredictorSize,
-                              params->localCtrBits,
-                              params->instShiftAmt);
-        predictor = Local;
-    } else if (params->predType == "tournament") {
-        tournamentBP = new TournamentBP(params->localPredictorSize,
-                                        params->localCtrBits,
-                                        params->localHistoryTableSize,
-                                        params->localHistoryBits,
-                                        params->globalPredictorSize,
-                                        params->globalHistoryBits,
-                                        params->globalCtrBits,
-                                        params->choicePredictorSize,
-                                        params->choiceCtrBits,
-                                        params->instShiftAmt);
-        predictor = Tournament;
-    } else {
-        fatal("Invalid BP selected!");
-    }
-
     for (int i=0; i < Impl::MaxThreads; i++)
         RAS[i].init(params->RASSize);
+
+    if (!params->shadowPredictors.empty()) {
+        shadows = new ShadowPredictors(name(), params->shadowPredictors,
+                                       bpred);
+    }
 }
 
 template <class Impl>
@@ -113,6 +104,8 @@ BPredUnit<Impl>::regStats()
         .desc("Number of BTB hits")
         ;
 
+    BTB.regStats(name());
+
     BTBCorrect
         .name(name() + ".BTBCorrect")
         .desc("Number of correct BTB predictions (this stat may not "
@@ -128,6 +121,61 @@ BPredUnit<Impl>::regStats()
         .name(name() + ".RASInCorrect")
         .desc("Number of incorrect RAS predictions.")
         ;
+
+    RASOverflows
+        .name(name() + ".RASOverflows")
+        .desc("Number of calls that overwrote the oldest RAS entry")
+        ;
+
+    RASUnderflows
+        .name(name() + ".RASUnderflows")
+        .desc("Number of returns predicted from an empty RAS")
+        ;
+
+    RASCorrupted
+        .name(name() + ".RASCorrupted")
+        .desc("Number of returns mispredicted from a non-empty RAS")
+        ;
+
+    indirectLookups
+        .name(name() + ".indirectLookups")
+        .desc("Number of indirect branches predicted, excluding returns")
+        ;
+
+    indirectHits
+        .name(name() + ".indirectHits")
+        .desc("Number of targets from the indirect predictor")
+        ;
+
+    indirectIncorrect
+        .name(name() + ".indirectIncorrect")
+        .desc("Number of indirect branches predicted incorrectly, "
+              "excluding returns")
+        ;
+
+    indirectIncorrectShare
+        .name(name() + ".indirectIncorrectShare")
+        .desc("Fraction of incorrect predictions from indirect branches")
+        .precision(6)
+        ;
+    indirectIncorrectShare = indirectIncorrect / condIncorrect;
+
+    const HistoryPoolBase &pool = historyPool ? *historyPool : noHistoryPool;
+
+    historyPeakOutstanding
+        .name(name() + ".historyPeakOutstanding")
+        .desc("Peak number of outstanding predictor history records")
+        .scalar(pool.peakOutstanding)
+        ;
+
+    historyCapacity
+        .name(name() + ".historyCapacity")
+        .desc("Number of predictor history records allocated")
+        .scalar(pool.capacity)
+        ;
+
+    if (shadows)
+        shadows->regStats();
 }
 
 template <class Impl>
@@ -140,6 +188,24 @@ BPredUnit<Impl>::switchOut()
     }
 }
 
+template <class Impl>
+void
+BPredUnit<Impl>::serialize(std::ostream &os)
+{
+    BTB.serialize("BTB", os);
+    for (int i = 0; i < Impl::MaxThreads; ++i)
+        RAS[i].serialize(csprintf("RAS%d", i), os);
+}
+
+template <class Impl>
+void
+BPredUnit<Impl>::unserialize(Checkpoint *cp, const std::string &section)
+{
+    BTB.unserialize("BTB", cp, section);
+    for (int i = 0; i < Impl::MaxThreads; ++i)
+        RAS[i].unserialize(csprintf("RAS%d", i), cp, section);
+}
+
 template <class Impl>
 void
 BPredUnit<Impl>::takeOverFrom()
@@ -191,6 +257,14 @@ BPredUnit<Impl>::predict(DynInstPtr &inst, TheISA::PCState &pc, ThreadID tid)
 
     PredictorHistory predict_record(inst->seqNum, pc.instAddr(),
                                     pred_taken, bp_history, tid);
+    predict_record.wasUncond = inst->isUncondCtrl();
+    predict_record.wasIndirect = inst->isIndirectCtrl() && !inst->isReturn();
+
+    if (predict_record.wasIndirect)
+        ++indirectLookups;
+
+    if (inst->isCall() || inst->isReturn())
+        predict_record.RASState = RAS[tid].save();
 
     // Now lookup in the BTB or RAS.
     if (pred_taken) {
@@ -202,21 +276,21 @@ BPredUnit<Impl>::predict(DynInstPtr &inst, TheISA::PCState &pc, ThreadID tid)
             TheISA::PCState rasTop = RAS[tid].top();
             target = TheISA::buildRetPC(pc, rasTop);
 
-            // Record the top entry of the RAS, and its index.
             predict_record.usedRAS = true;
-            predict_record.RASIndex = RAS[tid].topIdx();
-            predict_record.RASTarget = rasTop;
 
-            RAS[tid].pop();
+            if (RAS[tid].pop())
+                ++RASUnderflows;
 
             DPRINTF(Fetch, "BranchPred: [tid:%i]: Instruction %s is a return, "
                     "RAS predicted target: %s, RAS index: %i.\n",
-                    tid, inst->pcState(), target, predict_record.RASIndex);
+                    tid, inst->pcState(), target,
+                    predict_record.RASState.tos);
         } else {
             ++BTBLookups;
 
             if (inst->isCall()) {
-                RAS[tid].push(pc);
+                if (RAS[tid].push(pc))
+                    ++RASOverflows;
                 predict_record.pushedRAS = true;
                 // Record that it was a call so that the top RAS entry can
                 // be popped off if the speculation is incorrect.
@@ -227,7 +301,15 @@ BPredUnit<Impl>::predict(DynInstPtr &inst, TheISA::PCState &pc, ThreadID tid)
                         tid, inst->pcState(), pc, RAS[tid].topIdx());
             }
 
-            if (BTB.valid(pc.instAddr(), tid)) {
+            if (indirect && predict_record.wasIndirect &&
+                indirect->lookup(pc.instAddr(), target,
+                                 predict_record.indirectHistory)) {
+                ++indirectHits;
+
+                DPRINTF(Fetch, "BranchPred: [tid:%i]: Instruction %s "
+                        "indirect predictor predicted target is %s.\n",
+                        tid, inst->pcState(), target);
+            } else if (BTB.valid(pc.instAddr(), tid)) {
                 ++BTBHits;
                 predict_record.validBTB = true;
 
@@ -250,7 +332,7 @@ BPredUnit<Impl>::predict(DynInstPtr &inst, TheISA::PCState &pc, ThreadID tid)
                               " called for %s\n",
                               tid, inst->seqNum, inst->pcState());
                 } else if (inst->isCall() && !inst->isUncondCtrl()) {
-                      RAS[tid].pop();
+                      RAS[tid].restore(predict_record.RASState);
                       predict_record.pushedRAS = false;
                 }
                 TheISA::advancePC(target, inst->staticInst);
@@ -264,6 +346,10 @@ BPredUnit<Impl>::predict(DynInstPtr &inst, TheISA::PCState &pc, ThreadID tid)
         TheISA::advancePC(target, inst->staticInst);
     }
 
+    if (predict_record.indirectHistory && pred_taken)
+        indirect->recordTarget(predict_record.indirectHistory, target);
+
+    predict_record.target = target;
     pc = target;
 
     predHist[tid].push_front(predict_record);
@@ -283,10 +369,32 @@ BPredUnit<Impl>::update(const InstSeqNum &done_sn, ThreadID tid)
 
     while (!predHist[tid].empty() &&
            predHist[tid].back().seqNum <= done_sn) {
-        // Update the branch predictor with the correct results.
-        BPUpdate(predHist[tid].back().pc,
-                 predHist[tid].back().predTaken,
-                 predHist[tid].back().bpHistory, false);
+        // A mispredicted branch trained the predictor when it was
+        // squashed, and is only left to train the shadow predictors in
+        // commit order.
+        if (!predHist[tid].back().resolved) {
+            if (profiler) {
+                profiler->record(predHist[tid].back().pc, false,
+                    bpred->lowConfidence(predHist[tid].back().bpHistory));
+            }
+
+            // Update the branch predictor with the correct results.
+            BPUpdate(predHist[tid].back().pc,
+                     predHist[tid].back().predTaken,
+                     predHist[tid].back().bpHistory, false);
+
+            if (predHist[tid].back().indirectHistory) {
+                indirect->update(predHist[tid].back().indirectHistory,
+                                 predHist[tid].back().predTaken,
+                                 predHist[tid].back().target, false);
+            }
+        }
+
+        if (shadows) {
+            shadows->update(predHist[tid].back().pc,
+                            predHist[tid].back().predTaken,
+                            predHist[tid].back().wasUncond);
+        }
 
         predHist[tid].pop_back();
     }
@@ -300,23 +408,24 @@ BPredUnit<Impl>::squash(const InstSeqNum &squashed_sn, ThreadID tid)
 
     while (!pred_hist.empty() &&
            pred_hist.front().seqNum > squashed_sn) {
-        if (pred_hist.front().usedRAS) {
-            DPRINTF(Fetch, "BranchPred: [tid:%i]: Restoring top of RAS to: %i,"
-                    " target: %s.\n", tid,
-                    pred_hist.front().RASIndex, pred_hist.front().RASTarget);
-
-            RAS[tid].restore(pred_hist.front().RASIndex,
-                             pred_hist.front().RASTarget);
-        } else if(pred_hist.front().wasCall && pred_hist.front().pushedRAS) {
-                 // Was a call but predicated false. Pop RAS here
-                 DPRINTF(Fetch, "BranchPred: [tid: %i] Squashing"
-                         "  Call [sn:%i] PC: %s Popping RAS\n", tid,
-                         pred_hist.front().seqNum, pred_hist.front().pc);
-                 RAS[tid].pop();
-           }
+        // Branches are undone youngest first, so each one puts the RAS
+        // back exactly as it found it.
+        if (pred_hist.front().usedRAS || pred_hist.front().pushedRAS) {
+            DPRINTF(Fetch, "BranchPred: [tid:%i]: Restoring top of RAS to: "
+                    "%i for [sn:%i].\n", tid,
+                    pred_hist.front().RASState.tos,
+                    pred_hist.front().seqNum);
+
+            RAS[tid].restore(pred_hist.front().RASState);
+        }
+
+        // This call should delete the bpHistory, unless the predictor
+        // already took it back when the branch was found mispredicted.
+        if (!pred_hist.front().resolved)
+            BPSquash(pred_hist.front().bpHistory);
 
-        // This call should delete the bpHistory.
-        BPSquash(pred_hist.front().bpHistory);
+        if (pred_hist.front().indirectHistory)
+            indirect->squash(pred_hist.front().indirectHistory);
 
         DPRINTF(Fetch, "BranchPred: [tid:%i]: Removing history for [sn:%i] "
                 "PC %s.\n", tid, pred_hist.front().seqNum,
@@ -379,10 +488,26 @@ BPredUnit<Impl>::squash(const InstSeqNum &squashed_sn,
 
         if ((*hist_it).usedRAS) {
             ++RASIncorrect;
+            if (actually_taken && (*hist_it).RASState.usedEntries > 0)
+                ++RASCorrupted;
+        }
+
+        if ((*hist_it).wasIndirect) {
+            ++indirectIncorrect;
+        }
+
+        if (profiler) {
+            profiler->record((*hist_it).pc, true,
+                             bpred->lowConfidence((*hist_it).bpHistory));
         }
 
         BPUpdate((*hist_it).pc, actually_taken,
                  pred_hist.front().bpHistory, true);
+
+        if ((*hist_it).indirectHistory) {
+            indirect->update((*hist_it).indirectHistory, actually_taken,
+                             corrTarget, true);
+        }
         if (actually_taken) {
             if (hist_it->wasReturn && !hist_it->usedRAS) {
                  DPRINTF(Fetch, "BranchPred: [tid: %i] Incorrectly predicted"
@@ -398,31 +523,28 @@ BPredUnit<Impl>::squash(const InstSeqNum &squashed_sn,
 
         } else {
            //Actually not Taken
-           if (hist_it->usedRAS) {
+           if (hist_it->usedRAS || hist_it->pushedRAS) {
                 DPRINTF(Fetch,"BranchPred: [tid: %i] Incorrectly predicted"
-                           "  return [sn:%i] PC: %s Restoring RAS\n", tid,
+                           "  %s [sn:%i] PC: %s Restoring RAS\n", tid,
+                           hist_it->usedRAS ? "return" : "call",
                            hist_it->seqNum, hist_it->pc);
                 DPRINTF(Fetch, "BranchPred: [tid:%i]: Restoring top of RAS"
-                               " to: %i, target: %s.\n", tid,
-                              hist_it->RASIndex, hist_it->RASTarget);
-                RAS[tid].restore(hist_it->RASIndex, hist_it->RASTarget);
-
-           } else if (hist_it->wasCall && hist_it->pushedRAS) {
-                 //Was a Call but predicated false. Pop RAS here
-                 DPRINTF(Fetch, "BranchPred: [tid: %i] Incorrectly predicted"
-                           "  Call [sn:%i] PC: %s Popping RAS\n", tid,
-                           hist_it->seqNum, hist_it->pc);
-                 RAS[tid].pop();
+                               " to: %i.\n", tid, hist_it->RASState.tos);
+                RAS[tid].restore(hist_it->RASState);
            }
         }
-        DPRINTF(Fetch, "BranchPred: [tid:%i]: Removing history for [sn:%i]"
+        // Keep the branch, with its corrected outcome, until it commits,
+        // so that the shadow predictors learn it in commit order along
+        // with the older branches still in flight.
+        DPRINTF(Fetch, "BranchPred: [tid:%i]: Resolving history for [sn:%i]"
                        " PC %s  Actually Taken: %i\n", tid, hist_it->seqNum,
                        hist_it->pc, actually_taken);
 
-        pred_hist.erase(hist_it);
-
-        DPRINTF(Fetch, "[tid:%i]: predHist.size(): %i\n", tid,
-                                         predHist[tid].size());
+        hist_it->predTaken = actually_taken;
+        hist_it->target = corrTarget;
+        hist_it->bpHistory = NULL;
+        hist_it->indirectHistory = NULL;
+        hist_it->resolved = true;
     }
 }
 
@@ -430,49 +552,28 @@ template <class Impl>
 void
 BPredUnit<Impl>::BPUncond(void * &bp_history)
 {
-    // Only the tournament predictor cares about unconditional branches.
-    if (predictor == Tournament) {
-        tournamentBP->uncondBr(bp_history);
-    }
+    bpred->uncondBr(bp_history);
 }
 
 template <class Impl>
 void
 BPredUnit<Impl>::BPSquash(void *bp_history)
 {
-    if (predictor == Local) {
-        localBP->squash(bp_history);
-    } else if (predictor == Tournament) {
-        tournamentBP->squash(bp_history);
-    } else {
-        panic("Predictor type is unexpected value!");
-    }
+    bpred->squash(bp_history);
 }
 
 template <class Impl>
 bool
 BPredUnit<Impl>::BPLookup(Addr instPC, void * &bp_history)
 {
-    if (predictor == Local) {
-        return localBP->lookup(instPC, bp_history);
-    } else if (predictor == Tournament) {
-        return tournamentBP->lookup(instPC, bp_history);
-    } else {
-        panic("Predictor type is unexpected value!");
-    }
+    return bpred->lookup(instPC, bp_history);
 }
 
 template <class Impl>
 void
 BPredUnit<Impl>::BPBTBUpdate(Addr instPC, void * &bp_history)
 {
-    if (predictor == Local) {
-        return localBP->BTBUpdate(instPC, bp_history);
-    } else if (predictor == Tournament) {
-        return tournamentBP->BTBUpdate(instPC, bp_history);
-    } else {
-        panic("Predictor type is unexpected value!");
-    }
+    bpred->BTBUpdate(instPC, bp_history);
 }
 
 template <class Impl>
@@ -480,13 +581,7 @@ void
 BPredUnit<Impl>::BPUpdate(Addr instPC, bool taken, void *bp_history,
                  bool squashed)
 {
-    if (predictor == Local) {
-        localBP->update(instPC, taken, bp_history);
-    } else if (predictor == Tournament) {
-        tournamentBP->update(instPC, taken, bp_history, squashed);
-    } else {
-        panic("Predictor type is unexpected value!");
-    }
+    bpred->update(instPC, taken, bp_history, squashed);
 }
 
 template <class Impl>
@@ -1082,6 +1082,8 @@ FullO3CPU<Impl>::serialize(std::ostream &os)
     BaseCPU::serialize(os);
     nameOut(os, csprintf("%s.tickEvent", name()));
     tickEvent.serialize(os);
+    nameOut(os, csprintf("%s.bpred", name()));
+    fetch.serialize(os);
 
     // Use SimpleThread's ability to checkpoint to make it easier to
     // write out the registers.  Also make this static so it doesn't
@@ -1105,6 +1107,11 @@ FullO3CPU<Impl>::unserialize(Checkpoint *cp, const std::string &section)
     BaseCPU::unserialize(cp, section);
     tickEvent.unserialize(cp, csprintf("%s.tickEvent", section));
 
+    // Checkpoints from other CPU models have no BTB or RAS to restore.
+    std::string bpred_section = csprintf("%s.bpred", section);
+    if (cp->sectionExists(bpred_section))
+        fetch.unserialize(cp, bpred_section);
+
     // Use SimpleThread's ability to checkpoint to make it easier to
     // read in the registers.  Also make this static so it doesn't
     // get instantiated multiple times (causes a panic in statistics).
@@ -238,6 +238,12 @@ class DefaultFetch
     /** Takes over from another CPU's thread. */
     void takeOverFrom();
 
+    /** Writes the branch prediction unit's state to a checkpoint. */
+    void serialize(std::ostream &os);
+
+    /** Restores the branch prediction unit's state from a checkpoint. */
+    void unserialize(Checkpoint *cp, const std::string &section);
+
     /** Checks if the fetch stage is switched out. */
     bool isSwitchedOut() { return switchedOut; }
 
@@ -452,6 +452,20 @@ DefaultFetch<Impl>::takeOverFrom()
     branchPred.takeOverFrom();
 }
 
+template <class Impl>
+void
+DefaultFetch<Impl>::serialize(std::ostream &os)
+{
+    branchPred.serialize(os);
+}
+
+template <class Impl>
+void
+DefaultFetch<Impl>::unserialize(Checkpoint *cp, const std::string &section)
+{
+    branchPred.unserialize(cp, section);
+}
+
 template <class Impl>
 void
 DefaultFetch<Impl>::wakeFromQuiesce()
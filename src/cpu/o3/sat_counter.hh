@@ -102,6 +102,12 @@ class SatCounter
         }
     }
 
+    /**
+     * Sets the counter's value, saturating it at the maximum.
+     */
+    void set(uint8_t val)
+    { counter = val > maxVal ? maxVal : val; }
+
     /**
      * Read the counter's value.
      */
@@ -34,12 +34,11 @@
 #include "cpu/pred/2bit_local.hh"
 #include "debug/Fetch.hh"
 
-LocalBP::LocalBP(unsigned _localPredictorSize,
-                 unsigned _localCtrBits,
-                 unsigned _instShiftAmt)
-    : localPredictorSize(_localPredictorSize),
-      localCtrBits(_localCtrBits),
-      instShiftAmt(_instShiftAmt)
+LocalBP::LocalBP(const Params *params)
+    : BPredictor(params),
+      localPredictorSize(params->localPredictorSize),
+      localCtrBits(params->localCtrBits),
+      instShiftAmt(params->instShiftAmt)
 {
     if (!isPowerOf2(localPredictorSize)) {
         fatal("Invalid local predictor size!\n");
@@ -60,7 +59,7 @@ LocalBP::LocalBP(unsigned _localPredictorSize,
     localCtrs.resize(localPredictorSets);
 
     for (unsigned i = 0; i < localPredictorSets; ++i)
-        localCtrs[i].setBits(_localCtrBits);
+        localCtrs[i].setBits(localCtrBits);
 
     DPRINTF(Fetch, "Branch predictor: local predictor size: %i\n",
             localPredictorSize);
@@ -119,7 +118,8 @@ LocalBP::lookup(Addr &branch_addr, void * &bp_history)
 }
 
 void
-LocalBP::update(Addr &branch_addr, bool taken, void *bp_history)
+LocalBP::update(Addr &branch_addr, bool taken, void *bp_history,
+                bool squashed)
 {
     assert(bp_history == NULL);
     unsigned local_predictor_idx;
@@ -153,3 +153,21 @@ LocalBP::getLocalIndex(Addr &branch_addr)
 {
     return (branch_addr >> instShiftAmt) & indexMask;
 }
+
+void
+LocalBP::serialize(std::ostream &os)
+{
+    serializeCounters(os, "localCtrs", localCtrs);
+}
+
+void
+LocalBP::unserialize(Checkpoint *cp, const std::string &section)
+{
+    unserializeCounters(cp, section, "localCtrs", localCtrs);
+}
+
+LocalBP *
+LocalBPParams::create()
+{
+    return new LocalBP(this);
+}
@@ -47,6 +47,8 @@
 
 #include "base/types.hh"
 #include "cpu/o3/sat_counter.hh"
+#include "cpu/pred/branch_predictor.hh"
+#include "params/LocalBP.hh"
 
 /**
  * Implements a local predictor that uses the PC to index into a table of
@@ -55,17 +57,17 @@
  * predictor state that needs to be recorded or updated; the update can be
  * determined solely by the branch being taken or not taken.
  */
-class LocalBP
+class LocalBP : public BPredictor
 {
   public:
+    typedef LocalBPParams Params;
+
     /**
      * Default branch predictor constructor.
-     * @param localPredictorSize Size of the local predictor.
-     * @param localCtrBits Number of bits per counter.
-     * @param instShiftAmt Offset amount for instructions to ignore alignment.
+     * @param params The params object, with the size of the predictor,
+     * its counters and the instruction shift amount.
      */
-    LocalBP(unsigned localPredictorSize, unsigned localCtrBits,
-            unsigned instShiftAmt);
+    LocalBP(const Params *params);
 
     /**
      * Looks up the given address in the branch predictor and returns
@@ -90,13 +92,20 @@ class LocalBP
      * @param branch_addr The address of the branch to update.
      * @param taken Whether or not the branch was taken.
      */
-    void update(Addr &branch_addr, bool taken, void *bp_history);
+    void update(Addr &branch_addr, bool taken, void *bp_history,
+                bool squashed);
 
     void squash(void *bp_history)
     { assert(bp_history == NULL); }
 
     void reset();
 
+    /** Writes the predictor tables and history to a checkpoint. */
+    void serialize(std::ostream &os);
+
+    /** Restores the predictor tables and history from a checkpoint. */
+    void unserialize(Checkpoint *cp, const std::string &section);
+
   private:
     /**
      *  Returns the taken/not taken prediction given the value of the
@@ -0,0 +1,99 @@
+from m5.SimObject import SimObject
+from m5.params import *
+
+class BTBReplacementPolicy(Enum): vals = ['LRU', 'Random', 'PLRU']
+
+class BranchPredictor(SimObject):
+    type = 'BranchPredictor'
+    # The InOrder CPU has a resource class called BranchPredictor
+    cxx_class = 'BPredictor'
+    abstract = True
+
+class LocalBP(BranchPredictor):
+    type = 'LocalBP'
+    localPredictorSize = Param.Unsigned(2048, "Size of local predictor")
+    localCtrBits = Param.Unsigned(2, "Bits per counter")
+    instShiftAmt = Param.Unsigned(2, "Number of bits to shift instructions by")
+
+class TournamentBP(BranchPredictor):
+    type = 'TournamentBP'
+    localPredictorSize = Param.Unsigned(2048, "Size of local predictor")
+    localCtrBits = Param.Unsigned(2, "Bits per counter")
+    localHistoryTableSize = Param.Unsigned(2048, "Size of local history table")
+    localHistoryBits = Param.Unsigned(11, "Bits for the local history")
+    globalPredictorSize = Param.Unsigned(8192, "Size of global predictor")
+    globalCtrBits = Param.Unsigned(2, "Bits per counter")
+    globalHistoryBits = Param.Unsigned(13, "Bits of history")
+    choicePredictorSize = Param.Unsigned(8192, "Size of choice predictor")
+    choiceCtrBits = Param.Unsigned(2, "Bits of choice counters")
+    instShiftAmt = Param.Unsigned(2, "Number of bits to shift instructions by")
+
+class GshareBP(BranchPredictor):
+    type = 'GshareBP'
+    globalPredictorSize = Param.Unsigned(8192, "Size of global predictor")
+    globalCtrBits = Param.Unsigned(2, "Bits per counter")
+    globalHistoryBits = Param.Unsigned(13, "Bits of history")
+
+class HybridpgBP(BranchPredictor):
+    type = 'HybridpgBP'
+    globalPredictorSize = Param.Unsigned(8192,
+        "Storage budget of the perceptron table")
+    globalHistoryBits = Param.Unsigned(13, "Bits of history")
+    weightBits = Param.Unsigned(8, "Bits per perceptron weight")
+    theta = Param.Int(0,
+        "Initial training threshold (0 picks it from globalHistoryBits)")
+    adaptiveTheta = Param.Bool(True,
+        "Fit the training threshold to the mispredictions (O-GEHL)")
+    thetaCtrBits = Param.Unsigned(7, "Bits of the threshold fitting counter")
+
+class PerceptronBP(BranchPredictor):
+    type = 'PerceptronBP'
+    # PerceptronBP is the C++ class of a single perceptron
+    cxx_class = 'PerceptronBP_Top'
+    globalPredictorSize = Param.Unsigned(8192,
+        "Storage budget of the perceptron table")
+    globalHistoryBits = Param.Unsigned(13, "Bits of history")
+    weightBits = Param.Unsigned(8, "Bits per perceptron weight")
+    theta = Param.Int(0,
+        "Initial training threshold (0 picks it from globalHistoryBits)")
+    adaptiveTheta = Param.Bool(True,
+        "Fit the training threshold to the mispredictions (O-GEHL)")
+    thetaCtrBits = Param.Unsigned(7, "Bits of the threshold fitting counter")
+
+class HashedPerceptronBP(BranchPredictor):
+    type = 'HashedPerceptronBP'
+    numTables = Param.Unsigned(8,
+        "Number of weight tables, including the bias table")
+    tableEntries = Param.Unsigned(1024, "Number of weights in each table")
+    globalHistoryBits = Param.Unsigned(64,
+        "Bits of history, split across the tables")
+    theta = Param.Int(0, "Training threshold (0 picks it from numTables)")
+    instShiftAmt = Param.Unsigned(2, "Number of bits to shift instructions by")
+
+class TAGEBP(BranchPredictor):
+    type = 'TAGEBP'
+    bimodalEntries = Param.Unsigned(4096, "Size of the bimodal table")
+    bimodalCtrBits = Param.Unsigned(2, "Bits per bimodal counter")
+    numTables = Param.Unsigned(7, "Number of tagged tables")
+    tableEntries = Param.Unsigned(1024, "Number of entries per tagged table")
+    tagBits = Param.Unsigned(9, "Bits per partial tag")
+    ctrBits = Param.Unsigned(3, "Bits per tagged table counter")
+    usefulBits = Param.Unsigned(2, "Bits per usefulness counter")
+    minHistory = Param.Unsigned(5, "History length of the first tagged table")
+    globalHistoryBits = Param.Unsigned(130,
+        "History length of the last tagged table")
+    usefulResetPeriod = Param.Unsigned(256 * 1024,
+        "Conditional branches between usefulness counter decays")
+    instShiftAmt = Param.Unsigned(2, "Number of bits to shift instructions by")
+
+class LoopBP(BranchPredictor):
+    type = 'LoopBP'
+    basePredictor = Param.BranchPredictor(TournamentBP(),
+        "Predictor overridden when the loop predictor is confident")
+    loopTableEntries = Param.Unsigned(64, "Size of the loop table")
+    tagBits = Param.Unsigned(14, "Bits per partial tag")
+    iterBits = Param.Unsigned(10, "Bits per iteration count")
+    confidenceBits = Param.Unsigned(2,
+        "Bits per confidence counter; a saturated counter overrides")
+    ageBits = Param.Unsigned(3, "Bits per replacement age counter")
+    instShiftAmt = Param.Unsigned(2, "Number of bits to shift instructions by")
@@ -0,0 +1,10 @@
+from m5.SimObject import SimObject
+from m5.params import *
+
+class BranchProfiler(SimObject):
+    type = 'BranchProfiler'
+    file = Param.String("branch_profile.txt",
+        "File in the output directory to write the profile to")
+    size = Param.Unsigned(1024,
+        "Number of static branches tracked; when full, the branch with "
+        "the fewest mispredictions is replaced")
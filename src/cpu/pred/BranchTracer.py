@@ -0,0 +1,13 @@
+from m5.SimObject import SimObject
+from m5.params import *
+
+class BranchTracer(SimObject):
+    type = 'BranchTracer'
+    file = Param.String("branch.trace",
+        "File in the output directory to write the branch trace to")
+    recordSeqNum = Param.Bool(False,
+        "Record the sequence number of each branch")
+    recordTick = Param.Bool(False,
+        "Record the tick each branch was resolved at")
+    bufferRecords = Param.Unsigned(4096,
+        "Number of records buffered before writing to the trace")
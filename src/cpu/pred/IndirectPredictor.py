@@ -0,0 +1,19 @@
+from m5.SimObject import SimObject
+from m5.params import *
+
+class IndirectPredictor(SimObject):
+    type = 'IndirectPredictor'
+    baseEntries = Param.Unsigned(1024,
+        "Size of the PC-indexed base target table")
+    numTables = Param.Unsigned(5, "Number of tagged target tables")
+    tableEntries = Param.Unsigned(256, "Number of entries per tagged table")
+    tagBits = Param.Unsigned(11, "Bits per partial tag")
+    ctrBits = Param.Unsigned(2, "Bits per target confidence counter")
+    minHistory = Param.Unsigned(4, "History length of the first tagged table")
+    pathHistoryBits = Param.Unsigned(64,
+        "History length of the last tagged table")
+    bitsPerTarget = Param.Unsigned(2,
+        "Path history bits shifted in for each taken indirect branch")
+    usefulResetPeriod = Param.Unsigned(64 * 1024,
+        "Indirect branches between usefulness bit resets")
+    instShiftAmt = Param.Unsigned(2, "Number of bits to shift instructions by")
@@ -0,0 +1,17 @@
+/*
+ * Python interface to the trace-driven branch predictor replay.
+ */
+
+%module(package="m5.internal") bpred_replay
+
+%{
+#include "cpu/pred/trace_replay.hh"
+%}
+
+%include <std_string.i>
+%include <stdint.i>
+
+// Lets replays be built on the C++ object of a BranchPredictor SimObject
+%import "python/m5/internal/param_BranchPredictor.i"
+
+%include "cpu/pred/trace_replay.hh"
@@ -0,0 +1,44 @@
+/*
+ * Common interface of the direction predictors in src/cpu/pred.
+ */
+
+#include "cpu/pred/branch_predictor.hh"
+
+bool
+BPredictor::warm(Addr branch_addr, bool taken, bool uncond)
+{
+    void *bp_history = NULL;
+
+    if (uncond) {
+        uncondBr(bp_history);
+        update(branch_addr, true, bp_history, false);
+        return true;
+    }
+
+    bool pred_taken = lookup(branch_addr, bp_history);
+    // A mispredicted branch is corrected through the squash path,
+    // exactly once, and never reaches commit.
+    update(branch_addr, taken, bp_history, pred_taken != taken);
+    return pred_taken == taken;
+}
+
+void
+BPredictor::serializeCounters(std::ostream &os, const std::string &name,
+                              const std::vector<SatCounter> &ctrs)
+{
+    std::vector<uint8_t> values(ctrs.size());
+    for (unsigned i = 0; i < ctrs.size(); ++i)
+        values[i] = ctrs[i].read();
+    arrayParamOut(os, name, values);
+}
+
+void
+BPredictor::unserializeCounters(Checkpoint *cp, const std::string &section,
+                                const std::string &name,
+                                std::vector<SatCounter> &ctrs)
+{
+    std::vector<uint8_t> values(ctrs.size());
+    unserializeTable(cp, section, name, values);
+    for (unsigned i = 0; i < ctrs.size(); ++i)
+        ctrs[i].set(values[i]);
+}
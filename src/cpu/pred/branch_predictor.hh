@@ -0,0 +1,159 @@
+/*
+ * Common interface of the direction predictors in src/cpu/pred.
+ */
+
+#ifndef __CPU_PRED_BRANCH_PREDICTOR_HH__
+#define __CPU_PRED_BRANCH_PREDICTOR_HH__
+
+#include <iosfwd>
+#include <string>
+#include <vector>
+
+#include "base/misc.hh"
+#include "base/types.hh"
+#include "cpu/o3/sat_counter.hh"
+#include "cpu/pred/history_pool.hh"
+#include "params/BranchPredictor.hh"
+#include "sim/serialize.hh"
+#include "sim/sim_object.hh"
+
+/**
+ * Restores an array written with arrayParamOut().  The array in the
+ * checkpoint must be the same size as table, so restoring a checkpoint
+ * into a differently sized predictor is an error instead of silently
+ * resizing its tables.
+ * @param owner Name of the object restoring the table, for the error.
+ */
+template <class T>
+void
+unserializeTable(const std::string &owner, Checkpoint *cp,
+                 const std::string &section, const std::string &table_name,
+                 std::vector<T> &table)
+{
+    std::vector<T> restored;
+    arrayParamIn(cp, section, table_name, restored);
+    if (restored.size() != table.size()) {
+        fatal("%s: checkpoint has %d entries in %s, expected %d\n",
+              owner, restored.size(), table_name, table.size());
+    }
+    table.swap(restored);
+}
+
+/**
+ * Base class of the branch direction predictors the InOrder and O3
+ * BPredUnits use.  A predictor may hand back an opaque history record
+ * from lookup() and uncondBr(); the BPredUnit passes it back to exactly
+ * one call of update() with squashed unset, or to squash(), after which
+ * the predictor owns it again.
+ *
+ * The Python class is BranchPredictor, but the InOrder CPU already has
+ * a resource of that name, so the C++ class is BPredictor.
+ *
+ * Predictors checkpoint their tables and histories through the usual
+ * SimObject serialize() and unserialize().  Checkpoints are only taken
+ * once the CPU has drained, so no history records are in flight and
+ * the speculative histories equal the committed ones.
+ */
+class BPredictor : public SimObject
+{
+  public:
+    typedef BranchPredictorParams Params;
+
+    BPredictor(const Params *p)
+        : SimObject(p)
+    { }
+
+    virtual ~BPredictor() { }
+
+    /**
+     * Looks up the given address in the branch predictor and returns
+     * a true/false value as to whether it is taken.
+     * @param branch_addr The address of the branch to look up.
+     * @param bp_history Set to the history record of this branch.
+     * @return Whether or not the branch is taken.
+     */
+    virtual bool lookup(Addr &branch_addr, void * &bp_history) = 0;
+
+    /**
+     * Records that there was an unconditional branch.
+     * @param bp_history Set to the history record of this branch.
+     */
+    virtual void uncondBr(void * &bp_history) { }
+
+    /**
+     * Updates the branch predictor to Not Taken if a BTB entry is
+     * invalid or not found.
+     * @param branch_addr The address of the branch to look up.
+     * @param bp_history The history record of this branch.
+     */
+    virtual void BTBUpdate(Addr &branch_addr, void * &bp_history) { }
+
+    /**
+     * Updates the branch predictor with the actual result of a branch.
+     * @param branch_addr The address of the branch to update.
+     * @param taken Whether or not the branch was taken.
+     * @param bp_history The history record of this branch.
+     * @param squashed Set when the branch was mispredicted and younger
+     * branches have been squashed.
+     */
+    virtual void update(Addr &branch_addr, bool taken, void *bp_history,
+                        bool squashed) = 0;
+
+    /**
+     * Restores the predictor state a branch changed on a squash.
+     * @param bp_history The history record of the squashed branch.
+     */
+    virtual void squash(void *bp_history) = 0;
+
+    /**
+     * Returns the occupancy counters of the history record pool, or
+     * NULL if the predictor keeps no history records.
+     */
+    virtual const HistoryPoolBase *getHistoryPool() const { return NULL; }
+
+    /**
+     * Returns whether a prediction was made with low confidence, for
+     * profiling.  It must be called before the history record is passed
+     * to update() or squash().  Predictors that do not estimate their
+     * confidence always return false.
+     * @param bp_history The history record of the branch.
+     */
+    virtual bool lowConfidence(const void *bp_history) const
+    { return false; }
+
+    /**
+     * Trains the predictor with a branch whose outcome is already known,
+     * as a trace replay or a functional CPU does.  The branch is looked
+     * up and then updated right away, through the squash path if it was
+     * mispredicted, so no history record is left outstanding.
+     * @param branch_addr The address of the branch.
+     * @param taken Whether or not the branch was taken.
+     * @param uncond Whether the branch is unconditional.
+     * @return Whether the predicted direction was correct.
+     */
+    bool warm(Addr branch_addr, bool taken, bool uncond);
+
+  protected:
+    /** Writes a table of saturating counters to a checkpoint. */
+    static void serializeCounters(std::ostream &os, const std::string &name,
+                                  const std::vector<SatCounter> &ctrs);
+
+    /**
+     * Restores a table written by serializeCounters().  The table in the
+     * checkpoint must be the same size as ctrs.
+     */
+    void unserializeCounters(Checkpoint *cp, const std::string &section,
+                             const std::string &name,
+                             std::vector<SatCounter> &ctrs);
+
+    /** Restores an array with the free unserializeTable(). */
+    template <class T>
+    void unserializeTable(Checkpoint *cp, const std::string &section,
+                          const std::string &table_name,
+                          std::vector<T> &table)
+    {
+        ::unserializeTable(name(), cp, section, table_name, table);
+    }
+};
+
+#endif // __CPU_PRED_BRANCH_PREDICTOR_HH__
@@ -0,0 +1,191 @@
+/*
+ * Per static branch profile of executions and mispredictions.
+ */
+
+#include <algorithm>
+
+#include "base/callback.hh"
+#include "base/cprintf.hh"
+#include "base/misc.hh"
+#include "base/output.hh"
+#include "base/statistics.hh"
+#include "cpu/pred/branch_profiler.hh"
+#include "sim/core.hh"
+
+BranchProfiler::BranchProfiler(const Params *p)
+    : SimObject(p), stream(simout.create(p->file)), size(p->size),
+      totalExecutions(0), totalMispredicts(0), dumpCount(0)
+{
+    if (size == 0)
+        fatal("%s: the branch profile must have at least one entry\n",
+              name());
+
+    heap.reserve(size);
+
+    Stats::registerDumpCallback(
+        new MakeCallback<BranchProfiler, &BranchProfiler::dump>(this));
+    Stats::registerResetCallback(
+        new MakeCallback<BranchProfiler, &BranchProfiler::reset>(this));
+}
+
+BranchProfiler::~BranchProfiler()
+{
+    if (stream)
+        simout.close(stream);
+}
+
+void
+BranchProfiler::record(Addr pc, bool mispredicted, bool low_confidence)
+{
+    ++totalExecutions;
+    if (mispredicted)
+        ++totalMispredicts;
+
+    m5::hash_map<Addr, unsigned>::iterator it = index.find(pc);
+    if (it != index.end()) {
+        Entry &entry = heap[it->second];
+        ++entry.executions;
+        if (low_confidence)
+            ++entry.lowConfidence;
+        if (mispredicted) {
+            ++entry.mispredicts;
+            siftDown(it->second);
+        }
+        return;
+    }
+
+    // Untracked branches only matter once they mispredict.
+    if (!mispredicted)
+        return;
+
+    Entry entry;
+    entry.pc = pc;
+    entry.executions = 1;
+    entry.lowConfidence = low_confidence ? 1 : 0;
+
+    if (heap.size() < size) {
+        entry.mispredicts = 1;
+        entry.error = 0;
+        heap.push_back(entry);
+        index[pc] = heap.size() - 1;
+        siftUp(heap.size() - 1);
+        return;
+    }
+
+    // Replace the entry with the fewest mispredictions, inheriting its
+    // count as the error bound.
+    index.erase(heap[0].pc);
+    entry.error = heap[0].mispredicts;
+    entry.mispredicts = entry.error + 1;
+    heap[0] = entry;
+    index[pc] = 0;
+    siftDown(0);
+}
+
+void
+BranchProfiler::swapEntries(unsigned a, unsigned b)
+{
+    if (a == b)
+        return;
+    std::swap(heap[a], heap[b]);
+    index[heap[a].pc] = a;
+    index[heap[b].pc] = b;
+}
+
+void
+BranchProfiler::siftUp(unsigned pos)
+{
+    while (pos > 0) {
+        unsigned parent = (pos - 1) / 2;
+        if (heap[parent].mispredicts <= heap[pos].mispredicts)
+            return;
+        swapEntries(pos, parent);
+        pos = parent;
+    }
+}
+
+void
+BranchProfiler::siftDown(unsigned pos)
+{
+    unsigned entries = heap.size();
+    while (true) {
+        unsigned smallest = pos;
+        unsigned left = 2 * pos + 1;
+        unsigned right = left + 1;
+        if (left < entries &&
+            heap[left].mispredicts < heap[smallest].mispredicts)
+            smallest = left;
+        if (right < entries &&
+            heap[right].mispredicts < heap[smallest].mispredicts)
+            smallest = right;
+        if (smallest == pos)
+            return;
+        swapEntries(pos, smallest);
+        pos = smallest;
+    }
+}
+
+bool
+BranchProfiler::moreMispredicts(const Entry &a, const Entry &b)
+{
+    if (a.mispredicts != b.mispredicts)
+        return a.mispredicts > b.mispredicts;
+    return a.pc < b.pc;
+}
+
+void
+BranchProfiler::dump()
+{
+    if (!stream)
+        return;
+
+    std::vector<Entry> sorted(heap);
+    std::sort(sorted.begin(), sorted.end(), moreMispredicts);
+
+    Counter tracked_mispredicts = 0;
+    for (unsigned i = 0; i < sorted.size(); ++i)
+        tracked_mispredicts += sorted[i].mispredicts - sorted[i].error;
+
+    std::ostream &os = *stream;
+    ccprintf(os, "\n---------- Begin Branch Profile %d ----------\n",
+             dumpCount);
+    ccprintf(os, "tick %d\n", curTick());
+    ccprintf(os, "branches %d\n", totalExecutions);
+    ccprintf(os, "mispredicts %d\n", totalMispredicts);
+    ccprintf(os, "tracked %d of %d\n", sorted.size(), size);
+    ccprintf(os, "trackedMispredicts %d\n", tracked_mispredicts);
+    ccprintf(os, "%-18s %14s %14s %14s %8s %8s\n", "# pc", "executions",
+             "mispredicts", "error", "rate", "lowconf");
+
+    for (unsigned i = 0; i < sorted.size(); ++i) {
+        const Entry &entry = sorted[i];
+        // Only the mispredictions counted while tracked pair up with
+        // the executions, so the rate leaves out the inherited error.
+        double rate = (double)(entry.mispredicts - entry.error) /
+            entry.executions;
+        double low_conf = (double)entry.lowConfidence / entry.executions;
+        ccprintf(os, "%#-18x %14d %14d %14d %8.4f %8.4f\n", entry.pc,
+                 entry.executions, entry.mispredicts, entry.error, rate,
+                 low_conf);
+    }
+
+    ccprintf(os, "---------- End Branch Profile %d ----------\n", dumpCount);
+    os.flush();
+
+    ++dumpCount;
+}
+
+void
+BranchProfiler::reset()
+{
+    heap.clear();
+    index.clear();
+    totalExecutions = 0;
+    totalMispredicts = 0;
+}
+
+BranchProfiler *
+BranchProfilerParams::create()
+{
+    return new BranchProfiler(this);
+}
@@ -0,0 +1,110 @@
+/*
+ * Per static branch profile of executions and mispredictions.
+ */
+
+#ifndef __CPU_PRED_BRANCH_PROFILER_HH__
+#define __CPU_PRED_BRANCH_PROFILER_HH__
+
+#include <ostream>
+#include <vector>
+
+#include "base/hashmap.hh"
+#include "base/types.hh"
+#include "params/BranchProfiler.hh"
+#include "sim/sim_object.hh"
+
+/**
+ * Counts executions, mispredictions and low confidence predictions of
+ * the static branches that mispredict most, in a table of fixed size so
+ * its memory does not grow with the length of the run.
+ *
+ * The table is managed with the space-saving algorithm (Metwally et al.,
+ * "Efficient Computation of Frequent and Top-k Elements in Data
+ * Streams"), counting mispredictions.  A branch gets an entry when it
+ * first mispredicts; if the table is full, the entry with the fewest
+ * mispredictions is handed over to it, and its count starts from that
+ * entry's.  The inherited count is kept as the error of the new entry,
+ * so a branch's true misprediction count lies between mispredicts -
+ * error and mispredicts.  Every branch that caused more than 1/size of
+ * the mispredictions is guaranteed to be in the table.  Executions are
+ * only counted while a branch holds an entry.
+ *
+ * The table is written out, sorted by mispredictions, whenever the
+ * statistics are dumped, and cleared when they are reset.
+ */
+class BranchProfiler : public SimObject
+{
+  public:
+    typedef BranchProfilerParams Params;
+    BranchProfiler(const Params *p);
+    ~BranchProfiler();
+
+    /**
+     * Counts a resolved branch.
+     * @param pc The address the direction predictor was indexed with.
+     * @param mispredicted Whether the branch was mispredicted.
+     * @param low_confidence Whether the direction predictor had low
+     * confidence in its prediction.
+     */
+    void record(Addr pc, bool mispredicted, bool low_confidence);
+
+    /** Appends the profile to the output file. */
+    void dump();
+
+    /** Clears the profile. */
+    void reset();
+
+  private:
+    struct Entry {
+        /** Address of the branch. */
+        Addr pc;
+        /** Executions counted since the branch got its entry. */
+        Counter executions;
+        /** Mispredictions, including the inherited count. */
+        Counter mispredicts;
+        /** Mispredictions inherited from the entry replaced. */
+        Counter error;
+        /** Predictions made with low confidence. */
+        Counter lowConfidence;
+    };
+
+    /** Orders entries by decreasing mispredictions for the dump. */
+    static bool moreMispredicts(const Entry &a, const Entry &b);
+
+    /** Moves a newly added entry up to its place in the heap. */
+    void siftUp(unsigned pos);
+
+    /**
+     * Restores the heap order after the mispredictions of the entry at
+     * the given position grew.
+     */
+    void siftDown(unsigned pos);
+
+    /** Swaps two entries of the heap, keeping the index in step. */
+    void swapEntries(unsigned a, unsigned b);
+
+    std::ostream *stream;
+
+    /** Maximum number of branches tracked. */
+    unsigned size;
+
+    /**
+     * The tracked branches, as a binary min-heap on mispredictions so
+     * the entry to replace is always heap[0].
+     */
+    std::vector<Entry> heap;
+
+    /** Position of each tracked branch in heap. */
+    m5::hash_map<Addr, unsigned> index;
+
+    /** Branches resolved since the last reset, tracked or not. */
+    Counter totalExecutions;
+
+    /** Mispredictions since the last reset, tracked or not. */
+    Counter totalMispredicts;
+
+    /** Number of dumps written so far. */
+    unsigned dumpCount;
+};
+
+#endif // __CPU_PRED_BRANCH_PROFILER_HH__
@@ -0,0 +1,71 @@
+/*
+ * On-disk format of branch traces, shared by BranchTracer, which writes
+ * resolved branches out, and BranchTraceReplay, which feeds them back
+ * through a direction predictor without the rest of the pipeline.  The
+ * Python reader in m5.util.branchtrace must be kept in sync with this
+ * file.
+ */
+
+#ifndef __CPU_PRED_BRANCH_TRACE_HH__
+#define __CPU_PRED_BRANCH_TRACE_HH__
+
+#include "base/types.hh"
+
+/**
+ * Header at the start of every branch trace.  It is followed by a
+ * stream of fixed-size records with no framing, so that a trace can be
+ * memory mapped and indexed directly.
+ */
+struct BranchTraceHeader
+{
+    static const char magicString[8];
+    static const uint32_t currentVersion = 1;
+
+    enum Flags {
+        /** Each record is followed by the branch's sequence number. */
+        HasSeqNum = 0x1,
+        /** Each record is followed by the tick it was resolved at. */
+        HasTick = 0x2
+    };
+
+    /** "GEM5BRTR", not NUL terminated. */
+    char magic[8];
+
+    uint32_t version;
+
+    /** Size of each record in bytes, including the optional fields. */
+    uint32_t recordSize;
+
+    /** Combination of Flags describing the optional fields. */
+    uint32_t flags;
+
+    uint32_t pad;
+};
+
+/**
+ * The fixed part of one resolved branch.  If the header says so, a
+ * uint64_t sequence number and then a uint64_t tick follow it, in
+ * that order.
+ */
+struct BranchTraceRecord
+{
+    enum Flags {
+        /** The branch was actually taken. */
+        Taken = 0x1,
+        /** The branch is an unconditional control instruction. */
+        Uncond = 0x2
+    };
+
+    /** Address the direction predictor was indexed with. */
+    uint64_t pc;
+
+    /** Resolved target (the fall-through PC if not taken). */
+    uint64_t target;
+
+    /** Combination of Flags. */
+    uint32_t flags;
+
+    uint32_t pad;
+};
+
+#endif // __CPU_PRED_BRANCH_TRACE_HH__
@@ -0,0 +1,109 @@
+/*
+ * Writes resolved branches to a binary branch trace.
+ */
+
+#include <cstring>
+
+#include "base/callback.hh"
+#include "base/output.hh"
+#include "cpu/pred/branch_trace.hh"
+#include "cpu/pred/branch_tracer.hh"
+#include "sim/core.hh"
+
+const char BranchTraceHeader::magicString[8] =
+    { 'G', 'E', 'M', '5', 'B', 'R', 'T', 'R' };
+
+BranchTracer::BranchTracer(const Params *p)
+    : SimObject(p), stream(simout.create(p->file, true)),
+      fieldFlags(0), recordSize(sizeof(BranchTraceRecord)), bufferUsed(0)
+{
+    if (p->recordSeqNum) {
+        fieldFlags |= BranchTraceHeader::HasSeqNum;
+        recordSize += sizeof(uint64_t);
+    }
+    if (p->recordTick) {
+        fieldFlags |= BranchTraceHeader::HasTick;
+        recordSize += sizeof(uint64_t);
+    }
+
+    BranchTraceHeader hdr;
+    memcpy(hdr.magic, BranchTraceHeader::magicString, sizeof(hdr.magic));
+    hdr.version = BranchTraceHeader::currentVersion;
+    hdr.recordSize = recordSize;
+    hdr.flags = fieldFlags;
+    hdr.pad = 0;
+    stream->write(reinterpret_cast<char *>(&hdr), sizeof(hdr));
+
+    buffer.resize(recordSize * p->bufferRecords);
+
+    registerExitCallback(
+        new MakeCallback<BranchTracer, &BranchTracer::close>(this));
+}
+
+BranchTracer::~BranchTracer()
+{
+    close();
+}
+
+void
+BranchTracer::record(Addr pc, Addr target, bool taken, bool uncond,
+                     InstSeqNum seq_num)
+{
+    if (!stream)
+        return;
+
+    if (bufferUsed + recordSize > buffer.size())
+        flush();
+
+    uint8_t *rec_ptr = &buffer[bufferUsed];
+
+    BranchTraceRecord rec;
+    rec.pc = pc;
+    rec.target = target;
+    rec.flags = 0;
+    if (taken)
+        rec.flags |= BranchTraceRecord::Taken;
+    if (uncond)
+        rec.flags |= BranchTraceRecord::Uncond;
+    rec.pad = 0;
+    memcpy(rec_ptr, &rec, sizeof(rec));
+    rec_ptr += sizeof(rec);
+
+    if (fieldFlags & BranchTraceHeader::HasSeqNum) {
+        uint64_t sn = seq_num;
+        memcpy(rec_ptr, &sn, sizeof(sn));
+        rec_ptr += sizeof(sn);
+    }
+    if (fieldFlags & BranchTraceHeader::HasTick) {
+        uint64_t tick = curTick();
+        memcpy(rec_ptr, &tick, sizeof(tick));
+        rec_ptr += sizeof(tick);
+    }
+
+    bufferUsed += recordSize;
+}
+
+void
+BranchTracer::flush()
+{
+    if (stream && bufferUsed) {
+        stream->write(reinterpret_cast<char *>(&buffer[0]), bufferUsed);
+        bufferUsed = 0;
+    }
+}
+
+void
+BranchTracer::close()
+{
+    if (stream) {
+        flush();
+        simout.close(stream);
+        stream = NULL;
+    }
+}
+
+BranchTracer *
+BranchTracerParams::create()
+{
+    return new BranchTracer(this);
+}
@@ -0,0 +1,62 @@
+/*
+ * Writes resolved branches to a binary branch trace.
+ */
+
+#ifndef __CPU_PRED_BRANCH_TRACER_HH__
+#define __CPU_PRED_BRANCH_TRACER_HH__
+
+#include <ostream>
+#include <vector>
+
+#include "base/types.hh"
+#include "cpu/inst_seq.hh"
+#include "params/BranchTracer.hh"
+#include "sim/sim_object.hh"
+
+/**
+ * Records every branch the predictor unit resolves, in the format
+ * described in cpu/pred/branch_trace.hh.  Records are buffered and
+ * written out in blocks; the trace is flushed when the simulator
+ * exits.
+ */
+class BranchTracer : public SimObject
+{
+  public:
+    typedef BranchTracerParams Params;
+    BranchTracer(const Params *p);
+    ~BranchTracer();
+
+    /**
+     * Appends a resolved branch to the trace.
+     * @param pc The address the direction predictor was indexed with.
+     * @param target The resolved next PC.
+     * @param taken Whether the branch was actually taken.
+     * @param uncond Whether the branch is unconditional.
+     * @param seq_num The branch's sequence number.
+     */
+    void record(Addr pc, Addr target, bool taken, bool uncond,
+                InstSeqNum seq_num);
+
+    /** Writes out any buffered records and closes the trace. */
+    void close();
+
+  private:
+    /** Writes out buffered records. */
+    void flush();
+
+    std::ostream *stream;
+
+    /** Flags from BranchTraceHeader describing the optional fields. */
+    uint32_t fieldFlags;
+
+    /** Size of each record in bytes. */
+    unsigned recordSize;
+
+    /** Records waiting to be written. */
+    std::vector<uint8_t> buffer;
+
+    /** Number of bytes used in buffer. */
+    size_t bufferUsed;
+};
+
+#endif // __CPU_PRED_BRANCH_TRACER_HH__
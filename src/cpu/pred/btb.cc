@@ -28,36 +28,54 @@
  * Authors: Kevin Lim
  */
 
+#include <algorithm>
+
+#include "base/bitfield.hh"
 #include "base/intmath.hh"
+#include "base/random.hh"
 #include "base/trace.hh"
 #include "cpu/pred/btb.hh"
 #include "debug/Fetch.hh"
 #include "debug/InOrderBPred.hh"
+#include "sim/serialize.hh"
 
 DefaultBTB::DefaultBTB(unsigned _numEntries,
                        unsigned _tagBits,
-                       unsigned _instShiftAmt)
+                       unsigned _instShiftAmt,
+                       unsigned _assoc,
+                       Enums::BTBReplacementPolicy _replPolicy)
     : numEntries(_numEntries),
+      assoc(_assoc),
       tagBits(_tagBits),
-      instShiftAmt(_instShiftAmt)
+      instShiftAmt(_instShiftAmt),
+      replPolicy(_replPolicy)
 {
     DPRINTF(Fetch, "BTB: Creating BTB object.\n");
 
-    if (!isPowerOf2(numEntries)) {
-        fatal("BTB entries is not a power of 2!");
+    if (assoc < 1 || numEntries % assoc != 0) {
+        fatal("BTB associativity must divide the number of entries!");
     }
 
-    btb.resize(numEntries);
+    numSets = numEntries / assoc;
 
-    for (unsigned i = 0; i < numEntries; ++i) {
-        btb[i].valid = false;
+    if (!isPowerOf2(numSets)) {
+        fatal("BTB number of sets is not a power of 2!");
+    }
+
+    if (replPolicy == Enums::PLRU && (!isPowerOf2(assoc) || assoc > 64)) {
+        fatal("Pseudo-LRU BTB associativity must be a power of 2 up to 64!");
     }
 
-    idxMask = numEntries - 1;
+    btb.resize(numEntries);
+    plruBits.resize(numSets);
+
+    idxMask = numSets - 1;
 
-    tagMask = (1 << tagBits) - 1;
+    tagMask = mask(tagBits);
 
-    tagShiftAmt = instShiftAmt + floorLog2(numEntries);
+    tagShiftAmt = instShiftAmt + floorLog2(numSets);
+
+    reset();
 }
 
 void
@@ -65,7 +83,29 @@ DefaultBTB::reset()
 {
     for (unsigned i = 0; i < numEntries; ++i) {
         btb[i].valid = false;
+        btb[i].lastUsed = 0;
     }
+
+    std::fill(plruBits.begin(), plruBits.end(), 0);
+    accesses = 0;
+
+    fullyAssoc.clear();
+    fullyAssocIndex.clear();
+}
+
+void
+DefaultBTB::regStats(const std::string &name)
+{
+    conflictMisses
+        .name(name + ".BTBConflictMisses")
+        .desc("Number of BTB misses a fully associative BTB would have hit")
+        ;
+
+    capacityMisses
+        .name(name + ".BTBCapacityMisses")
+        .desc("Number of BTB misses a fully associative BTB would also "
+              "have had, including first references")
+        ;
 }
 
 inline
@@ -83,22 +123,109 @@ DefaultBTB::getTag(Addr instPC)
     return (instPC >> tagShiftAmt) & tagMask;
 }
 
-bool
-DefaultBTB::valid(Addr instPC, ThreadID tid)
+DefaultBTB::BTBEntry *
+DefaultBTB::findEntry(Addr instPC, ThreadID tid)
 {
-    unsigned btb_idx = getIndex(instPC);
-
+    unsigned set = getIndex(instPC);
     Addr inst_tag = getTag(instPC);
 
-    assert(btb_idx < numEntries);
+    assert(set < numSets);
 
-    if (btb[btb_idx].valid
-        && inst_tag == btb[btb_idx].tag
-        && btb[btb_idx].tid == tid) {
-        return true;
-    } else {
-        return false;
+    BTBEntry *entry = &btb[set * assoc];
+    for (unsigned way = 0; way < assoc; ++way, ++entry) {
+        if (entry->valid && entry->tag == inst_tag && entry->tid == tid)
+            return entry;
+    }
+    return NULL;
+}
+
+void
+DefaultBTB::touch(unsigned set, unsigned way)
+{
+    btb[set * assoc + way].lastUsed = ++accesses;
+
+    if (replPolicy == Enums::PLRU) {
+        // Walk from the root to the leaf of this way, pointing every
+        // node on the way at the other half.
+        uint64_t &bits = plruBits[set];
+        unsigned node = 0;
+        for (unsigned half = assoc / 2; half > 0; half /= 2) {
+            bool right = way & half;
+            if (right)
+                bits &= ~(ULL(1) << node);
+            else
+                bits |= ULL(1) << node;
+            node = 2 * node + 1 + right;
+        }
+    }
+}
+
+unsigned
+DefaultBTB::findVictim(unsigned set)
+{
+    BTBEntry *entries = &btb[set * assoc];
+    for (unsigned way = 0; way < assoc; ++way) {
+        if (!entries[way].valid)
+            return way;
+    }
+
+    switch (replPolicy) {
+      case Enums::Random:
+        return random_mt.random<unsigned>(0, assoc - 1);
+
+      case Enums::PLRU: {
+        uint64_t bits = plruBits[set];
+        unsigned node = 0;
+        unsigned way = 0;
+        for (unsigned half = assoc / 2; half > 0; half /= 2) {
+            bool right = (bits >> node) & 1;
+            if (right)
+                way += half;
+            node = 2 * node + 1 + right;
+        }
+        return way;
+      }
+
+      default: {
+        unsigned victim = 0;
+        for (unsigned way = 1; way < assoc; ++way) {
+            if (entries[way].lastUsed < entries[victim].lastUsed)
+                victim = way;
+        }
+        return victim;
+      }
+    }
+}
+
+void
+DefaultBTB::touchFullyAssoc(Addr instPC)
+{
+    m5::hash_map<Addr, std::list<Addr>::iterator>::iterator it =
+        fullyAssocIndex.find(instPC);
+    if (it != fullyAssocIndex.end()) {
+        fullyAssoc.splice(fullyAssoc.begin(), fullyAssoc, it->second);
+        return;
+    }
+
+    if (fullyAssoc.size() == numEntries) {
+        fullyAssocIndex.erase(fullyAssoc.back());
+        fullyAssoc.pop_back();
     }
+    fullyAssoc.push_front(instPC);
+    fullyAssocIndex[instPC] = fullyAssoc.begin();
+}
+
+bool
+DefaultBTB::valid(Addr instPC, ThreadID tid)
+{
+    if (findEntry(instPC, tid))
+        return true;
+
+    if (fullyAssocIndex.find(instPC) != fullyAssocIndex.end())
+        ++conflictMisses;
+    else
+        ++capacityMisses;
+    return false;
 }
 
 // @todo Create some sort of return struct that has both whether or not the
@@ -107,33 +234,109 @@ DefaultBTB::valid(Addr instPC, ThreadID tid)
 TheISA::PCState
 DefaultBTB::lookup(Addr instPC, ThreadID tid)
 {
-    unsigned btb_idx = getIndex(instPC);
-
     DPRINTF(InOrderBPred, "BTB Lookup %x\n" , instPC);
-    Addr inst_tag = getTag(instPC);
-
-    assert(btb_idx < numEntries);
 
-    if (btb[btb_idx].valid
-        && inst_tag == btb[btb_idx].tag
-        && btb[btb_idx].tid == tid) {
-        return btb[btb_idx].target;
-    } else {
+    BTBEntry *entry = findEntry(instPC, tid);
+    if (!entry)
         return 0;
-    }
+
+    unsigned idx = entry - &btb[0];
+    touch(idx / assoc, idx % assoc);
+    touchFullyAssoc(instPC);
+    return entry->target;
 }
 
 void
 DefaultBTB::update(Addr instPC, const TheISA::PCState &target, ThreadID tid)
 {
-    unsigned btb_idx = getIndex(instPC);
-
-    assert(btb_idx < numEntries);
+    unsigned set = getIndex(instPC);
 
     DPRINTF(InOrderBPred, "BTB Update %x\n" , instPC);
 
-    btb[btb_idx].tid = tid;
-    btb[btb_idx].valid = true;
-    btb[btb_idx].target = target;
-    btb[btb_idx].tag = getTag(instPC);
+    BTBEntry *entry = findEntry(instPC, tid);
+    unsigned way = entry ? entry - &btb[set * assoc] : findVictim(set);
+    entry = &btb[set * assoc + way];
+
+    entry->tid = tid;
+    entry->valid = true;
+    entry->target = target;
+    entry->tag = getTag(instPC);
+
+    touch(set, way);
+    touchFullyAssoc(instPC);
+}
+
+void
+DefaultBTB::serialize(const std::string &base, std::ostream &os)
+{
+    std::vector<Addr> tags(numEntries);
+    std::vector<Addr> targets(numEntries);
+    std::vector<int> tids(numEntries);
+    std::vector<uint64_t> last_used(numEntries);
+    std::vector<bool> valids(numEntries);
+
+    for (unsigned i = 0; i < numEntries; ++i) {
+        tags[i] = btb[i].tag;
+        targets[i] = btb[i].target.instAddr();
+        tids[i] = btb[i].tid;
+        last_used[i] = btb[i].lastUsed;
+        valids[i] = btb[i].valid;
+    }
+
+    std::vector<Addr> fully_assoc(fullyAssoc.begin(), fullyAssoc.end());
+
+    arrayParamOut(os, base + ".tag", tags);
+    arrayParamOut(os, base + ".target", targets);
+    arrayParamOut(os, base + ".tid", tids);
+    arrayParamOut(os, base + ".lastUsed", last_used);
+    arrayParamOut(os, base + ".valid", valids);
+    arrayParamOut(os, base + ".plruBits", plruBits);
+    arrayParamOut(os, base + ".fullyAssoc", fully_assoc);
+    paramOut(os, base + ".accesses", accesses);
+}
+
+void
+DefaultBTB::unserialize(const std::string &base, Checkpoint *cp,
+                        const std::string &section)
+{
+    std::vector<Addr> tags;
+    std::vector<Addr> targets;
+    std::vector<int> tids;
+    std::vector<uint64_t> last_used;
+    std::vector<bool> valids;
+    std::vector<uint64_t> plru_bits;
+    std::vector<Addr> fully_assoc;
+
+    arrayParamIn(cp, section, base + ".tag", tags);
+    arrayParamIn(cp, section, base + ".target", targets);
+    arrayParamIn(cp, section, base + ".tid", tids);
+    arrayParamIn(cp, section, base + ".lastUsed", last_used);
+    arrayParamIn(cp, section, base + ".valid", valids);
+    arrayParamIn(cp, section, base + ".plruBits", plru_bits);
+    arrayParamIn(cp, section, base + ".fullyAssoc", fully_assoc);
+    paramIn(cp, section, base + ".accesses", accesses);
+
+    if (tags.size() != numEntries || targets.size() != numEntries ||
+        tids.size() != numEntries || last_used.size() != numEntries ||
+        valids.size() != numEntries || plru_bits.size() != numSets ||
+        fully_assoc.size() > numEntries) {
+        fatal("BTB %s:%s does not have %d entries in %d sets\n", section,
+              base, numEntries, numSets);
+    }
+
+    for (unsigned i = 0; i < numEntries; ++i) {
+        btb[i].tag = tags[i];
+        btb[i].target.set(targets[i]);
+        btb[i].tid = tids[i];
+        btb[i].lastUsed = last_used[i];
+        btb[i].valid = valids[i];
+    }
+    plruBits.swap(plru_bits);
+
+    fullyAssoc.clear();
+    fullyAssocIndex.clear();
+    for (unsigned i = 0; i < fully_assoc.size(); ++i) {
+        fullyAssoc.push_back(fully_assoc[i]);
+        fullyAssocIndex[fully_assoc[i]] = --fullyAssoc.end();
+    }
 }
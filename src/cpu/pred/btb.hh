@@ -31,18 +31,37 @@
 #ifndef __CPU_O3_BTB_HH__
 #define __CPU_O3_BTB_HH__
 
+#include <iosfwd>
+#include <list>
+#include <string>
+#include <vector>
+
 #include "arch/types.hh"
+#include "base/hashmap.hh"
 #include "base/misc.hh"
+#include "base/statistics.hh"
 #include "base/types.hh"
 #include "config/the_isa.hh"
-
+#include "enums/BTBReplacementPolicy.hh"
+
+class Checkpoint;
+
+/**
+ * A set-associative branch target buffer with partial tags.  Each set
+ * is searched in full, so a lookup costs the same however many sets
+ * there are.  Misses are split into conflict misses, which a fully
+ * associative LRU buffer of the same size would have hit, and capacity
+ * misses, which it would not have; that buffer is kept as a hashed LRU
+ * list of branch addresses so that it also costs a constant amount of
+ * work per access.
+ */
 class DefaultBTB
 {
   private:
     struct BTBEntry
     {
         BTBEntry()
-            : tag(0), target(0), valid(false)
+            : tag(0), target(0), lastUsed(0), valid(false)
         {}
 
         /** The entry's tag. */
@@ -54,6 +73,9 @@ class DefaultBTB
         /** The entry's thread id. */
         ThreadID tid;
 
+        /** Access count of the last hit or fill, for LRU replacement. */
+        uint64_t lastUsed;
+
         /** Whether or not the entry is valid. */
         bool valid;
     };
@@ -64,12 +86,20 @@ class DefaultBTB
      *  @param numEntries Number of entries for the BTB.
      *  @param tagBits Number of bits for each tag in the BTB.
      *  @param instShiftAmt Offset amount for instructions to ignore alignment.
+     *  @param assoc Number of entries in each set.
+     *  @param replPolicy Which entry of a full set is replaced.
      */
     DefaultBTB(unsigned numEntries, unsigned tagBits,
-               unsigned instShiftAmt);
+               unsigned instShiftAmt, unsigned assoc = 1,
+               Enums::BTBReplacementPolicy replPolicy = Enums::LRU);
 
     void reset();
 
+    /** Registers the miss classification stats.
+     *  @param name Prefix of the stat names.
+     */
+    void regStats(const std::string &name);
+
     /** Looks up an address in the BTB. Must call valid() first on the address.
      *  @param inst_PC The address of the branch to look up.
      *  @param tid The thread id.
@@ -77,7 +107,8 @@ class DefaultBTB
      */
     TheISA::PCState lookup(Addr instPC, ThreadID tid);
 
-    /** Checks if a branch is in the BTB.
+    /** Checks if a branch is in the BTB, and classifies the miss if
+     *  it is not.
      *  @param inst_PC The address of the branch to look up.
      *  @param tid The thread id.
      *  @return Whether or not the branch exists in the BTB.
@@ -92,10 +123,25 @@ class DefaultBTB
     void update(Addr instPC, const TheISA::PCState &targetPC,
                 ThreadID tid);
 
+    /** Writes the BTB entries and replacement state to a checkpoint.
+     *  Only the address of each target is kept.
+     *  @param base Prefix of the checkpoint parameter names.
+     *  @param os The checkpoint stream.
+     */
+    void serialize(const std::string &base, std::ostream &os);
+
+    /** Restores BTB entries written by serialize().
+     *  @param base Prefix of the checkpoint parameter names.
+     *  @param cp The checkpoint.
+     *  @param section The checkpoint section to read.
+     */
+    void unserialize(const std::string &base, Checkpoint *cp,
+                     const std::string &section);
+
   private:
-    /** Returns the index into the BTB, based on the branch's PC.
+    /** Returns the set index into the BTB, based on the branch's PC.
      *  @param inst_PC The branch to look up.
-     *  @return Returns the index into the BTB.
+     *  @return Returns the set index into the BTB.
      */
     inline unsigned getIndex(Addr instPC);
 
@@ -105,26 +151,78 @@ class DefaultBTB
      */
     inline Addr getTag(Addr instPC);
 
-    /** The actual BTB. */
+    /** Returns the entry of a set holding a branch, or NULL.
+     *  @param inst_PC The branch's address.
+     *  @param tid The thread id.
+     */
+    BTBEntry *findEntry(Addr instPC, ThreadID tid);
+
+    /** Records a hit or fill of an entry for the replacement policy.
+     *  @param set The set index.
+     *  @param way The way of the entry within the set.
+     */
+    void touch(unsigned set, unsigned way);
+
+    /** Returns the way of a set to fill, an invalid one if any.
+     *  @param set The set index.
+     */
+    unsigned findVictim(unsigned set);
+
+    /** Moves a branch to the most recently used end of the fully
+     *  associative buffer, inserting it and evicting the least recently
+     *  used branch if it is not there.
+     */
+    void touchFullyAssoc(Addr instPC);
+
+    /** The actual BTB; set i holds entries [i * assoc, (i + 1) * assoc). */
     std::vector<BTBEntry> btb;
 
     /** The number of entries in the BTB. */
     unsigned numEntries;
 
-    /** The index mask. */
+    /** The number of entries in each set. */
+    unsigned assoc;
+
+    /** The number of sets. */
+    unsigned numSets;
+
+    /** The set index mask. */
     unsigned idxMask;
 
     /** The number of tag bits per entry. */
     unsigned tagBits;
 
     /** The tag mask. */
-    unsigned tagMask;
+    Addr tagMask;
 
     /** Number of bits to shift PC when calculating index. */
     unsigned instShiftAmt;
 
     /** Number of bits to shift PC when calculating tag. */
     unsigned tagShiftAmt;
+
+    /** Which entry of a full set is replaced. */
+    Enums::BTBReplacementPolicy replPolicy;
+
+    /** Number of hits and fills so far, to order entries for LRU. */
+    uint64_t accesses;
+
+    /** Tree pseudo-LRU bits of each set; bit i of a set is node i of its
+     *  tree, and points towards the half to replace next. */
+    std::vector<uint64_t> plruBits;
+
+    /** Branch addresses of the fully associative buffer, most recently
+     *  used first. */
+    std::list<Addr> fullyAssoc;
+
+    /** Position of each branch in fullyAssoc. */
+    m5::hash_map<Addr, std::list<Addr>::iterator> fullyAssocIndex;
+
+    /** Stat for misses a fully associative BTB would have hit. */
+    Stats::Scalar conflictMisses;
+
+    /** Stat for misses a fully associative BTB would also have had. */
+    Stats::Scalar capacityMisses;
 };
 
 #endif // __CPU_O3_BTB_HH__
@@ -0,0 +1,59 @@
+/*
+ * Bit-packed circular global history register.
+ */
+
+#include <algorithm>
+
+#include "base/intmath.hh"
+#include "base/misc.hh"
+#include "cpu/pred/global_history.hh"
+#include "sim/serialize.hh"
+
+GlobalHistory::GlobalHistory(unsigned length, unsigned max_in_flight)
+    : histLength(length), maxInFlight(max_in_flight), head(0)
+{
+    // Round up to whole words so that the index mask also covers the
+    // bits inside the last word.
+    unsigned bits = std::max(ceilPow2(length + maxInFlight), 64U);
+    ring.resize(bits / 64);
+    indexMask = bits - 1;
+    reset();
+}
+
+void
+GlobalHistory::reset()
+{
+    std::fill(ring.begin(), ring.end(), 0);
+    head = 0;
+}
+
+void
+GlobalHistory::serialize(const std::string &base, std::ostream &os)
+{
+    arrayParamOut(os, base + ".ring", ring);
+    paramOut(os, base + ".head", head);
+}
+
+void
+GlobalHistory::unserialize(const std::string &base, Checkpoint *cp,
+                           const std::string &section)
+{
+    std::vector<uint64_t> restored;
+    arrayParamIn(cp, section, base + ".ring", restored);
+    if (restored.size() != ring.size()) {
+        fatal("Global history %s:%s has %d words, expected %d\n",
+              section, base, restored.size(), ring.size());
+    }
+    ring.swap(restored);
+    paramIn(cp, section, base + ".head", head);
+    head &= indexMask;
+}
+
+void
+FoldedHistory::init(unsigned orig_length, unsigned comp_length)
+{
+    comp = 0;
+    origLength = orig_length;
+    compLength = comp_length;
+    outpoint = orig_length % comp_length;
+}
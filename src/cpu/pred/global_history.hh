@@ -0,0 +1,141 @@
+/*
+ * Bit-packed circular global history register.
+ */
+
+#ifndef __CPU_PRED_GLOBAL_HISTORY_HH__
+#define __CPU_PRED_GLOBAL_HISTORY_HH__
+
+#include <cassert>
+#include <iosfwd>
+#include <string>
+#include <vector>
+
+#include "base/misc.hh"
+#include "base/types.hh"
+
+class Checkpoint;
+
+/**
+ * A global branch history register kept as a circular buffer of bits.
+ * Shifting in an outcome only moves the head index and writes one bit,
+ * so its cost does not depend on the history length.  A checkpoint of
+ * the register is just its head: outcomes older than a saved head stay
+ * in the buffer until maxInFlight newer outcomes have been pushed, so a
+ * predictor can keep reading the history a branch was predicted with,
+ * or rewind to it, without copying it.  The head counts every outcome
+ * ever pushed, and is only wrapped around the ring to index it, so that
+ * a saved head used after more than maxInFlight newer outcomes is caught
+ * rather than read back as someone else's history.
+ */
+class GlobalHistory
+{
+  public:
+    /**
+     * @param length Number of outcomes visible from any head.
+     * @param maxInFlight Number of outcomes that may be pushed after a
+     * head is saved while it is still in use.
+     */
+    GlobalHistory(unsigned length, unsigned maxInFlight = 256);
+
+    /** Clears the history to all not taken. */
+    void reset();
+
+    /** Shifts in the outcome of a branch. */
+    void push(bool taken)
+    {
+        ++head;
+        unsigned pos = head & indexMask;
+        uint64_t bit = ULL(1) << (pos & 63);
+        if (taken)
+            ring[pos >> 6] |= bit;
+        else
+            ring[pos >> 6] &= ~bit;
+    }
+
+    /** Returns the current head, to be used as a checkpoint. */
+    unsigned getHead() const { return head; }
+
+    /** Rewinds the history to a head previously returned by getHead(). */
+    void restore(unsigned saved_head)
+    {
+        if (head - saved_head > maxInFlight) {
+            panic("%d outcomes pushed to the global history since a saved "
+                  "head, more than the %d it keeps\n",
+                  head - saved_head, maxInFlight);
+        }
+        head = saved_head;
+    }
+
+    /**
+     * Returns an outcome as seen from a saved head.
+     * @param saved_head The checkpoint to read from.
+     * @param i Age of the outcome, 0 being the most recent.
+     */
+    bool outcome(unsigned saved_head, unsigned i) const
+    {
+        assert(head - saved_head <= maxInFlight);
+        unsigned pos = (saved_head - i) & indexMask;
+        return (ring[pos >> 6] >> (pos & 63)) & 1;
+    }
+
+    /** Returns an outcome as seen from the current head. */
+    bool outcome(unsigned i) const { return outcome(head, i); }
+
+    /** Number of outcomes visible from any head. */
+    unsigned length() const { return histLength; }
+
+    /** Writes the outcomes and head to a checkpoint. */
+    void serialize(const std::string &base, std::ostream &os);
+
+    /** Restores a history written by serialize(). */
+    void unserialize(const std::string &base, Checkpoint *cp,
+                     const std::string &section);
+
+  private:
+    /** The outcomes, one bit each. */
+    std::vector<uint64_t> ring;
+
+    /** Number of outcomes visible from any head. */
+    unsigned histLength;
+
+    /** Number of outcomes that may be pushed after a saved head. */
+    unsigned maxInFlight;
+
+    /** Mask to wrap a bit index around the ring. */
+    unsigned indexMask;
+
+    /** Number of outcomes pushed, the most recent one's bit index
+     * once wrapped by indexMask. */
+    unsigned head;
+};
+
+/**
+ * A slice of a global history xored down to a few bits.  When an
+ * outcome is shifted in, the one that drops out of the slice is
+ * removed and the new one added, so the fold never has to be
+ * recomputed from the whole history.  The history must keep at least
+ * one outcome more than the slice.
+ */
+struct FoldedHistory {
+    /** The folded value. */
+    unsigned comp;
+    /** Width of the folded value. */
+    unsigned compLength;
+    /** Number of history bits folded. */
+    unsigned origLength;
+    /** Position the bit leaving the slice is removed at. */
+    unsigned outpoint;
+
+    void init(unsigned orig_length, unsigned comp_length);
+
+    /** Folds in the outcome just pushed onto the history. */
+    void update(const GlobalHistory &hist)
+    {
+        comp = (comp << 1) | hist.outcome(0);
+        comp ^= hist.outcome(origLength) << outpoint;
+        comp ^= comp >> compLength;
+        comp &= (1 << compLength) - 1;
+    }
+};
+
+#endif // __CPU_PRED_GLOBAL_HISTORY_HH__
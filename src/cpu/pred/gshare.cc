@@ -34,12 +34,11 @@
 #include "cpu/pred/gshare.hh"
 #include "debug/Fetch.hh"
 
-GshareBP::GshareBP(unsigned _globalPredictorSize,
-                  unsigned _globalCtrBits,
-                  unsigned _globalHistoryLen)
-    : globalPredictorSize(_globalPredictorSize),
-      globalCtrBits(_globalCtrBits),
-      globalHistoryLen(_globalHistoryLen)
+GshareBP::GshareBP(const Params *params)
+    : BPredictor(params),
+      globalPredictorSize(params->globalPredictorSize),
+      globalCtrBits(params->globalCtrBits),
+      globalHistoryLen(params->globalHistoryBits)
 {
     if (!isPowerOf2(globalPredictorSize)) {
         fatal("Invalid global predictor size!\n");
@@ -67,7 +66,7 @@ GshareBP::GshareBP(unsigned _globalPredictorSize,
     globalCtrs.resize(globalPredictorSets);
 
     for (unsigned i = 0; i < globalPredictorSets; ++i)
-        globalCtrs[i].setBits(_globalCtrBits);
+        globalCtrs[i].setBits(globalCtrBits);
 
     DPRINTF(Fetch, "Branch predictor: ghsare predictor size: %i\n",
             globalPredictorSize);
@@ -97,7 +96,7 @@ GshareBP::BTBUpdate(Addr &branch_addr, void * &bp_history)
 // Called to update predictor history when
 // a BTB entry is invalid or not found.
   //update global history to not Taken
-  //globalHistory = globalHistory & (globalHistoryMask - 1);
+  globalHistory = globalHistory & (globalHistoryMask - 1);
 }
 
 
@@ -109,7 +108,7 @@ GshareBP::lookup(Addr &branch_addr, void * &bp_history)
     //idx is xor of branch addr and globalHistory
     unsigned global_predictor_idx = getGlobalIndex(branch_addr, globalHistory);
     
-    BPHistory *history = new BPHistory;
+    BPHistory *history = historyPool.allocate();
     history->globalHistory = globalHistory;
     bp_history = static_cast<void *>(history);
 
@@ -126,6 +125,10 @@ GshareBP::lookup(Addr &branch_addr, void * &bp_history)
 
     taken = getPrediction(counter_val);
 
+    // Speculatively shift in the prediction; squash() and a squashing
+    // update() rewind to the history saved above.
+    updateGlobalHist(taken);
+
 #if 0
     // Speculative update.
     if (taken) {
@@ -141,7 +144,8 @@ GshareBP::lookup(Addr &branch_addr, void * &bp_history)
 }
 
 void
-GshareBP::update(Addr &branch_addr, bool taken, void *bp_history)
+GshareBP::update(Addr &branch_addr, bool taken, void *bp_history,
+                 bool squashed)
 {
     unsigned global_predictor_idx;
     BPHistory *history;
@@ -166,14 +170,13 @@ GshareBP::update(Addr &branch_addr, bool taken, void *bp_history)
           globalCtrs[global_predictor_idx].decrement();
       }
 
-      //update global history
-      if(taken)
-        globalHistory = (globalHistory << 1) | 1;
-      else
-        globalHistory = globalHistory << 1;
-
-      globalHistory = globalHistory & globalHistoryMask;
-      delete history;
+      // The global history was updated speculatively at lookup; it only
+      // needs repairing if this branch was mispredicted.
+      if (squashed) {
+          globalHistory = history->globalHistory;
+          updateGlobalHist(taken);
+      }
+      historyPool.release(history);
     }
 }
 
@@ -192,17 +195,51 @@ GshareBP::getGlobalIndex(Addr &branch_addr, unsigned history)
     return ((branch_addr ^ (history & globalHistoryMask)) & indexMask);
 }
 
+inline
+void
+GshareBP::updateGlobalHist(bool taken)
+{
+    globalHistory = ((globalHistory << 1) | taken) & globalHistoryMask;
+}
+
 void
 GshareBP::uncondBr(void * &bp_history)
 {
-    BPHistory *history = new BPHistory;
+    BPHistory *history = historyPool.allocate();
     history->globalHistory = globalHistory;
     bp_history = static_cast<void *>(history);
+
+    updateGlobalHist(true);
 }
 
 void 
 GshareBP::squash(void *bp_history)
 {
     BPHistory *history = static_cast<BPHistory *>(bp_history);
-    delete history;
+
+    // Restore global history to state prior to this branch.
+    globalHistory = history->globalHistory;
+
+    historyPool.release(history);
+}
+
+void
+GshareBP::serialize(std::ostream &os)
+{
+    serializeCounters(os, "globalCtrs", globalCtrs);
+    SERIALIZE_SCALAR(globalHistory);
+}
+
+void
+GshareBP::unserialize(Checkpoint *cp, const std::string &section)
+{
+    unserializeCounters(cp, section, "globalCtrs", globalCtrs);
+    UNSERIALIZE_SCALAR(globalHistory);
+    globalHistory &= globalHistoryMask;
+}
+
+GshareBP *
+GshareBPParams::create()
+{
+    return new GshareBP(this);
 }
@@ -9,6 +9,9 @@
 
 #include "base/types.hh"
 #include "cpu/o3/sat_counter.hh"
+#include "cpu/pred/branch_predictor.hh"
+#include "cpu/pred/history_pool.hh"
+#include "params/GshareBP.hh"
 
 /**
  * Implements a global predictor that uses the PC to index into a table of
@@ -17,16 +20,17 @@
  * predictor state that needs to be recorded or updated; the update can be
  * determined solely by the branch being taken or not taken.
  */
-class GshareBP
+class GshareBP : public BPredictor
 {
   public:
+    typedef GshareBPParams Params;
+
     /**
      * Default branch predictor constructor.
-     * @param globalPredictorSize Size of the global predictor.
-     * @param globalCtrBits Number of bits per counter.
-     * @param instShiftAmt Offset amount for instructions to ignore alignment.
+     * @param params The params object, with the size of the global
+     * predictor, its counters and the global history.
      */
-    GshareBP(unsigned globalPredictorSize, unsigned globalCtrBits, unsigned globalHistoryLen);
+    GshareBP(const Params *params);
 
     /**
      * Looks up the given address in the branch predictor and returns
@@ -51,13 +55,23 @@ class GshareBP
      * @param branch_addr The address of the branch to update.
      * @param taken Whether or not the branch was taken.
      */
-    void update(Addr &branch_addr, bool taken, void *bp_history);
+    void update(Addr &branch_addr, bool taken, void *bp_history,
+                bool squashed);
 
     void squash(void *bp_history);
 
     void reset();
 
     void uncondBr(void * &bp_history);
+
+    /** Returns the occupancy counters of the BPHistory pool. */
+    const HistoryPoolBase *getHistoryPool() const { return &historyPool; }
+
+    /** Writes the predictor tables and history to a checkpoint. */
+    void serialize(std::ostream &os);
+
+    /** Restores the predictor tables and history from a checkpoint. */
+    void unserialize(Checkpoint *cp, const std::string &section);
   private:
     /**
      *  Returns the taken/not taken prediction given the value of the
@@ -70,6 +84,9 @@ class GshareBP
     /** Calculates the global index based on the PC. */
     inline unsigned getGlobalIndex(Addr &PC, unsigned history);
 
+    /** Shifts a (possibly speculative) outcome into the global history. */
+    inline void updateGlobalHist(bool taken);
+
     /** Array of counters that make up the global predictor. */
     std::vector<SatCounter> globalCtrs;
 
@@ -93,8 +110,12 @@ class GshareBP
     unsigned indexMask;
    
     struct BPHistory {
-	    unsigned globalHistory;
-	  };
+        /** Global history before this branch was shifted in. */
+        unsigned globalHistory;
+    };
+
+    /** Pool the BPHistory records are allocated from. */
+    HistoryPool<BPHistory> historyPool;
 
 };
 
@@ -0,0 +1,235 @@
+/*
+ * Hashed perceptron branch predictor.
+ */
+
+#include <algorithm>
+#include <cstdlib>
+#include <limits>
+
+#include "base/intmath.hh"
+#include "base/misc.hh"
+#include "base/trace.hh"
+#include "cpu/pred/hashed_perceptron.hh"
+#include "debug/Perceptron.hh"
+
+HashedPerceptronBP::HashedPerceptronBP(const Params *params)
+    : BPredictor(params),
+      numTables(params->numTables),
+      tableEntries(params->tableEntries),
+      globalHistoryBits(params->globalHistoryBits),
+      instShiftAmt(params->instShiftAmt),
+      theta(params->theta),
+      globalHistReg(params->globalHistoryBits + 1)
+{
+    if (numTables < 2 || numTables > MaxTables) {
+        fatal("Hashed perceptron must have between 2 and %d tables!\n",
+              MaxTables);
+    }
+
+    // A single entry table leaves no index bits to fold the history to.
+    if (tableEntries < 2 || !isPowerOf2(tableEntries)) {
+        fatal("Invalid hashed perceptron table size!\n");
+    }
+
+    if (globalHistoryBits < numTables - 1) {
+        fatal("Hashed perceptron needs at least one history bit per "
+              "table!\n");
+    }
+
+    indexBits = floorLog2(tableEntries);
+    indexMask = tableEntries - 1;
+
+    // Threshold from the hashed perceptron paper.
+    if (!theta)
+        theta = (int32_t)(2.14 * (numTables + 1) + 20.58);
+
+    weights.resize(numTables * tableEntries);
+
+    // Split the history into contiguous segments, one per table after
+    // the bias table, the most recent outcomes going to table 1.
+    segmentStart.resize(numTables);
+    segmentLength.resize(numTables);
+    foldedHistory.resize(numTables);
+    for (unsigned i = 1; i < numTables; ++i) {
+        segmentStart[i] = (i - 1) * globalHistoryBits / (numTables - 1);
+        segmentLength[i] = i * globalHistoryBits / (numTables - 1) -
+            segmentStart[i];
+    }
+
+    reset();
+
+    DPRINTF(Perceptron, "Hashed perceptron: %d tables of %d weights, "
+            "%d history bits, theta %d\n", numTables, tableEntries,
+            globalHistoryBits, theta);
+}
+
+void
+HashedPerceptronBP::reset()
+{
+    std::fill(weights.begin(), weights.end(), 0);
+    std::fill(foldedHistory.begin(), foldedHistory.end(), 0);
+    globalHistReg.reset();
+}
+
+bool
+HashedPerceptronBP::lookup(Addr &branch_addr, void * &bp_history)
+{
+    unsigned pc_bits = branch_addr >> instShiftAmt;
+
+    BPHistory *history = historyPool.allocate();
+    history->uncond = false;
+    history->perceptron_y = 0;
+    for (unsigned i = 0; i < numTables; ++i) {
+        unsigned idx = (pc_bits ^ foldedHistory[i]) & indexMask;
+        history->index[i] = idx;
+        history->perceptron_y += weights[i * tableEntries + idx];
+    }
+    bp_history = static_cast<void *>(history);
+
+    // Speculatively shift in the prediction; squash() and a squashing
+    // update() rewind to the histories saved here.
+    saveHistory(history);
+    updateHistory(history->perceptron_y >= 0);
+
+    DPRINTF(Perceptron, "Hashed perceptron lookup %#x y %d\n",
+            branch_addr, history->perceptron_y);
+
+    return history->perceptron_y >= 0;
+}
+
+void
+HashedPerceptronBP::uncondBr(void * &bp_history)
+{
+    BPHistory *history = historyPool.allocate();
+    history->uncond = true;
+    history->perceptron_y = 1;
+    bp_history = static_cast<void *>(history);
+
+    saveHistory(history);
+    updateHistory(true);
+}
+
+void
+HashedPerceptronBP::BTBUpdate(Addr &branch_addr, void * &bp_history)
+{
+    // The branch falls through for want of a target, so its speculative
+    // outcome is not taken after all.
+    BPHistory *history = static_cast<BPHistory *>(bp_history);
+    restoreHistory(history);
+    updateHistory(false);
+}
+
+void
+HashedPerceptronBP::update(Addr &branch_addr, bool taken, void *bp_history,
+                           bool squashed)
+{
+    if (!bp_history)
+        return;
+
+    BPHistory *history = static_cast<BPHistory *>(bp_history);
+
+    if (!history->uncond) {
+        int32_t y = history->perceptron_y;
+        if ((y >= 0) != taken || abs(y) <= theta) {
+            for (unsigned i = 0; i < numTables; ++i)
+                train(weights[i * tableEntries + history->index[i]], taken);
+        }
+    }
+
+    // The histories were updated speculatively at lookup; they only
+    // need repairing if this branch was mispredicted.
+    if (squashed) {
+        restoreHistory(history);
+        updateHistory(taken);
+    }
+
+    historyPool.release(history);
+}
+
+void
+HashedPerceptronBP::squash(void *bp_history)
+{
+    BPHistory *history = static_cast<BPHistory *>(bp_history);
+
+    // Restore the histories to their state prior to this branch.
+    restoreHistory(history);
+
+    // Return this BPHistory to the pool now that we're done with it.
+    historyPool.release(history);
+}
+
+bool
+HashedPerceptronBP::lowConfidence(const void *bp_history) const
+{
+    const BPHistory *history = static_cast<const BPHistory *>(bp_history);
+    return history && !history->uncond &&
+        abs(history->perceptron_y) <= theta;
+}
+
+void
+HashedPerceptronBP::updateHistory(bool taken)
+{
+    globalHistReg.push(taken);
+
+    // The outcome now at the start of each segment enters its folded
+    // hash, and the one just past its end leaves it.
+    for (unsigned i = 1; i < numTables; ++i) {
+        unsigned length = segmentLength[i];
+        unsigned f = foldedHistory[i];
+        f = (f << 1) | globalHistReg.outcome(segmentStart[i]);
+        f ^= globalHistReg.outcome(segmentStart[i] + length) <<
+            (length % indexBits);
+        f ^= f >> indexBits;
+        foldedHistory[i] = f & indexMask;
+    }
+}
+
+void
+HashedPerceptronBP::saveHistory(BPHistory *history)
+{
+    history->historyHead = globalHistReg.getHead();
+    for (unsigned i = 1; i < numTables; ++i)
+        history->foldedHistory[i] = foldedHistory[i];
+}
+
+void
+HashedPerceptronBP::restoreHistory(const BPHistory *history)
+{
+    globalHistReg.restore(history->historyHead);
+    for (unsigned i = 1; i < numTables; ++i)
+        foldedHistory[i] = history->foldedHistory[i];
+}
+
+inline void
+HashedPerceptronBP::train(int8_t &weight, bool taken)
+{
+    if (taken) {
+        if (weight < std::numeric_limits<int8_t>::max())
+            ++weight;
+    } else {
+        if (weight > std::numeric_limits<int8_t>::min())
+            --weight;
+    }
+}
+
+void
+HashedPerceptronBP::serialize(std::ostream &os)
+{
+    arrayParamOut(os, "weights", weights);
+    arrayParamOut(os, "foldedHistory", foldedHistory);
+    globalHistReg.serialize("globalHistReg", os);
+}
+
+void
+HashedPerceptronBP::unserialize(Checkpoint *cp, const std::string &section)
+{
+    unserializeTable(cp, section, "weights", weights);
+    unserializeTable(cp, section, "foldedHistory", foldedHistory);
+    globalHistReg.unserialize("globalHistReg", cp, section);
+}
+
+HashedPerceptronBP *
+HashedPerceptronBPParams::create()
+{
+    return new HashedPerceptronBP(this);
+}
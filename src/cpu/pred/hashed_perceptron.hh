@@ -0,0 +1,139 @@
+/*
+ * Hashed perceptron branch predictor.
+ */
+
+#ifndef __CPU_PRED_HASHED_PERCEPTRON_HH__
+#define __CPU_PRED_HASHED_PERCEPTRON_HH__
+
+#include <vector>
+
+#include "base/types.hh"
+#include "cpu/pred/branch_predictor.hh"
+#include "cpu/pred/global_history.hh"
+#include "cpu/pred/history_pool.hh"
+#include "params/HashedPerceptronBP.hh"
+
+/**
+ * Implements a hashed perceptron predictor (Tarjan and Skadron, "Merging
+ * Path and Gshare Indexing in Perceptron Branch Prediction").  Instead of
+ * one weight per history bit, it keeps several small tables of 8-bit
+ * weights.  Table 0 is indexed by the PC alone and acts as the bias;
+ * every other table is indexed by the PC xored with a hash of its own
+ * segment of the global history.  A prediction sums one weight per
+ * table, so its cost depends on the number of tables and not on the
+ * history length.
+ *
+ * The hash of each segment is kept folded down to the index width and
+ * is updated incrementally as outcomes are shifted in, so updating the
+ * history also costs a constant amount of work per table.
+ */
+class HashedPerceptronBP : public BPredictor
+{
+  public:
+    typedef HashedPerceptronBPParams Params;
+
+    /**
+     * Default branch predictor constructor.
+     * @param params The params object, with the number and size of the
+     * weight tables and the global history length.
+     */
+    HashedPerceptronBP(const Params *params);
+
+    bool lookup(Addr &branch_addr, void * &bp_history);
+
+    void uncondBr(void * &bp_history);
+
+    void BTBUpdate(Addr &branch_addr, void * &bp_history);
+
+    void update(Addr &branch_addr, bool taken, void *bp_history,
+                bool squashed);
+
+    void squash(void *bp_history);
+
+    /** Clears the weights and the global history. */
+    void reset();
+
+    /** Returns the occupancy counters of the BPHistory pool. */
+    const HistoryPoolBase *getHistoryPool() const { return &historyPool; }
+
+    /** Whether the sum of the weights was within the training threshold. */
+    bool lowConfidence(const void *bp_history) const;
+
+    /** Writes the predictor tables and history to a checkpoint. */
+    void serialize(std::ostream &os);
+
+    /** Restores the predictor tables and history from a checkpoint. */
+    void unserialize(Checkpoint *cp, const std::string &section);
+
+  private:
+    /** Largest number of weight tables supported. */
+    static const unsigned MaxTables = 16;
+
+    /** Shifts a branch outcome into the global history. */
+    void updateHistory(bool taken);
+
+    struct BPHistory;
+
+    /** Saves the global and folded histories in a record. */
+    void saveHistory(BPHistory *history);
+
+    /** Rewinds the global and folded histories to a saved record. */
+    void restoreHistory(const BPHistory *history);
+
+    /** Saturating add of a training step to a weight. */
+    inline void train(int8_t &weight, bool taken);
+
+    /** Number of weight tables, including the bias table. */
+    unsigned numTables;
+
+    /** Number of weights in each table. */
+    unsigned tableEntries;
+
+    /** log2 of tableEntries, the width of a folded history segment. */
+    unsigned indexBits;
+
+    /** Mask to get an index into a table. */
+    unsigned indexMask;
+
+    /** Number of global history bits, split across tables 1 and up. */
+    unsigned globalHistoryBits;
+
+    /** Number of bits to shift the PC by before indexing. */
+    unsigned instShiftAmt;
+
+    /** Train when the magnitude of the sum is at most this. */
+    int32_t theta;
+
+    /** The weights, table after table. */
+    std::vector<int8_t> weights;
+
+    /** Global history register. */
+    GlobalHistory globalHistReg;
+
+    /** Age of the first history bit of each table's segment. */
+    std::vector<unsigned> segmentStart;
+
+    /** Number of history bits in each table's segment. */
+    std::vector<unsigned> segmentLength;
+
+    /** Each table's history segment, folded down to indexBits. */
+    std::vector<unsigned> foldedHistory;
+
+    struct BPHistory {
+        /** Sum of the weights the prediction was made with. */
+        int32_t perceptron_y;
+        /** Whether this is an unconditional branch. */
+        bool uncond;
+        /** Index of the weight used in each table. */
+        unsigned index[MaxTables];
+        /** Head of globalHistReg before this branch was shifted in. */
+        unsigned historyHead;
+        /** Folded history segments before this branch was shifted in. */
+        unsigned foldedHistory[MaxTables];
+    };
+
+    /** Pool the BPHistory records are allocated from. */
+    HistoryPool<BPHistory> historyPool;
+};
+
+#endif // __CPU_PRED_HASHED_PERCEPTRON_HH__
@@ -0,0 +1,103 @@
+/*
+ * Pooled allocation of branch predictor history records.
+ */
+
+#ifndef __CPU_PRED_HISTORY_POOL_HH__
+#define __CPU_PRED_HISTORY_POOL_HH__
+
+#include <cassert>
+#include <vector>
+
+#include "base/types.hh"
+
+/**
+ * Occupancy counters of a HistoryPool, independent of the record type
+ * so that the CPU can report them for whichever predictor it uses.
+ */
+class HistoryPoolBase
+{
+  public:
+    HistoryPoolBase()
+        : outstanding(0), peakOutstanding(0), capacity(0)
+    { }
+
+    /** Number of records handed out and not yet released. */
+    Counter outstanding;
+
+    /** Largest number of records outstanding at once. */
+    Counter peakOutstanding;
+
+    /** Number of records in all slabs, free or not. */
+    Counter capacity;
+};
+
+/**
+ * A slab allocator for the history records a predictor creates in
+ * lookup() and uncondBr() and destroys in update() and squash().
+ * Records are carved out of slabs that are never returned to the heap,
+ * and released records go onto a free list, so once the pool has grown
+ * to the number of branches in flight a lookup no longer calls malloc.
+ */
+template <class T>
+class HistoryPool : public HistoryPoolBase
+{
+  public:
+    /**
+     * @param slab_records Number of records allocated at a time.
+     */
+    HistoryPool(unsigned slab_records = 64)
+        : slabRecords(slab_records)
+    { }
+
+    ~HistoryPool()
+    {
+        for (unsigned i = 0; i < slabs.size(); ++i)
+            delete [] slabs[i];
+    }
+
+    /** Returns a value initialized record. */
+    T *allocate()
+    {
+        if (freeList.empty())
+            grow();
+
+        T *rec = freeList.back();
+        freeList.pop_back();
+        *rec = T();
+
+        if (++outstanding > peakOutstanding)
+            peakOutstanding = outstanding;
+        return rec;
+    }
+
+    /** Returns a record obtained from allocate() to the pool. */
+    void release(T *rec)
+    {
+        assert(outstanding > 0);
+        --outstanding;
+        freeList.push_back(rec);
+    }
+
+  private:
+    /** Adds a slab of records to the free list. */
+    void grow()
+    {
+        T *slab = new T[slabRecords];
+        slabs.push_back(slab);
+        // Hand out the records in address order.
+        for (unsigned i = slabRecords; i > 0; --i)
+            freeList.push_back(&slab[i - 1]);
+        capacity += slabRecords;
+    }
+
+    /** Number of records in a slab. */
+    unsigned slabRecords;
+
+    /** All slabs allocated so far. */
+    std::vector<T *> slabs;
+
+    /** Records that are not outstanding. */
+    std::vector<T *> freeList;
+};
+
+#endif // __CPU_PRED_HISTORY_POOL_HH__
@@ -28,6 +28,9 @@
  * Authors: John Skubic
  */
 
+#include <cstdlib>
+
+#include "base/cprintf.hh"
 #include "base/intmath.hh"
 #include "base/misc.hh"
 #include "base/trace.hh"
@@ -36,18 +39,25 @@
 #include "cpu/pred/perceptron.hh"
 
 
-HybridpgBP::HybridpgBP(unsigned _globalPredictorSize,
-                  unsigned _globalHistoryLen,
-                  int32_t _theta)
-    : globalPredictorSize(_globalPredictorSize),
-      globalHistoryLen(_globalHistoryLen),
-      theta(_theta)
+HybridpgBP::HybridpgBP(const Params *params)
+    : BPredictor(params),
+      globalPredictorSize(params->globalPredictorSize),
+      globalHistoryLen(params->globalHistoryBits),
+      weightBits(params->weightBits),
+      theta(params->theta ? params->theta : 2 * params->globalHistoryBits + 14,
+            params->thetaCtrBits, params->adaptiveTheta),
+      globalHistReg(params->globalHistoryBits - 1)
 {
     if (!isPowerOf2(globalPredictorSize)) {
         fatal("Invalid global predictor size!\n");
     }
 
-    globalPredictorSets = floorPow2(globalPredictorSize / (_globalHistoryLen * ceilLog2(theta)));
+    // globalPredictorSize is a budget of weight bits.
+    if (globalPredictorSize < globalHistoryLen * weightBits) {
+        fatal("Global predictor size too small for a single perceptron!\n");
+    }
+
+    globalPredictorSets = floorPow2(globalPredictorSize / (globalHistoryLen * weightBits));
 
     if (!isPowerOf2(globalPredictorSets)) {
         fatal("Invalid number of global predictor sets! Check globalCtrBits.\n");
@@ -64,18 +74,11 @@ HybridpgBP::HybridpgBP(unsigned _globalPredictorSize,
 
     indexMask = globalPredictorSets-1;
 
-	  this->X.push_back(1);
-	  for(int i=1;i < _globalHistoryLen; i++) { //
-		  this->X.push_back(-1);
-	  }
-
     // Setup the array of counters for the global predictor.
     for (unsigned i = 0; i < globalPredictorSets; ++i)
-      this->perceptronTable.push_back(new PerceptronBP(_globalHistoryLen, theta));
-
-    theta = _theta;
+      this->perceptronTable.push_back(new PerceptronBP(globalHistoryLen, weightBits));
 	   
-    DPRINTF(Fetch, "Hybrid Predictor:\nSize: %d\nHistoryLen: %d\nHistoryMask %x\nIdxMask %x\nglobalPredictorSets: %d\ntheta %d\n\n", globalPredictorSize, globalHistoryLen, globalHistoryMask, indexMask, globalPredictorSets, theta);
+    DPRINTF(Fetch, "Hybrid Predictor:\nSize: %d\nHistoryLen: %d\nHistoryMask %x\nIdxMask %x\nglobalPredictorSets: %d\ntheta %d\n\n", globalPredictorSize, globalHistoryLen, globalHistoryMask, indexMask, globalPredictorSets, theta.value());
 }
 
 void
@@ -90,7 +93,10 @@ HybridpgBP::BTBUpdate(Addr &branch_addr, void * &bp_history)
 // Called to update predictor history when
 // a BTB entry is invalid or not found.
   //update global history to not Taken
-  //globalHistory = globalHistory & (globalHistoryMask - 1);
+  BPHistory *history = static_cast<BPHistory *>(bp_history);
+  globalHistory = history->globalHistory;
+  globalHistReg.restore(history->historyHead);
+  updateGlobalHist(false);
 }
 
 
@@ -106,17 +112,24 @@ HybridpgBP::lookup(Addr &branch_addr, void * &bp_history)
     DPRINTF(Fetch, "LOOKUP: idx %x addr %x history %x\n", global_predictor_idx, branch_addr, globalHistory);
 
 	  PerceptronBP* curr_perceptron = this->perceptronTable[global_predictor_idx];
-	  BPHistory *history = new BPHistory;
-	  history->perceptron_y = curr_perceptron->getPrediction(this->X);
+	  BPHistory *history = historyPool.allocate();
+    history->historyHead = globalHistReg.getHead();
+	  history->perceptron_y = curr_perceptron->getPrediction(globalHistReg, history->historyHead);
     history->globalHistory = globalHistory;
-    history->X = X;
+    history->theta = theta.value();
+    history->uncond = false;
 	  bp_history = static_cast<void *>(history);
     taken = (history->perceptron_y) >= 0;
+
+    // Speculatively shift in the prediction; squash() and a squashing
+    // update() rewind to the histories saved above.
+    updateGlobalHist(taken);
     return taken;
 }
 
 void
-HybridpgBP::update(Addr &branch_addr, bool taken, void *bp_history)
+HybridpgBP::update(Addr &branch_addr, bool taken, void *bp_history,
+                   bool squashed)
 {
     unsigned global_predictor_idx;
     BPHistory *history;
@@ -133,17 +146,18 @@ HybridpgBP::update(Addr &branch_addr, bool taken, void *bp_history)
     DPRINTF(Fetch, "UPDATE: idx %x addr %x history %x\n", global_predictor_idx, branch_addr, history->globalHistory);
  
     PerceptronBP* curr_perceptron = this->perceptronTable[global_predictor_idx];
-    curr_perceptron->train(this->changeToPlusMinusOne((int32_t)taken), history->perceptron_y, this->theta, history->X);
-    this->X.insert(this->X.begin() + 1, this->changeToPlusMinusOne((int32_t)taken));
-    this->X.pop_back();
-
-    if(taken)
-      globalHistory = (globalHistory << 1) | 1;
-    else
-      globalHistory = globalHistory << 1;
-
-    globalHistory = globalHistory & globalHistoryMask;
-    delete history;
+    curr_perceptron->train(this->changeToPlusMinusOne((int32_t)taken), history->perceptron_y, theta.value(), globalHistReg, history->historyHead);
+    if (!history->uncond)
+      theta.update(taken != (history->perceptron_y >= 0), history->perceptron_y);
+
+    // The histories were updated speculatively at lookup; they only
+    // need repairing if this branch was mispredicted.
+    if (squashed) {
+      globalHistory = history->globalHistory;
+      globalHistReg.restore(history->historyHead);
+      updateGlobalHist(taken);
+    }
+    historyPool.release(history);
   }
 }
 
@@ -154,14 +168,26 @@ HybridpgBP::getGlobalIndex(Addr &branch_addr, unsigned history)
     return ((branch_addr ^ (history & globalHistoryMask)) & indexMask);
 }
 
+inline
+void
+HybridpgBP::updateGlobalHist(bool taken)
+{
+    globalHistory = ((globalHistory << 1) | taken) & globalHistoryMask;
+    globalHistReg.push(taken);
+}
+
 void 
 HybridpgBP::uncondBr(void * &bp_history)
 {
-    BPHistory *history = new BPHistory;
+    BPHistory *history = historyPool.allocate();
     history->perceptron_y = 1; //anything greater than 0 is taken
     history->globalHistory = globalHistory;
-    history->X = X;
+    history->theta = theta.value();
+    history->uncond = true;
+    history->historyHead = globalHistReg.getHead();
    	bp_history = static_cast<void *>(history);
+
+    updateGlobalHist(true);
 }
 
 inline int8_t
@@ -170,11 +196,53 @@ HybridpgBP::changeToPlusMinusOne(int32_t input)
   return (input > 0) ? 1 : -1;
 }
 
+bool
+HybridpgBP::lowConfidence(const void *bp_history) const
+{
+    const BPHistory *history = static_cast<const BPHistory *>(bp_history);
+    // The perceptron still trains on outputs this close to zero.
+    return history && !history->uncond &&
+        abs(history->perceptron_y) <= history->theta;
+}
+
 void
 HybridpgBP::squash(void *bp_history)
 {
     BPHistory *history = static_cast<BPHistory *>(bp_history);
 
-    // Delete this BPHistory now that we're done with it.
-    delete history;
+    // Restore both histories to their state prior to this branch.
+    globalHistory = history->globalHistory;
+    globalHistReg.restore(history->historyHead);
+
+    // Return this BPHistory to the pool now that we're done with it.
+    historyPool.release(history);
+}
+
+void
+HybridpgBP::serialize(std::ostream &os)
+{
+    for (unsigned i = 0; i < perceptronTable.size(); ++i)
+        perceptronTable[i]->serialize(csprintf("perceptron%d", i), os);
+    theta.serialize("theta", os);
+    SERIALIZE_SCALAR(globalHistory);
+    globalHistReg.serialize("globalHistReg", os);
+}
+
+void
+HybridpgBP::unserialize(Checkpoint *cp, const std::string &section)
+{
+    for (unsigned i = 0; i < perceptronTable.size(); ++i) {
+        perceptronTable[i]->unserialize(csprintf("perceptron%d", i), cp,
+                                        section);
+    }
+    theta.unserialize("theta", cp, section);
+    UNSERIALIZE_SCALAR(globalHistory);
+    globalHistory &= globalHistoryMask;
+    globalHistReg.unserialize("globalHistReg", cp, section);
+}
+
+HybridpgBP *
+HybridpgBPParams::create()
+{
+    return new HybridpgBP(this);
 }
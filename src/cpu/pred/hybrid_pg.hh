@@ -8,7 +8,11 @@
 #include <vector>
 
 #include "base/types.hh"
+#include "cpu/pred/branch_predictor.hh"
+#include "cpu/pred/global_history.hh"
+#include "cpu/pred/history_pool.hh"
 #include "cpu/pred/perceptron.hh"
+#include "params/HybridpgBP.hh"
 
 /**
  * Implements a global predictor that uses the PC to index into a table of
@@ -17,16 +21,18 @@
  * predictor state that needs to be recorded or updated; the update can be
  * determined solely by the branch being taken or not taken.
  */
-class HybridpgBP
+class HybridpgBP : public BPredictor
 {
   public:
+    typedef HybridpgBPParams Params;
+
     /**
      * Default branch predictor constructor.
-     * @param globalPredictorSize Size of the global predictor.
-     * @param globalCtrBits Number of bits per counter.
-     * @param instShiftAmt Offset amount for instructions to ignore alignment.
+     * @param params The params object, with the storage budget of the
+     * perceptron table, the global history length, the weight width and
+     * the training threshold settings.
      */
-    HybridpgBP(unsigned globalPredictorSize, unsigned globalHistoryLen, int32_t theta);
+    HybridpgBP(const Params *params);
 
     /**
      * Looks up the given address in the branch predictor and returns
@@ -51,13 +57,25 @@ class HybridpgBP
      * @param branch_addr The address of the branch to update.
      * @param taken Whether or not the branch was taken.
      */
-    void update(Addr &branch_addr, bool taken, void *bp_history);
+    void update(Addr &branch_addr, bool taken, void *bp_history,
+                bool squashed);
 
     void squash(void *bp_history);
     void reset();
     void uncondBr(void * &bp_history);
     inline int8_t changeToPlusMinusOne(int32_t input);
 
+    /** Returns the occupancy counters of the BPHistory pool. */
+    const HistoryPoolBase *getHistoryPool() const { return &historyPool; }
+
+    /** Whether the perceptron output was within the training threshold. */
+    bool lowConfidence(const void *bp_history) const;
+
+    /** Writes the predictor tables and history to a checkpoint. */
+    void serialize(std::ostream &os);
+
+    /** Restores the predictor tables and history from a checkpoint. */
+    void unserialize(Checkpoint *cp, const std::string &section);
    private:
     /**
      *  Returns the taken/not taken prediction given the value of the
@@ -70,6 +88,9 @@ class HybridpgBP
     /** Calculates the global index based on the PC. */
     inline unsigned getGlobalIndex(Addr &PC, unsigned history);
 
+    /** Shifts a (possibly speculative) outcome into both histories. */
+    inline void updateGlobalHist(bool taken);
+
     /** Array of counters that make up the global predictor. */
     std::vector<PerceptronBP*> perceptronTable;
 
@@ -92,15 +113,27 @@ class HybridpgBP
 
     unsigned indexMask;
 
-    unsigned theta;
-    /** Global history register. */
-    std::vector<int8_t> X;   
+    /** Width of the perceptron weights. */
+    unsigned weightBits;
+
+    /** Training threshold. */
+    PerceptronThreshold theta;
+    /** Global history register the perceptrons read. */
+    GlobalHistory globalHistReg;
 
    struct BPHistory {
         int32_t perceptron_y;
 	      unsigned globalHistory;
-        std::vector<int8_t> X;
+        /** Head of globalHistReg the branch was predicted with. */
+        unsigned historyHead;
+        /** Training threshold when the branch was predicted. */
+        int32_t theta;
+        /** Whether this is an unconditional branch. */
+        bool uncond;
 	  };
+
+    /** Pool the BPHistory records are allocated from. */
+    HistoryPool<BPHistory> historyPool;
 };
 
 #endif // __CPU_O3_HYBRID_PG_PRED_HH__
@@ -0,0 +1,484 @@
+/*
+ * ITTAGE-like indirect branch target predictor.
+ */
+
+#include <cmath>
+
+#include "base/cprintf.hh"
+#include "base/intmath.hh"
+#include "base/misc.hh"
+#include "base/random.hh"
+#include "base/trace.hh"
+#include "cpu/pred/branch_predictor.hh"
+#include "cpu/pred/indirect_predictor.hh"
+#include "debug/Fetch.hh"
+#include "sim/serialize.hh"
+
+IndirectPredictor::IndirectPredictor(const Params *params)
+    : SimObject(params),
+      baseEntries(params->baseEntries),
+      numTables(params->numTables),
+      tableEntries(params->tableEntries),
+      tagBits(params->tagBits),
+      bitsPerTarget(params->bitsPerTarget),
+      usefulResetPeriod(params->usefulResetPeriod),
+      instShiftAmt(params->instShiftAmt),
+      // One bit more than the longest fold, which removes it, and
+      // enough room for every in-flight branch to shift in its target.
+      pathHist(params->pathHistoryBits + 1, 256 * params->bitsPerTarget)
+{
+    if (!isPowerOf2(baseEntries)) {
+        fatal("Invalid indirect predictor base table size!\n");
+    }
+
+    if (!isPowerOf2(tableEntries)) {
+        fatal("Invalid indirect predictor tagged table size!\n");
+    }
+
+    if (numTables < 1 || numTables > MaxTables) {
+        fatal("The indirect predictor must have between 1 and %d tagged "
+              "tables!\n", MaxTables);
+    }
+
+    if (tagBits < 2 || tagBits > 16) {
+        fatal("Indirect predictor tags must be between 2 and 16 bits!\n");
+    }
+
+    if (params->ctrBits < 1 || params->ctrBits > 8) {
+        fatal("Indirect predictor confidence counters must be between 1 "
+              "and 8 bits!\n");
+    }
+
+    if (bitsPerTarget < 1 || bitsPerTarget > 8) {
+        fatal("Indirect predictor bitsPerTarget must be between 1 and 8!\n");
+    }
+
+    if (params->minHistory < 1 ||
+        params->minHistory > params->pathHistoryBits) {
+        fatal("Indirect predictor history lengths must satisfy "
+              "1 <= minHistory <= pathHistoryBits!\n");
+    }
+
+    baseMask = baseEntries - 1;
+    indexBits = floorLog2(tableEntries);
+    indexMask = tableEntries - 1;
+    tagMask = (1 << tagBits) - 1;
+    ctrMax = (1 << params->ctrBits) - 1;
+
+    base.resize(baseEntries);
+
+    // Geometric series of history lengths from minHistory to
+    // pathHistoryBits, the shortest going to table 1.
+    tables.resize(numTables + 1);
+    histLengths.resize(numTables + 1);
+    indexFold.resize(numTables + 1);
+    tagFold0.resize(numTables + 1);
+    tagFold1.resize(numTables + 1);
+    for (unsigned i = 1; i <= numTables; ++i) {
+        tables[i].resize(tableEntries);
+        if (numTables == 1) {
+            histLengths[i] = params->pathHistoryBits;
+        } else {
+            double ratio = (double)params->pathHistoryBits /
+                params->minHistory;
+            histLengths[i] = (unsigned)(params->minHistory *
+                pow(ratio, (double)(i - 1) / (numTables - 1)) + 0.5);
+        }
+
+        indexFold[i].init(histLengths[i], indexBits);
+        tagFold0[i].init(histLengths[i], tagBits);
+        tagFold1[i].init(histLengths[i], tagBits - 1);
+
+        DPRINTF(Fetch, "ITTAGE: table %d uses %d path history bits\n",
+                i, histLengths[i]);
+    }
+
+    reset();
+}
+
+void
+IndirectPredictor::reset()
+{
+    for (unsigned i = 0; i < baseEntries; ++i)
+        base[i] = TargetEntry();
+
+    for (unsigned i = 1; i <= numTables; ++i)
+        for (unsigned j = 0; j < tableEntries; ++j)
+            tables[i][j] = TargetEntry();
+
+    pathHist.reset();
+    for (unsigned i = 1; i <= numTables; ++i) {
+        indexFold[i].comp = 0;
+        tagFold0[i].comp = 0;
+        tagFold1[i].comp = 0;
+    }
+    usefulResetCount = 0;
+}
+
+void
+IndirectPredictor::pushTarget(const TheISA::PCState &target)
+{
+    Addr target_bits = target.instAddr() >> instShiftAmt;
+    for (unsigned i = 0; i < bitsPerTarget; ++i) {
+        pathHist.push((target_bits >> i) & 1);
+        for (unsigned j = 1; j <= numTables; ++j) {
+            indexFold[j].update(pathHist);
+            tagFold0[j].update(pathHist);
+            tagFold1[j].update(pathHist);
+        }
+    }
+}
+
+void
+IndirectPredictor::saveHistory(IndirectHistory *history)
+{
+    history->head = pathHist.getHead();
+    for (unsigned i = 1; i <= numTables; ++i) {
+        history->indexComp[i] = indexFold[i].comp;
+        history->tagComp0[i] = tagFold0[i].comp;
+        history->tagComp1[i] = tagFold1[i].comp;
+    }
+}
+
+void
+IndirectPredictor::restoreHistory(const IndirectHistory *history)
+{
+    pathHist.restore(history->head);
+    for (unsigned i = 1; i <= numTables; ++i) {
+        indexFold[i].comp = history->indexComp[i];
+        tagFold0[i].comp = history->tagComp0[i];
+        tagFold1[i].comp = history->tagComp1[i];
+    }
+}
+
+bool
+IndirectPredictor::lookup(Addr branch_addr, TheISA::PCState &target,
+                          void * &ind_history)
+{
+    unsigned pc_bits = branch_addr >> instShiftAmt;
+
+    IndirectHistory *history = historyPool.allocate();
+    saveHistory(history);
+    history->baseIndex = pc_bits & baseMask;
+
+    for (unsigned i = 1; i <= numTables; ++i) {
+        unsigned shift = (indexBits > i ? indexBits - i : i - indexBits) + 1;
+        history->index[i] = (pc_bits ^ (pc_bits >> shift) ^
+                             indexFold[i].comp) & indexMask;
+        history->tag[i] = (pc_bits ^ tagFold0[i].comp ^
+                           (tagFold1[i].comp << 1)) & tagMask;
+    }
+
+    // The provider is the matching table with the longest history and
+    // the alternate is the next matching one, or the base table.
+    history->provider = 0;
+    history->altProvider = 0;
+    for (unsigned i = numTables; i > 0; --i) {
+        if (matches(i, history)) {
+            if (!history->provider) {
+                history->provider = i;
+            } else {
+                history->altProvider = i;
+                break;
+            }
+        }
+    }
+
+    // An entry with no confidence in its target was most likely just
+    // allocated or retargeted, so fall back on the alternate's.
+    unsigned used = history->provider;
+    if (used && entry(used, history).ctr == 0 &&
+        matches(history->altProvider, history)) {
+        used = history->altProvider;
+        history->usedAlt = true;
+    }
+
+    history->predicted = matches(used, history);
+    if (history->predicted) {
+        target = entry(used, history).target;
+        history->predTarget = target.instAddr();
+    }
+
+    ind_history = static_cast<void *>(history);
+
+    DPRINTF(Fetch, "ITTAGE: lookup %#x provider %d alt %d predicted %d "
+            "target %#x\n", branch_addr, history->provider,
+            history->altProvider, history->predicted, history->predTarget);
+
+    return history->predicted;
+}
+
+void
+IndirectPredictor::recordTarget(void *ind_history,
+                                const TheISA::PCState &target)
+{
+    pushTarget(target);
+}
+
+void
+IndirectPredictor::trainEntry(TargetEntry &e, const TheISA::PCState &target)
+{
+    if (!e.valid) {
+        e.target = target;
+        e.ctr = 0;
+        e.valid = true;
+    } else if (e.target.instAddr() == target.instAddr()) {
+        if (e.ctr < ctrMax)
+            ++e.ctr;
+    } else if (e.ctr > 0) {
+        --e.ctr;
+    } else {
+        e.target = target;
+    }
+}
+
+void
+IndirectPredictor::allocate(const IndirectHistory *history,
+                            const TheISA::PCState &target)
+{
+    unsigned provider = history->provider;
+
+    // Skip the next table half of the time, so that two paths that
+    // keep mispredicting do not evict each other from the same table.
+    unsigned first = provider + 1;
+    if (first < numTables && random_mt.random<unsigned>(0, 1))
+        ++first;
+
+    for (unsigned i = first; i <= numTables; ++i) {
+        TargetEntry &victim = entry(i, history);
+        if (victim.u == 0) {
+            victim.target = target;
+            victim.tag = history->tag[i];
+            victim.ctr = 0;
+            victim.valid = true;
+            ++allocations;
+            return;
+        }
+    }
+
+    // Every candidate is useful; clear them so a later miss can allocate.
+    for (unsigned i = provider + 1; i <= numTables; ++i)
+        entry(i, history).u = 0;
+}
+
+void
+IndirectPredictor::update(void *ind_history, bool taken,
+                          const TheISA::PCState &target, bool squashed)
+{
+    IndirectHistory *history = static_cast<IndirectHistory *>(ind_history);
+
+    if (squashed) {
+        restoreHistory(history);
+        if (taken)
+            pushTarget(target);
+    }
+
+    if (taken) {
+        unsigned provider = history->provider;
+        unsigned used = history->usedAlt ? history->altProvider : provider;
+        bool correct = history->predicted &&
+            history->predTarget == target.instAddr();
+
+        if (history->predicted) {
+            ++providerHits[used];
+            if (!correct)
+                ++providerIncorrect[used];
+        } else {
+            ++noPrediction;
+        }
+
+        if (provider) {
+            TargetEntry &provider_entry = entry(provider, history);
+            bool provider_correct =
+                provider_entry.target.instAddr() == target.instAddr();
+
+            // An entry is useful when it was right and the alternate
+            // would have been wrong.
+            if (matches(history->altProvider, history)) {
+                bool alt_correct = entry(history->altProvider,
+                    history).target.instAddr() == target.instAddr();
+                if (provider_correct != alt_correct)
+                    provider_entry.u = provider_correct;
+            }
+
+            trainEntry(provider_entry, target);
+            // Until a new entry is trusted, keep the alternate trained.
+            if (history->usedAlt)
+                trainEntry(entry(history->altProvider, history), target);
+        } else {
+            trainEntry(entry(0, history), target);
+        }
+
+        if (!correct && provider < numTables)
+            allocate(history, target);
+
+        // Periodically clear the usefulness bits so entries that
+        // stopped being useful can be replaced.
+        if (++usefulResetCount >= usefulResetPeriod) {
+            usefulResetCount = 0;
+            for (unsigned i = 1; i <= numTables; ++i)
+                for (unsigned j = 0; j < tableEntries; ++j)
+                    tables[i][j].u = 0;
+        }
+    }
+
+    historyPool.release(history);
+}
+
+void
+IndirectPredictor::squash(void *ind_history)
+{
+    IndirectHistory *history = static_cast<IndirectHistory *>(ind_history);
+
+    restoreHistory(history);
+
+    historyPool.release(history);
+}
+
+void
+IndirectPredictor::serialize(std::ostream &os)
+{
+    std::vector<Addr> target(baseEntries);
+    std::vector<uint8_t> ctr(baseEntries);
+    std::vector<bool> valid(baseEntries);
+    for (unsigned i = 0; i < baseEntries; ++i) {
+        target[i] = base[i].target.instAddr();
+        ctr[i] = base[i].ctr;
+        valid[i] = base[i].valid;
+    }
+    arrayParamOut(os, "base.target", target);
+    arrayParamOut(os, "base.ctr", ctr);
+    arrayParamOut(os, "base.valid", valid);
+
+    target.resize(tableEntries);
+    ctr.resize(tableEntries);
+    valid.resize(tableEntries);
+    std::vector<uint16_t> tag(tableEntries);
+    std::vector<uint8_t> u(tableEntries);
+    for (unsigned i = 1; i <= numTables; ++i) {
+        for (unsigned j = 0; j < tableEntries; ++j) {
+            target[j] = tables[i][j].target.instAddr();
+            ctr[j] = tables[i][j].ctr;
+            valid[j] = tables[i][j].valid;
+            tag[j] = tables[i][j].tag;
+            u[j] = tables[i][j].u;
+        }
+        arrayParamOut(os, csprintf("table%d.target", i), target);
+        arrayParamOut(os, csprintf("table%d.ctr", i), ctr);
+        arrayParamOut(os, csprintf("table%d.valid", i), valid);
+        arrayParamOut(os, csprintf("table%d.tag", i), tag);
+        arrayParamOut(os, csprintf("table%d.u", i), u);
+    }
+
+    std::vector<unsigned> index_fold(numTables + 1);
+    std::vector<unsigned> tag_fold0(numTables + 1);
+    std::vector<unsigned> tag_fold1(numTables + 1);
+    for (unsigned i = 1; i <= numTables; ++i) {
+        index_fold[i] = indexFold[i].comp;
+        tag_fold0[i] = tagFold0[i].comp;
+        tag_fold1[i] = tagFold1[i].comp;
+    }
+    arrayParamOut(os, "indexFold", index_fold);
+    arrayParamOut(os, "tagFold0", tag_fold0);
+    arrayParamOut(os, "tagFold1", tag_fold1);
+
+    pathHist.serialize("pathHist", os);
+    SERIALIZE_SCALAR(usefulResetCount);
+}
+
+void
+IndirectPredictor::unserialize(Checkpoint *cp, const std::string &section)
+{
+    std::vector<Addr> target(baseEntries);
+    std::vector<uint8_t> ctr(baseEntries);
+    std::vector<bool> valid(baseEntries);
+
+    unserializeTable(name(), cp, section, "base.target", target);
+    unserializeTable(name(), cp, section, "base.ctr", ctr);
+    unserializeTable(name(), cp, section, "base.valid", valid);
+    for (unsigned i = 0; i < baseEntries; ++i) {
+        base[i].target.set(target[i]);
+        base[i].ctr = ctr[i];
+        base[i].valid = valid[i];
+    }
+
+    target.resize(tableEntries);
+    ctr.resize(tableEntries);
+    valid.resize(tableEntries);
+    std::vector<uint16_t> tag(tableEntries);
+    std::vector<uint8_t> u(tableEntries);
+    for (unsigned i = 1; i <= numTables; ++i) {
+        unserializeTable(name(), cp, section, csprintf("table%d.target", i),
+                         target);
+        unserializeTable(name(), cp, section, csprintf("table%d.ctr", i),
+                         ctr);
+        unserializeTable(name(), cp, section, csprintf("table%d.valid", i),
+                         valid);
+        unserializeTable(name(), cp, section, csprintf("table%d.tag", i),
+                         tag);
+        unserializeTable(name(), cp, section, csprintf("table%d.u", i), u);
+        for (unsigned j = 0; j < tableEntries; ++j) {
+            tables[i][j].target.set(target[j]);
+            tables[i][j].ctr = ctr[j];
+            tables[i][j].valid = valid[j];
+            tables[i][j].tag = tag[j];
+            tables[i][j].u = u[j];
+        }
+    }
+
+    std::vector<unsigned> index_fold(numTables + 1);
+    std::vector<unsigned> tag_fold0(numTables + 1);
+    std::vector<unsigned> tag_fold1(numTables + 1);
+    unserializeTable(name(), cp, section, "indexFold", index_fold);
+    unserializeTable(name(), cp, section, "tagFold0", tag_fold0);
+    unserializeTable(name(), cp, section, "tagFold1", tag_fold1);
+    for (unsigned i = 1; i <= numTables; ++i) {
+        indexFold[i].comp = index_fold[i];
+        tagFold0[i].comp = tag_fold0[i];
+        tagFold1[i].comp = tag_fold1[i];
+    }
+
+    pathHist.unserialize("pathHist", cp, section);
+    UNSERIALIZE_SCALAR(usefulResetCount);
+}
+
+void
+IndirectPredictor::regStats()
+{
+    providerHits
+        .init(numTables + 1)
+        .name(name() + ".providerHits")
+        .desc("Number of indirect targets provided by each table")
+        .flags(Stats::total | Stats::pdf)
+        ;
+
+    providerIncorrect
+        .init(numTables + 1)
+        .name(name() + ".providerIncorrect")
+        .desc("Number of wrong indirect targets, by provider")
+        .flags(Stats::total)
+        ;
+
+    providerHits.subname(0, "base");
+    providerIncorrect.subname(0, "base");
+    for (unsigned i = 1; i <= numTables; ++i) {
+        providerHits.subname(i, csprintf("t%d", i));
+        providerIncorrect.subname(i, csprintf("t%d", i));
+    }
+
+    noPrediction
+        .name(name() + ".noPrediction")
+        .desc("Number of taken indirect branches with no predicted target")
+        ;
+
+    allocations
+        .name(name() + ".allocations")
+        .desc("Number of tagged entries allocated")
+        ;
+}
+
+IndirectPredictor *
+IndirectPredictorParams::create()
+{
+    return new IndirectPredictor(this);
+}
@@ -0,0 +1,254 @@
+/*
+ * ITTAGE-like indirect branch target predictor.
+ */
+
+#ifndef __CPU_PRED_INDIRECT_PREDICTOR_HH__
+#define __CPU_PRED_INDIRECT_PREDICTOR_HH__
+
+#include <iosfwd>
+#include <string>
+#include <vector>
+
+#include "arch/types.hh"
+#include "base/statistics.hh"
+#include "base/types.hh"
+#include "config/the_isa.hh"
+#include "cpu/pred/global_history.hh"
+#include "cpu/pred/history_pool.hh"
+#include "params/IndirectPredictor.hh"
+#include "sim/sim_object.hh"
+
+/**
+ * Predicts the targets of indirect branches other than returns, after
+ * Seznec's ITTAGE ("A 64-Kbytes ITTAGE indirect branch predictor").  A
+ * PC-indexed base table and a number of tagged tables hold targets with
+ * a confidence counter each.  The tagged tables are indexed and tagged
+ * with hashes of the PC and of a path history whose lengths form a
+ * geometric series, and the matching table with the longest history
+ * provides the target, so a jump through a vtable or a switch table
+ * gets a target per path leading to it instead of the single one a
+ * BTB entry holds.
+ *
+ * The path history is made of a few bits of the target of each taken
+ * indirect branch.  It is updated speculatively with the predicted
+ * target and rewound on a squash, and as only indirect branches are
+ * shifted in, a lookup folds it from scratch.
+ *
+ * Like the direction predictors, lookup() hands back an opaque history
+ * record that the BPredUnit passes to exactly one call of update() or
+ * squash().
+ */
+class IndirectPredictor : public SimObject
+{
+  public:
+    typedef IndirectPredictorParams Params;
+
+    IndirectPredictor(const Params *params);
+
+    /**
+     * Looks up the target of an indirect branch.
+     * @param branch_addr The address of the branch.
+     * @param target Set to the predicted target if there is one.
+     * @param ind_history Set to the history record of this branch.
+     * @return Whether a target was predicted.
+     */
+    bool lookup(Addr branch_addr, TheISA::PCState &target,
+                void * &ind_history);
+
+    /**
+     * Shifts the target a branch was predicted to jump to into the path
+     * history.  Only called for branches predicted taken.
+     * @param ind_history The history record of the branch.
+     * @param target The predicted target.
+     */
+    void recordTarget(void *ind_history, const TheISA::PCState &target);
+
+    /**
+     * Trains the predictor with the resolved target of a branch.
+     * @param ind_history The history record of the branch.
+     * @param taken Whether the branch was taken; the tables are only
+     * trained with taken branches.
+     * @param target The target of the branch.
+     * @param squashed Set when the branch was mispredicted, in which
+     * case the path history is rewound and the correct target shifted
+     * in.
+     */
+    void update(void *ind_history, bool taken,
+                const TheISA::PCState &target, bool squashed);
+
+    /**
+     * Rewinds the path history to before a squashed branch.
+     * @param ind_history The history record of the squashed branch.
+     */
+    void squash(void *ind_history);
+
+    /** Clears all tables and the path history. */
+    void reset();
+
+    /** Returns the occupancy counters of the history record pool. */
+    const HistoryPoolBase *getHistoryPool() const { return &historyPool; }
+
+    /** Writes the target tables and path history to a checkpoint. */
+    void serialize(std::ostream &os);
+
+    /** Restores the target tables and path history from a checkpoint. */
+    void unserialize(Checkpoint *cp, const std::string &section);
+
+    /** Registers the provider statistics. */
+    void regStats();
+
+  private:
+    /** Largest number of tagged tables supported. */
+    static const unsigned MaxTables = 15;
+
+    /** An entry of the base or a tagged table. */
+    struct TargetEntry {
+        TargetEntry() : tag(0), ctr(0), u(0), valid(false) { }
+
+        /** The predicted target. */
+        TheISA::PCState target;
+        /** Partial tag; unused in the base table. */
+        uint16_t tag;
+        /** Confidence in the target. */
+        uint8_t ctr;
+        /** Usefulness bit, guarding the entry from replacement. */
+        uint8_t u;
+        /** Whether the entry holds a target. */
+        bool valid;
+    };
+
+    struct IndirectHistory {
+        /** Path history head before this branch was shifted in. */
+        unsigned head;
+        /** Folded registers before this branch was shifted in. */
+        unsigned indexComp[MaxTables + 1];
+        unsigned tagComp0[MaxTables + 1];
+        unsigned tagComp1[MaxTables + 1];
+        /** Index into the base table. */
+        unsigned baseIndex;
+        /** Index into each tagged table, starting at table 1. */
+        unsigned index[MaxTables + 1];
+        /** Tag computed for each tagged table. */
+        uint16_t tag[MaxTables + 1];
+        /** Matching table with the longest history, 0 being the base. */
+        uint8_t provider;
+        /** Next matching table, or 0. */
+        uint8_t altProvider;
+        /** Whether the alternate's target was used over a provider
+         * with no confidence in its own. */
+        bool usedAlt;
+        /** Whether a target was predicted. */
+        bool predicted;
+        /** Address of the predicted target. */
+        Addr predTarget;
+    };
+
+    /** Shifts a few bits of a taken branch's target into the path
+     * history. */
+    void pushTarget(const TheISA::PCState &target);
+
+    /** Saves the path and folded histories in a record. */
+    void saveHistory(IndirectHistory *history);
+
+    /** Rewinds the path and folded histories to a saved record. */
+    void restoreHistory(const IndirectHistory *history);
+
+    /** Returns the entry a record used in the given table. */
+    TargetEntry &entry(unsigned table, const IndirectHistory *history)
+    {
+        return table ? tables[table][history->index[table]] :
+            base[history->baseIndex];
+    }
+
+    /** Whether an entry matches the tag a record computed for it. */
+    bool matches(unsigned table, const IndirectHistory *history)
+    {
+        const TargetEntry &e = entry(table, history);
+        return e.valid && (table == 0 || e.tag == history->tag[table]);
+    }
+
+    /** Moves an entry towards the resolved target. */
+    void trainEntry(TargetEntry &e, const TheISA::PCState &target);
+
+    /** Allocates an entry above the provider of a mispredicted branch. */
+    void allocate(const IndirectHistory *history,
+                  const TheISA::PCState &target);
+
+    /** Number of base table entries. */
+    unsigned baseEntries;
+
+    /** Mask to get an index into the base table. */
+    unsigned baseMask;
+
+    /** Number of tagged tables. */
+    unsigned numTables;
+
+    /** Number of entries in each tagged table. */
+    unsigned tableEntries;
+
+    /** log2 of tableEntries. */
+    unsigned indexBits;
+
+    /** Mask to get an index into a tagged table. */
+    unsigned indexMask;
+
+    /** Width of the partial tags. */
+    unsigned tagBits;
+
+    /** Mask to get a partial tag. */
+    unsigned tagMask;
+
+    /** Largest value of a confidence counter. */
+    uint8_t ctrMax;
+
+    /** Number of path history bits per taken indirect branch. */
+    unsigned bitsPerTarget;
+
+    /** Number of indirect branches between usefulness resets. */
+    unsigned usefulResetPeriod;
+
+    /** Indirect branches updated since the last usefulness reset. */
+    unsigned usefulResetCount;
+
+    /** Number of bits to shift the PC by before indexing. */
+    unsigned instShiftAmt;
+
+    /** The base table. */
+    std::vector<TargetEntry> base;
+
+    /** The tagged tables; tables[0] is unused. */
+    std::vector<std::vector<TargetEntry> > tables;
+
+    /** History length of each tagged table. */
+    std::vector<unsigned> histLengths;
+
+    /** Each table's path history, folded to the index width. */
+    std::vector<FoldedHistory> indexFold;
+
+    /** Each table's path history, folded to the tag width. */
+    std::vector<FoldedHistory> tagFold0;
+
+    /** Each table's path history, folded to one bit less than the tag
+     * width. */
+    std::vector<FoldedHistory> tagFold1;
+
+    /** Path history register. */
+    GlobalHistory pathHist;
+
+    /** Pool the IndirectHistory records are allocated from. */
+    HistoryPool<IndirectHistory> historyPool;
+
+    /** Stat for targets provided by each table. */
+    Stats::Vector providerHits;
+
+    /** Stat for wrong targets, by provider. */
+    Stats::Vector providerIncorrect;
+
+    /** Stat for taken indirect branches no table had a target for. */
+    Stats::Scalar noPrediction;
+
+    /** Stat for tagged entries allocated. */
+    Stats::Scalar allocations;
+};
+
+#endif // __CPU_PRED_INDIRECT_PREDICTOR_HH__
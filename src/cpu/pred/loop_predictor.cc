@@ -0,0 +1,372 @@
+/*
+ * Loop predictor overriding another branch predictor.
+ */
+
+#include "base/intmath.hh"
+#include "base/misc.hh"
+#include "base/trace.hh"
+#include "cpu/pred/loop_predictor.hh"
+#include "debug/Fetch.hh"
+
+LoopBP::LoopBP(const Params *params)
+    : BPredictor(params),
+      base(params->basePredictor),
+      numEntries(params->loopTableEntries),
+      instShiftAmt(params->instShiftAmt)
+{
+    if (!isPowerOf2(numEntries)) {
+        fatal("Invalid loop table size!\n");
+    }
+
+    if (params->tagBits < 1 || params->tagBits > 16) {
+        fatal("Loop predictor tags must be between 1 and 16 bits!\n");
+    }
+
+    if (params->iterBits < 2 || params->iterBits > 16) {
+        fatal("Loop predictor iteration counts must be between 2 and 16 "
+              "bits!\n");
+    }
+
+    if (params->confidenceBits < 1 || params->confidenceBits > 8) {
+        fatal("Loop predictor confidence counters must be between 1 and 8 "
+              "bits!\n");
+    }
+
+    if (params->ageBits < 1 || params->ageBits > 8) {
+        fatal("Loop predictor age counters must be between 1 and 8 bits!\n");
+    }
+
+    if (base == this) {
+        fatal("%s can't be its own base predictor\n", name());
+    }
+
+    indexMask = numEntries - 1;
+    tagMask = (1 << params->tagBits) - 1;
+    iterMax = (1 << params->iterBits) - 1;
+    confidenceMax = (1 << params->confidenceBits) - 1;
+    ageMax = (1 << params->ageBits) - 1;
+
+    table.resize(numEntries);
+
+    reset();
+}
+
+void
+LoopBP::reset()
+{
+    for (unsigned i = 0; i < numEntries; ++i) {
+        LoopEntry &entry = table[i];
+        entry.tag = 0;
+        entry.tripCount = 0;
+        entry.commitIter = 0;
+        entry.specIter = 0;
+        entry.confidence = 0;
+        entry.age = 0;
+        entry.dir = false;
+        entry.valid = false;
+    }
+    useLoop = 0;
+}
+
+bool
+LoopBP::lookup(Addr &branch_addr, void * &bp_history)
+{
+    unsigned pc_bits = branch_addr >> instShiftAmt;
+
+    BPHistory *history = historyPool.allocate();
+    history->uncond = false;
+    history->basePred = base->lookup(branch_addr, history->baseHistory);
+    history->index = pc_bits & indexMask;
+    history->tag = (pc_bits >> floorLog2(numEntries)) & tagMask;
+    history->hit = hits(history);
+
+    if (history->hit) {
+        const LoopEntry &entry = table[history->index];
+        history->prevSpecIter = entry.specIter;
+        history->loopValid = entry.confidence == confidenceMax;
+        // After tripCount iterations the loop exits.
+        history->loopPred = entry.specIter == entry.tripCount ?
+            !entry.dir : entry.dir;
+    }
+
+    history->usedLoop = history->loopValid && useLoop >= 0;
+    history->pred = history->usedLoop ? history->loopPred :
+        history->basePred;
+
+    if (history->usedLoop && history->pred != history->basePred &&
+        !history->pred) {
+        // Correct the base predictor's speculative history the way a
+        // BTB miss does.  There is no such hook for a taken override,
+        // which the base only learns about at resolution.
+        base->BTBUpdate(branch_addr, history->baseHistory);
+    }
+
+    if (history->hit) {
+        LoopEntry &entry = table[history->index];
+        advance(entry, entry.specIter, history->pred);
+    }
+
+    bp_history = static_cast<void *>(history);
+
+    DPRINTF(Fetch, "Loop: lookup %#x hit %d valid %d loop %d base %d\n",
+            branch_addr, history->hit, history->loopValid,
+            history->loopPred, history->basePred);
+
+    return history->pred;
+}
+
+void
+LoopBP::uncondBr(void * &bp_history)
+{
+    BPHistory *history = historyPool.allocate();
+    history->uncond = true;
+    history->pred = true;
+    base->uncondBr(history->baseHistory);
+    bp_history = static_cast<void *>(history);
+}
+
+void
+LoopBP::BTBUpdate(Addr &branch_addr, void * &bp_history)
+{
+    BPHistory *history = static_cast<BPHistory *>(bp_history);
+
+    base->BTBUpdate(branch_addr, history->baseHistory);
+
+    if (history->pred && !history->uncond) {
+        history->pred = false;
+        if (history->hit && hits(history)) {
+            LoopEntry &entry = table[history->index];
+            entry.specIter = history->prevSpecIter;
+            advance(entry, entry.specIter, false);
+        }
+    }
+}
+
+bool
+LoopBP::lowConfidence(const void *bp_history) const
+{
+    const BPHistory *history = static_cast<const BPHistory *>(bp_history);
+    return !history->usedLoop && base->lowConfidence(history->baseHistory);
+}
+
+void
+LoopBP::train(const BPHistory *history, bool taken)
+{
+    LoopEntry &entry = table[history->index];
+
+    if (history->loopValid) {
+        if (history->loopPred != taken) {
+            // The loop did not behave as learned; forget it.
+            entry.valid = false;
+            return;
+        }
+        if (history->basePred != taken && entry.age < ageMax)
+            ++entry.age;
+    }
+
+    if (taken == entry.dir) {
+        if (entry.commitIter == iterMax) {
+            // Too long a loop to count.
+            entry.valid = false;
+            return;
+        }
+        ++entry.commitIter;
+        if (entry.tripCount && entry.commitIter > entry.tripCount) {
+            entry.tripCount = 0;
+            entry.confidence = 0;
+        }
+    } else {
+        if (entry.commitIter == 0) {
+            // Two exits in a row: not a loop in this direction.
+            entry.valid = false;
+            return;
+        }
+        if (entry.commitIter == entry.tripCount) {
+            if (entry.confidence < confidenceMax)
+                ++entry.confidence;
+        } else {
+            entry.tripCount = entry.commitIter;
+            entry.confidence = 0;
+        }
+        entry.commitIter = 0;
+    }
+}
+
+void
+LoopBP::allocate(const BPHistory *history, bool taken)
+{
+    LoopEntry &entry = table[history->index];
+
+    if (entry.valid && entry.age > 0) {
+        --entry.age;
+        return;
+    }
+
+    // The outcome that was missed is taken to be the loop exit.
+    entry.tag = history->tag;
+    entry.tripCount = 0;
+    entry.commitIter = 0;
+    entry.specIter = 0;
+    entry.confidence = 0;
+    entry.age = ageMax;
+    entry.dir = !taken;
+    entry.valid = true;
+    ++allocations;
+}
+
+void
+LoopBP::update(Addr &branch_addr, bool taken, void *bp_history,
+               bool squashed)
+{
+    BPHistory *history = static_cast<BPHistory *>(bp_history);
+
+    if (!history->uncond) {
+        if (history->usedLoop) {
+            ++overrides;
+            if (history->loopPred == taken) {
+                ++overridesCorrect;
+                if (history->basePred != taken)
+                    ++overridesFixed;
+            } else if (history->basePred == taken) {
+                ++overridesBroke;
+            }
+        }
+
+        if (history->loopValid && history->loopPred != history->basePred) {
+            if (history->loopPred == taken) {
+                if (useLoop < 7)
+                    ++useLoop;
+            } else {
+                if (useLoop > -8)
+                    --useLoop;
+            }
+        }
+
+        if (hits(history)) {
+            train(history, taken);
+        } else if (history->pred != taken) {
+            allocate(history, taken);
+        }
+
+        // Younger branches have been squashed, so the speculative count
+        // is rewound to this branch and advanced with its outcome.
+        if (squashed && history->hit && hits(history)) {
+            LoopEntry &entry = table[history->index];
+            entry.specIter = history->prevSpecIter;
+            advance(entry, entry.specIter, taken);
+        }
+    }
+
+    base->update(branch_addr, taken, history->baseHistory, squashed);
+
+    historyPool.release(history);
+}
+
+void
+LoopBP::squash(void *bp_history)
+{
+    BPHistory *history = static_cast<BPHistory *>(bp_history);
+
+    if (!history->uncond && history->hit && hits(history))
+        table[history->index].specIter = history->prevSpecIter;
+
+    base->squash(history->baseHistory);
+
+    historyPool.release(history);
+}
+
+void
+LoopBP::serialize(std::ostream &os)
+{
+    std::vector<uint16_t> tag(numEntries);
+    std::vector<uint16_t> trip_count(numEntries);
+    std::vector<uint16_t> commit_iter(numEntries);
+    std::vector<uint8_t> confidence(numEntries);
+    std::vector<uint8_t> age(numEntries);
+    std::vector<bool> dir(numEntries);
+    std::vector<bool> valid(numEntries);
+    for (unsigned i = 0; i < numEntries; ++i) {
+        tag[i] = table[i].tag;
+        trip_count[i] = table[i].tripCount;
+        commit_iter[i] = table[i].commitIter;
+        confidence[i] = table[i].confidence;
+        age[i] = table[i].age;
+        dir[i] = table[i].dir;
+        valid[i] = table[i].valid;
+    }
+    arrayParamOut(os, "tag", tag);
+    arrayParamOut(os, "tripCount", trip_count);
+    arrayParamOut(os, "commitIter", commit_iter);
+    arrayParamOut(os, "confidence", confidence);
+    arrayParamOut(os, "age", age);
+    arrayParamOut(os, "dir", dir);
+    arrayParamOut(os, "valid", valid);
+    SERIALIZE_SCALAR(useLoop);
+}
+
+void
+LoopBP::unserialize(Checkpoint *cp, const std::string &section)
+{
+    std::vector<uint16_t> tag(numEntries);
+    std::vector<uint16_t> trip_count(numEntries);
+    std::vector<uint16_t> commit_iter(numEntries);
+    std::vector<uint8_t> confidence(numEntries);
+    std::vector<uint8_t> age(numEntries);
+    std::vector<bool> dir(numEntries);
+    std::vector<bool> valid(numEntries);
+    unserializeTable(cp, section, "tag", tag);
+    unserializeTable(cp, section, "tripCount", trip_count);
+    unserializeTable(cp, section, "commitIter", commit_iter);
+    unserializeTable(cp, section, "confidence", confidence);
+    unserializeTable(cp, section, "age", age);
+    unserializeTable(cp, section, "dir", dir);
+    unserializeTable(cp, section, "valid", valid);
+    // Checkpoints are taken with no branches in flight, so the
+    // speculative counts equal the resolved ones.
+    for (unsigned i = 0; i < numEntries; ++i) {
+        table[i].tag = tag[i];
+        table[i].tripCount = trip_count[i];
+        table[i].commitIter = commit_iter[i];
+        table[i].specIter = commit_iter[i];
+        table[i].confidence = confidence[i];
+        table[i].age = age[i];
+        table[i].dir = dir[i];
+        table[i].valid = valid[i];
+    }
+    UNSERIALIZE_SCALAR(useLoop);
+}
+
+void
+LoopBP::regStats()
+{
+    overrides
+        .name(name() + ".overrides")
+        .desc("Number of predictions taken from the loop predictor")
+        ;
+
+    overridesCorrect
+        .name(name() + ".overridesCorrect")
+        .desc("Number of loop predictor overrides that were correct")
+        ;
+
+    overridesFixed
+        .name(name() + ".overridesFixed")
+        .desc("Number of correct overrides the base predictor got wrong")
+        ;
+
+    overridesBroke
+        .name(name() + ".overridesBroke")
+        .desc("Number of wrong overrides the base predictor got right")
+        ;
+
+    allocations
+        .name(name() + ".allocations")
+        .desc("Number of loop table entries allocated")
+        ;
+}
+
+LoopBP *
+LoopBPParams::create()
+{
+    return new LoopBP(this);
+}
@@ -0,0 +1,195 @@
+/*
+ * Loop predictor overriding another branch predictor.
+ */
+
+#ifndef __CPU_PRED_LOOP_PREDICTOR_HH__
+#define __CPU_PRED_LOOP_PREDICTOR_HH__
+
+#include <vector>
+
+#include "base/statistics.hh"
+#include "base/types.hh"
+#include "cpu/pred/branch_predictor.hh"
+#include "cpu/pred/history_pool.hh"
+#include "params/LoopBP.hh"
+
+/**
+ * Wraps another branch predictor with a loop predictor, as in Seznec's
+ * L-TAGE.  The loop predictor learns the trip count of branches that go
+ * the same way a fixed number of times and then the other way once, and
+ * once it has seen the same count a few times in a row it overrides the
+ * base predictor, which usually mispredicts the exit of loops whose trip
+ * count is longer than its history.
+ *
+ * Each entry keeps two iteration counts: one advanced as branches are
+ * predicted, which the predictions are made from and which is rewound
+ * through the history records on a squash, and one advanced as branches
+ * resolve, which the trip count is learned from.  A global counter
+ * tracks whether overriding has been paying off, and the base predictor
+ * is trusted again while it has not.
+ */
+class LoopBP : public BPredictor
+{
+  public:
+    typedef LoopBPParams Params;
+
+    /**
+     * @param params The params object, with the base predictor and the
+     * size of the loop table.
+     */
+    LoopBP(const Params *params);
+
+    bool lookup(Addr &branch_addr, void * &bp_history);
+
+    void uncondBr(void * &bp_history);
+
+    void BTBUpdate(Addr &branch_addr, void * &bp_history);
+
+    void update(Addr &branch_addr, bool taken, void *bp_history,
+                bool squashed);
+
+    void squash(void *bp_history);
+
+    /** Clears the loop table. */
+    void reset();
+
+    /** Returns the occupancy counters of the BPHistory pool. */
+    const HistoryPoolBase *getHistoryPool() const { return &historyPool; }
+
+    /**
+     * Overridden predictions are confident; otherwise the base
+     * predictor's confidence is returned.
+     */
+    bool lowConfidence(const void *bp_history) const;
+
+    /** Writes the loop table to a checkpoint. */
+    void serialize(std::ostream &os);
+
+    /** Restores the loop table from a checkpoint. */
+    void unserialize(Checkpoint *cp, const std::string &section);
+
+    /** Registers the override statistics. */
+    void regStats();
+
+  private:
+    /** An entry of the loop table. */
+    struct LoopEntry {
+        /** Partial tag. */
+        uint16_t tag;
+        /** Iterations between exits last seen, 0 if not learned yet. */
+        uint16_t tripCount;
+        /** Iterations of the resolved branches since the last exit. */
+        uint16_t commitIter;
+        /** Iterations of the predicted branches since the last exit. */
+        uint16_t specIter;
+        /** Number of times in a row tripCount was confirmed. */
+        uint8_t confidence;
+        /** Replacement age, decremented by allocations that find the
+         * entry taken. */
+        uint8_t age;
+        /** Direction of the branch while the loop iterates. */
+        bool dir;
+        /** Whether the entry holds a branch. */
+        bool valid;
+    };
+
+    struct BPHistory {
+        /** History record of the base predictor. */
+        void *baseHistory;
+        /** Index into the loop table. */
+        unsigned index;
+        /** Tag of the branch. */
+        uint16_t tag;
+        /** specIter of the entry before this branch advanced it. */
+        uint16_t prevSpecIter;
+        /** Whether the branch hit in the loop table. */
+        bool hit;
+        /** Whether the loop predictor was confident. */
+        bool loopValid;
+        /** Prediction of the loop predictor. */
+        bool loopPred;
+        /** Prediction of the base predictor. */
+        bool basePred;
+        /** Final prediction. */
+        bool pred;
+        /** Whether the loop prediction was used. */
+        bool usedLoop;
+        /** Whether this is an unconditional branch. */
+        bool uncond;
+    };
+
+    /** Whether an entry still holds the branch a record looked up. */
+    bool hits(const BPHistory *history) const
+    {
+        const LoopEntry &entry = table[history->index];
+        return entry.valid && entry.tag == history->tag;
+    }
+
+    /** Advances an iteration count by one outcome of its branch. */
+    void advance(const LoopEntry &entry, uint16_t &iter, bool taken)
+    {
+        if (taken == entry.dir) {
+            if (iter < iterMax)
+                ++iter;
+        } else {
+            iter = 0;
+        }
+    }
+
+    /** Learns the trip count from a resolved branch. */
+    void train(const BPHistory *history, bool taken);
+
+    /** Allocates an entry for a branch the final prediction missed. */
+    void allocate(const BPHistory *history, bool taken);
+
+    /** The predictor overridden when the loop predictor is confident. */
+    BPredictor *base;
+
+    /** Number of loop table entries. */
+    unsigned numEntries;
+
+    /** Mask to get an index into the loop table. */
+    unsigned indexMask;
+
+    /** Mask to get a partial tag. */
+    unsigned tagMask;
+
+    /** Largest iteration count. */
+    uint16_t iterMax;
+
+    /** Confidence at which the loop predictor is used. */
+    uint8_t confidenceMax;
+
+    /** Age given to new entries. */
+    uint8_t ageMax;
+
+    /** Number of bits to shift the PC by before indexing. */
+    unsigned instShiftAmt;
+
+    /** Overrides when not negative; counts up when the loop predictor
+     * was right where the base was wrong, and down the other way. */
+    int8_t useLoop;
+
+    /** The loop table. */
+    std::vector<LoopEntry> table;
+
+    /** Pool the BPHistory records are allocated from. */
+    HistoryPool<BPHistory> historyPool;
+
+    /** Stat for predictions taken from the loop predictor. */
+    Stats::Scalar overrides;
+
+    /** Stat for overrides that were correct. */
+    Stats::Scalar overridesCorrect;
+
+    /** Stat for correct overrides the base predictor got wrong. */
+    Stats::Scalar overridesFixed;
+
+    /** Stat for wrong overrides the base predictor got right. */
+    Stats::Scalar overridesBroke;
+
+    /** Stat for loop table entries allocated. */
+    Stats::Scalar allocations;
+};
+
+#endif // __CPU_PRED_LOOP_PREDICTOR_HH__
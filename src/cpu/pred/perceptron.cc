@@ -3,37 +3,42 @@
 #include "base/trace.hh"
 #include "cpu/pred/perceptron.hh"
 #include "debug/Perceptron.hh"
-#include <numeric>
+#include "sim/serialize.hh"
+#include <algorithm>
 #include <string>
 
-PerceptronBP::PerceptronBP(uint32_t size, uint32_t theta)
+PerceptronBP::PerceptronBP(uint32_t size, unsigned weight_bits)
 {
     if (!size) {
       fatal("PerceptronBP must have size > 0");
     }
+    if (weight_bits < 2 || weight_bits > 8) {
+      fatal("Perceptron weights must be between 2 and 8 bits");
+    }
     this->W.resize(size);
     this->size = size;
-    this->theta = theta;
+    this->weightMax = (1 << (weight_bits - 1)) - 1;
+    this->weightMin = -(1 << (weight_bits - 1));
 
     // fills W with 0's from [begin, end)
     std::fill(this->W.begin(), this->W.end(), 0);
 }
 
 int32_t
-PerceptronBP::getPrediction(std::vector<int8_t>& X)
+PerceptronBP::getPrediction(const GlobalHistory &hist, unsigned head)
 {
-    /* TODO - this function may require X as an input, depending on how the history register is handled*/
-    int32_t innerProdManual = 0;
-    int32_t innerProdStd =  std::inner_product(X.begin(), X.end(), this->W.begin(), 0);
+    assert(hist.length() + 1 == this->W.size());
 
-    for(int i=0;i < X.size();i++){
-      innerProdManual += X[i] * this->W[i];
+    // X[0] is the bias input, always 1; X[i] is +1 if the (i-1)th most
+    // recent branch was taken and -1 otherwise.
+    int32_t y = this->W[0];
+    for (unsigned i = 1; i < this->size; i++) {
+        if (hist.outcome(head, i - 1))
+            y += this->W[i];
+        else
+            y -= this->W[i];
     }
-
-    assert(innerProdStd == innerProdManual);
-    assert(X.size() == this->W.size());
-    return innerProdStd;
-  
+    return y;
 }
 
 void
@@ -48,29 +53,112 @@ PerceptronBP::reset()
 }
 
 
-void 
-PerceptronBP::train(int8_t branch_outcome, int32_t perceptron_output, int32_t training_threshold, std::vector<int8_t> &X)
+void
+PerceptronBP::train(int8_t branch_outcome, int32_t perceptron_output,
+                    int32_t training_threshold, const GlobalHistory &hist,
+                    unsigned head)
 {
     std::string s = "W: ";
     DPRINTF(Perceptron, "Perceptron train entered\n");
     if (this->changeToPlusMinusOne(perceptron_output) != branch_outcome || abs(perceptron_output)<=training_threshold) {//incorrect perceptron prediction. Upgrade the perceptron predictor
         for(int i=0; i< this->W.size(); i++) {
-            W[i]= W[i]+ branch_outcome * X[i]; //Increase or decrease weight vectors
-            if(abs(W[i]) > this->theta){
-              if (W[i] < 0){
-                W[i] = theta * -1;
-              }
-              else{
-                W[i] = theta;
-              }
+            int8_t x = (i == 0 || hist.outcome(head, i - 1)) ? 1 : -1;
+            //Increase or decrease weight vectors, saturating at the
+            //weight width
+            int32_t w = W[i] + branch_outcome * x;
+            if (w > this->weightMax)
+              w = this->weightMax;
+            else if (w < this->weightMin)
+              w = this->weightMin;
+            W[i] = w;
+            if (DTRACE(Perceptron)) {
+                s.append(std::to_string((long long int)W[i]));
+                s.append(", ");
             }
-            s.append(std::to_string((long long int)W[i]));
-            s.append(", ");
         }
     }
     DPRINTF(Perceptron, "%s\n", s);
 }
 
+void
+PerceptronBP::serialize(const std::string &base, std::ostream &os)
+{
+    arrayParamOut(os, base + ".W", W);
+}
+
+void
+PerceptronBP::unserialize(const std::string &base, Checkpoint *cp,
+                          const std::string &section)
+{
+    // Read wide so that weights of a checkpoint taken with wider
+    // weights saturate rather than fail to parse.
+    std::vector<int32_t> restored;
+    arrayParamIn(cp, section, base + ".W", restored);
+    if (restored.size() != size) {
+        fatal("Perceptron %s:%s has %d weights, expected %d\n",
+              section, base, restored.size(), size);
+    }
+    for (unsigned i = 0; i < size; i++)
+        W[i] = std::max<int32_t>(weightMin,
+                                 std::min<int32_t>(weightMax, restored[i]));
+}
+
+PerceptronThreshold::PerceptronThreshold(int32_t theta, unsigned ctr_bits,
+                                         bool adaptive)
+    : theta(theta), adaptive(adaptive), ctr(0)
+{
+    if (theta < 0) {
+        fatal("Perceptron training threshold must not be negative");
+    }
+    // A 1-bit counter has no positive range, so it would never raise
+    // the threshold.
+    if (ctr_bits < 2 || ctr_bits > 16) {
+        fatal("Threshold counter must be between 2 and 16 bits");
+    }
+    ctrMax = (1 << (ctr_bits - 1)) - 1;
+    ctrMin = -(1 << (ctr_bits - 1));
+}
+
+void
+PerceptronThreshold::update(bool mispredicted, int32_t perceptron_output)
+{
+    if (!adaptive)
+        return;
+
+    if (mispredicted) {
+        if (++ctr == ctrMax) {
+            ++theta;
+            ctr = 0;
+            DPRINTF(Perceptron, "Training threshold raised to %d\n", theta);
+        }
+    } else if (abs(perceptron_output) <= theta) {
+        if (--ctr == ctrMin) {
+            if (theta > 0)
+                --theta;
+            ctr = 0;
+            DPRINTF(Perceptron, "Training threshold lowered to %d\n", theta);
+        }
+    }
+}
+
+void
+PerceptronThreshold::serialize(const std::string &base, std::ostream &os)
+{
+    paramOut(os, base + ".theta", theta);
+    paramOut(os, base + ".ctr", ctr);
+}
+
+void
+PerceptronThreshold::unserialize(const std::string &base, Checkpoint *cp,
+                                 const std::string &section)
+{
+    // Checkpoints from before the threshold was fitted keep the initial
+    // one.
+    if (optParamIn(cp, section, base + ".theta", theta))
+        paramIn(cp, section, base + ".ctr", ctr);
+    ctr = std::max(ctrMin, std::min(ctrMax, ctr));
+}
+
 inline int8_t
 PerceptronBP::changeToPlusMinusOne(int32_t input)
 {
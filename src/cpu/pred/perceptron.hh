@@ -1,9 +1,14 @@
 #ifndef __CPU_O3_PERCEPTRON_LOCAL_PRED_HH__
 #define __CPU_O3_PERCEPTRON_LOCAL_PRED_HH__
 
+#include <iosfwd>
+#include <string>
 #include <vector>
 
 #include "base/types.hh"
+#include "cpu/pred/global_history.hh"
+
+class Checkpoint;
 
 /**
  * Implements a local predictor that uses the PC to index into a table of
@@ -18,14 +23,18 @@ class PerceptronBP
     /**
      * Default branch predictor constructor.
      * @param size How many elements the W vector should be. Must be >= 1
+     * @param weight_bits Width the weights saturate at, at most 8.
      */
-    PerceptronBP(uint32_t size, uint32_t theta);
+    PerceptronBP(uint32_t size, unsigned weight_bits);
 
     /**
-     * Computes the dot product of X and W
+     * Computes the dot product of X and W, where X is the bias input
+     * followed by the global history as seen from a saved head.
+     * @param hist The global history register.
+     * @param head The head of hist the prediction is made with.
      * @return A number > 0 implies predict taken
      */
-    int32_t getPrediction(std::vector<int8_t>& X); 
+    int32_t getPrediction(const GlobalHistory &hist, unsigned head);
 
     /*
      * Resets the perceptrion's W values
@@ -37,16 +46,77 @@ class PerceptronBP
      * @param branch_outcome actual result of last branch - Taken = 1, not taken = -1
      * @param perceptron_output predicted result of branch - Taken = 1, note taken = -1 
      * @param training_threshold training threshold
-     * @param X - vector for global branch history
+     * @param hist The global history register.
+     * @param head The head of hist the prediction was made with.
      */
-    void train(int8_t branch_outcome, int32_t perceptron_output, int32_t training_threshold, std::vector<int8_t>& X);
+    void train(int8_t branch_outcome, int32_t perceptron_output,
+               int32_t training_threshold, const GlobalHistory &hist,
+               unsigned head);
+
+    /** Writes the weights to a checkpoint. */
+    void serialize(const std::string &base, std::ostream &os);
+
+    /** Restores weights written by serialize(). */
+    void unserialize(const std::string &base, Checkpoint *cp,
+                     const std::string &section);
   private:
     inline int8_t changeToPlusMinusOne(int32_t input);
 
     /** W array which stores weights for perceptrion branch predictor */
     uint32_t size;
-    uint32_t theta;
-    std::vector<int32_t> W;
+    std::vector<int8_t> W;
+
+    /** Largest and smallest weight. */
+    int8_t weightMax;
+    int8_t weightMin;
+};
+
+/**
+ * Training threshold shared by the perceptrons of a predictor.  With
+ * fitting enabled, as in Seznec's O-GEHL, a counter goes up on each
+ * misprediction and down on each correct prediction trained because its
+ * output was within the threshold, and the threshold is raised when the
+ * counter saturates high and lowered when it saturates low, keeping the
+ * two kinds of training in balance.
+ */
+class PerceptronThreshold
+{
+  public:
+    /**
+     * @param theta The initial threshold.
+     * @param ctr_bits Width of the fitting counter, at least 2 bits.
+     * @param adaptive Whether the threshold is fitted at all.
+     */
+    PerceptronThreshold(int32_t theta, unsigned ctr_bits, bool adaptive);
+
+    /** The current threshold. */
+    int32_t value() const { return theta; }
+
+    /**
+     * Fits the threshold to a resolved branch.
+     * @param mispredicted Whether the perceptron mispredicted it.
+     * @param perceptron_output The output it was predicted with.
+     */
+    void update(bool mispredicted, int32_t perceptron_output);
+
+    /** Writes the threshold to a checkpoint. */
+    void serialize(const std::string &base, std::ostream &os);
+
+    /** Restores the threshold, if the checkpoint has one. */
+    void unserialize(const std::string &base, Checkpoint *cp,
+                     const std::string &section);
+
+  private:
+    /** The training threshold. */
+    int32_t theta;
+
+    /** Whether the threshold is fitted. */
+    bool adaptive;
+
+    /** Fitting counter and its saturation values. */
+    int32_t ctr;
+    int32_t ctrMax;
+    int32_t ctrMin;
 };
 
 #endif // __CPU_O3_PERCEPTRON_LOCAL_PRED_HH__
@@ -2,6 +2,9 @@
 * Authors: Alex Ionescu, Nick Pfister
 */
 
+#include <cstdlib>
+
+#include "base/cprintf.hh"
 #include "base/intmath.hh"
 #include "base/misc.hh"
 #include "base/trace.hh"
@@ -9,31 +12,35 @@
 #include "cpu/pred/perceptron.hh"
 #include "cpu/pred/perceptron_top.hh"
 
-PerceptronBP_Top::PerceptronBP_Top(unsigned globalPredictorSize, unsigned globalHistBits, int32_t theta)
+PerceptronBP_Top::PerceptronBP_Top(const Params *params)
+    : BPredictor(params), globalHistReg(params->globalHistoryBits - 1),
+      theta(params->theta ? params->theta : 2 * params->globalHistoryBits + 14,
+            params->thetaCtrBits, params->adaptiveTheta)
 {
+  unsigned globalPredictorSize = params->globalPredictorSize;
+  unsigned globalHistBits = params->globalHistoryBits;
+  unsigned weightBits = params->weightBits;
 
-  DPRINTF(Perceptron, "BP_Top Constructor Start %d %d %d\n", globalPredictorSize, globalHistBits, theta);
-	this->globalPredictorSize = floorPow2(globalPredictorSize/(globalHistBits * ceilLog2(theta)));
-	this->globalHistBits = globalHistBits;
+  DPRINTF(Perceptron, "BP_Top Constructor Start %d %d %d\n", globalPredictorSize, globalHistBits, theta.value());
 
 	if (!isPowerOf2(globalPredictorSize)) {
         fatal("Invalid perceptron table size!\n");
     }
 
+	// globalPredictorSize is a budget of weight bits.
+	if (globalPredictorSize < globalHistBits * weightBits) {
+        fatal("Perceptron table budget too small for a single perceptron!\n");
+    }
+	this->globalPredictorSize = floorPow2(globalPredictorSize/(globalHistBits * weightBits));
+	this->globalHistBits = globalHistBits;
 
-	for(int i=0;i < globalPredictorSize; i++) { //create perceprton table
-		this->perceptronTable.push_back(new PerceptronBP(globalHistBits, theta));
-	}
-
-	this->X.push_back(1);
-	for(int i=1;i < globalHistBits; i++) { //
-		this->X.push_back(-1);
+	for(int i=0;i < this->globalPredictorSize; i++) { //create perceprton table
+		this->perceptronTable.push_back(new PerceptronBP(globalHistBits, weightBits));
 	}
 
 	this->globalHistoryMask = (unsigned)(power(2,globalHistBits) - 1);
 
-	this->theta = theta;
-  DPRINTF(Perceptron, "BP_Top Constructed %d %d %d %d\n", this->globalPredictorSize, this->globalHistBits, this->theta, this->globalHistoryMask);
+  DPRINTF(Perceptron, "BP_Top Constructed %d %d %d %d\n", this->globalPredictorSize, this->globalHistBits, theta.value(), this->globalHistoryMask);
 
   this->missCount = 0;
 }
@@ -44,14 +51,19 @@ PerceptronBP_Top::lookup(Addr &branch_addr, void * &bp_history)
   DPRINTF(Perceptron, "BP_Top entered lookup\n");
 	//PerceptronBP* curr_perceptron = this->perceptronTable[ (branch_addr >> 2) & this->globalHistoryMask];
 	PerceptronBP* curr_perceptron = this->perceptronTable[ (branch_addr >> 2) & (this->globalPredictorSize - 1)];
-	BPHistory *history = new BPHistory;
-	history->perceptron_y = curr_perceptron->getPrediction(this->X);
-  history->X = X;
+	BPHistory *history = historyPool.allocate();
+	history->historyHead = globalHistReg.getHead();
+	history->uncond = false;
+	history->perceptron_y = curr_perceptron->getPrediction(globalHistReg, history->historyHead);
 	bp_history = static_cast<void *>(history);
 
 	// y 
   DPRINTF(Perceptron, "BP_Top lookup y: %d\n", history->perceptron_y);
   DPRINTF(Perceptron, "BP_Top branch_addr %x\n", branch_addr);
+
+	// Speculatively shift in the prediction; squash() and a squashing
+	// update() rewind to the head saved above.
+	globalHistReg.push(history->perceptron_y >= 0);
 	return (history->perceptron_y) >= 0;
 
 }
@@ -59,11 +71,16 @@ PerceptronBP_Top::lookup(Addr &branch_addr, void * &bp_history)
 void
 PerceptronBP_Top::BTBUpdate(Addr &branch_addr, void * &bp_history)
 {
-
+    // Called to update predictor history when
+    // a BTB entry is invalid or not found.
+    BPHistory *history = static_cast<BPHistory *>(bp_history);
+    globalHistReg.restore(history->historyHead);
+    globalHistReg.push(false);
 }
 
 void
-PerceptronBP_Top::update(Addr &branch_addr, bool taken, void *bp_history)
+PerceptronBP_Top::update(Addr &branch_addr, bool taken, void *bp_history,
+                         bool squashed)
 {
   BPHistory *history;
   DPRINTF(Perceptron, "BP_Top entered update, yhist %d\n",  static_cast<BPHistory *>(bp_history)->perceptron_y);
@@ -72,11 +89,18 @@ PerceptronBP_Top::update(Addr &branch_addr, bool taken, void *bp_history)
     history = static_cast<BPHistory *>(bp_history);
     //PerceptronBP* curr_perceptron = this->perceptronTable[ (branch_addr >> 2) & this->globalHistoryMask];
     PerceptronBP* curr_perceptron = this->perceptronTable[ (branch_addr >> 2) & (this->globalPredictorSize - 1)];
-    curr_perceptron->train(this->changeToPlusMinusOne((int32_t)taken), history->perceptron_y, this->theta, history->X);
-    this->X.insert(this->X.begin() + 1, this->changeToPlusMinusOne((int32_t)taken));
-    this->X.pop_back();
-    
-    DPRINTF(Perceptron, "BP_Top update after train %d\n", curr_perceptron->getPrediction(this->X)); //static_cast<BPHistory *>(bp_history)->perceptron_y);
+    curr_perceptron->train(this->changeToPlusMinusOne((int32_t)taken), history->perceptron_y, theta.value(), globalHistReg, history->historyHead);
+    if (!history->uncond)
+      theta.update(taken != (history->perceptron_y >= 0), history->perceptron_y);
+
+    // The history was updated speculatively at lookup; it only needs
+    // repairing if this branch was mispredicted.
+    if (squashed) {
+      globalHistReg.restore(history->historyHead);
+      globalHistReg.push(taken);
+    }
+
+    DPRINTF(Perceptron, "BP_Top update after train %d\n", curr_perceptron->getPrediction(globalHistReg, history->historyHead)); //static_cast<BPHistory *>(bp_history)->perceptron_y);
     DPRINTF(Perceptron, "BP_Top update taken %d\n", taken);
     DPRINTF(Perceptron, "BP_Top update branch_addr %x\n", branch_addr);
 
@@ -85,7 +109,7 @@ PerceptronBP_Top::update(Addr &branch_addr, bool taken, void *bp_history)
       DPRINTF(Perceptron, "Miss Count: %d\n", this->missCount);
     }
 
-    delete history;
+    historyPool.release(history);
   }
 
 }
@@ -96,8 +120,20 @@ PerceptronBP_Top::squash(void *bp_history)
     DPRINTF(Perceptron, "BP_Top entered squash\n");
     BPHistory *history = static_cast<BPHistory *>(bp_history);
 
-    // Delete this BPHistory now that we're done with it.
-    delete history;
+    // Restore the history to its state prior to this branch.
+    globalHistReg.restore(history->historyHead);
+
+    // Return this BPHistory to the pool now that we're done with it.
+    historyPool.release(history);
+}
+
+bool
+PerceptronBP_Top::lowConfidence(const void *bp_history) const
+{
+    const BPHistory *history = static_cast<const BPHistory *>(bp_history);
+    // The perceptron still trains on outputs this close to zero.
+    return history && !history->uncond &&
+        abs(history->perceptron_y) <= theta.value();
 }
 
 void
@@ -109,10 +145,13 @@ PerceptronBP_Top::reset()
 void 
 PerceptronBP_Top::uncondBr(void * &bp_history)
 {
-    BPHistory *history = new BPHistory;
+    BPHistory *history = historyPool.allocate();
     history->perceptron_y = 1; //anything greater than 0 is taken
-    history->X = X;
+    history->uncond = true;
+    history->historyHead = globalHistReg.getHead();
 	  bp_history = static_cast<void *>(history);
+
+    globalHistReg.push(true);
 }
 
 inline int8_t
@@ -120,3 +159,29 @@ PerceptronBP_Top::changeToPlusMinusOne(int32_t input)
 {
   return (input > 0) ? 1 : -1;
 }
+
+void
+PerceptronBP_Top::serialize(std::ostream &os)
+{
+    for (unsigned i = 0; i < perceptronTable.size(); ++i)
+        perceptronTable[i]->serialize(csprintf("perceptron%d", i), os);
+    theta.serialize("theta", os);
+    globalHistReg.serialize("globalHistReg", os);
+}
+
+void
+PerceptronBP_Top::unserialize(Checkpoint *cp, const std::string &section)
+{
+    for (unsigned i = 0; i < perceptronTable.size(); ++i) {
+        perceptronTable[i]->unserialize(csprintf("perceptron%d", i), cp,
+                                        section);
+    }
+    theta.unserialize("theta", cp, section);
+    globalHistReg.unserialize("globalHistReg", cp, section);
+}
+
+PerceptronBP_Top *
+PerceptronBPParams::create()
+{
+    return new PerceptronBP_Top(this);
+}
@@ -9,7 +9,11 @@
 
 #include "base/types.hh"
 #include "cpu/o3/sat_counter.hh"
+#include "cpu/pred/branch_predictor.hh"
+#include "cpu/pred/global_history.hh"
+#include "cpu/pred/history_pool.hh"
 #include "cpu/pred/perceptron.hh"
+#include "params/PerceptronBP.hh"
 
 /**
  * Implements a global predictor that uses the PC to index into a table of
@@ -18,15 +22,18 @@
  * predictor state that needs to be recorded or updated; the update can be
  * determined solely by the branch being taken or not taken.
  */
-class PerceptronBP_Top
+class PerceptronBP_Top : public BPredictor
 {
   public:
+    typedef PerceptronBPParams Params;
+
     /**
      * Default branch predictor constructor.
-     * @param globalPredictorSize number of perceptrons.
-     * @param globalHistBits Number of bits in global history register.
+     * @param params The params object, with the storage budget of the
+     * perceptron table, the number of bits in the global history
+     * register, the weight width and the training threshold settings.
      */
-    PerceptronBP_Top(unsigned globalPredictorSize, unsigned globalHistBits, int32_t theta);
+    PerceptronBP_Top(const Params *params);
 
     /**
      * Looks up the given address in the branch predictor and returns
@@ -51,7 +58,8 @@ class PerceptronBP_Top
      * @param branch_addr The address of the branch to update.
      * @param taken Whether or not the branch was taken.
      */
-    void update(Addr &branch_addr, bool taken, void *bp_history);
+    void update(Addr &branch_addr, bool taken, void *bp_history,
+                bool squashed);
 
     void uncondBr(void * &bp_history);
 
@@ -59,6 +67,17 @@ class PerceptronBP_Top
 
     void reset();
 
+    /** Returns the occupancy counters of the BPHistory pool. */
+    const HistoryPoolBase *getHistoryPool() const { return &historyPool; }
+
+    /** Whether the perceptron output was within the training threshold. */
+    bool lowConfidence(const void *bp_history) const;
+
+    /** Writes the predictor tables and history to a checkpoint. */
+    void serialize(std::ostream &os);
+
+    /** Restores the predictor tables and history from a checkpoint. */
+    void unserialize(Checkpoint *cp, const std::string &section);
   private:
     inline int8_t changeToPlusMinusOne(int32_t input);
 
@@ -78,17 +97,23 @@ class PerceptronBP_Top
     unsigned long globalHistoryMask;
 
     /** Global history register. */
-    std::vector<int8_t> X;
+    GlobalHistory globalHistReg;
 
-    /** Training constraint */
-    int8_t theta;
+    /** Training threshold. */
+    PerceptronThreshold theta;
 
     long long int missCount;
 
     struct BPHistory {
         int32_t perceptron_y;
-	std::vector<int8_t>X;
-	};
+        /** Head of globalHistReg the branch was predicted with. */
+        unsigned historyHead;
+        /** Whether this is an unconditional branch. */
+        bool uncond;
+    };
+
+    /** Pool the BPHistory records are allocated from. */
+    HistoryPool<BPHistory> historyPool;
 
 };
 
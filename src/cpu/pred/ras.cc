@@ -28,7 +28,9 @@
  * Authors: Kevin Lim
  */
 
+#include "base/misc.hh"
 #include "cpu/pred/ras.hh"
+#include "sim/serialize.hh"
 
 void
 ReturnAddrStack::init(unsigned _numEntries)
@@ -47,7 +49,7 @@ ReturnAddrStack::reset()
         addrStack[i].set(0);
 }
 
-void
+bool
 ReturnAddrStack::push(const TheISA::PCState &return_addr)
 {
     incrTos();
@@ -56,24 +58,67 @@ ReturnAddrStack::push(const TheISA::PCState &return_addr)
 
     if (usedEntries != numEntries) {
         ++usedEntries;
+        return false;
     }
+    return true;
 }
 
-void
+bool
 ReturnAddrStack::pop()
 {
+    decrTos();
+
     if (usedEntries > 0) {
         --usedEntries;
+        return false;
     }
+    return true;
+}
 
-    decrTos();
+ReturnAddrStack::State
+ReturnAddrStack::save() const
+{
+    State state;
+    state.tos = tos;
+    state.usedEntries = usedEntries;
+    state.next = addrStack[tos + 1 == numEntries ? 0 : tos + 1];
+    return state;
+}
+
+void
+ReturnAddrStack::restore(const State &state)
+{
+    tos = state.tos;
+    usedEntries = state.usedEntries;
+    addrStack[tos + 1 == numEntries ? 0 : tos + 1] = state.next;
+}
+
+void
+ReturnAddrStack::serialize(const std::string &base, std::ostream &os)
+{
+    std::vector<Addr> addrs(numEntries);
+    for (unsigned i = 0; i < numEntries; ++i)
+        addrs[i] = addrStack[i].instAddr();
+
+    arrayParamOut(os, base + ".addrStack", addrs);
+    paramOut(os, base + ".usedEntries", usedEntries);
+    paramOut(os, base + ".tos", tos);
 }
 
 void
-ReturnAddrStack::restore(unsigned top_entry_idx,
-                         const TheISA::PCState &restored)
+ReturnAddrStack::unserialize(const std::string &base, Checkpoint *cp,
+                             const std::string &section)
 {
-    tos = top_entry_idx;
+    std::vector<Addr> addrs;
+    arrayParamIn(cp, section, base + ".addrStack", addrs);
+    if (addrs.size() != numEntries) {
+        fatal("RAS %s:%s does not have %d entries\n", section, base,
+              numEntries);
+    }
+
+    for (unsigned i = 0; i < numEntries; ++i)
+        addrStack[i].set(addrs[i]);
 
-    addrStack[tos] = restored;
+    paramIn(cp, section, base + ".usedEntries", usedEntries);
+    paramIn(cp, section, base + ".tos", tos);
 }
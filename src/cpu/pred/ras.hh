@@ -31,16 +31,43 @@
 #ifndef __CPU_O3_RAS_HH__
 #define __CPU_O3_RAS_HH__
 
+#include <iosfwd>
+#include <string>
 #include <vector>
 
 #include "arch/types.hh"
 #include "base/types.hh"
 #include "config/the_isa.hh"
 
-/** Return address stack class, implements a simple RAS. */
+class Checkpoint;
+
+/**
+ * Return address stack class, implements a simple RAS.  Before a branch
+ * pushes or pops the stack, the BPredUnit saves its state in the branch's
+ * history record, and restores it if the branch is squashed or turns out
+ * to have been mispredicted.  As squashed branches are undone youngest
+ * first, and a push or pop changes at most the top of stack index, the
+ * occupancy and the entry a push writes, restoring those brings back the
+ * exact stack a branch saw, however deep the wrong path went.
+ */
 class ReturnAddrStack
 {
   public:
+    /** The state of the RAS a push or pop can change. */
+    struct State
+    {
+        State() : tos(0), usedEntries(0), next(0) {}
+
+        /** The top of stack index. */
+        unsigned tos;
+
+        /** The number of used entries. */
+        unsigned usedEntries;
+
+        /** The entry above the top, which a push overwrites. */
+        TheISA::PCState next;
+    };
+
     /** Creates a return address stack, but init() must be called prior to
      *  use.
      */
@@ -61,22 +88,39 @@ class ReturnAddrStack
     unsigned topIdx()
     { return tos; }
 
-    /** Pushes an address onto the RAS. */
-    void push(const TheISA::PCState &return_addr);
+    /** Pushes an address onto the RAS.
+     *  @return Whether the oldest entry was overwritten.
+     */
+    bool push(const TheISA::PCState &return_addr);
+
+    /** Pops the top address from the RAS.
+     *  @return Whether the RAS was empty.
+     */
+    bool pop();
 
-    /** Pops the top address from the RAS. */
-    void pop();
+    /** Returns the state to restore the RAS to if the next push or pop
+     *  has to be undone.
+     */
+    State save() const;
 
-    /** Changes index to the top of the RAS, and replaces the top address with
-     *  a new target.
-     *  @param top_entry_idx The index of the RAS that will now be the top.
-     *  @param restored The new target address of the new top of the RAS.
+    /** Restores the RAS to a state returned by save().
+     *  @param state The state saved before the push or pop to undo.
      */
-    void restore(unsigned top_entry_idx, const TheISA::PCState &restored);
+    void restore(const State &state);
 
      bool empty() { return usedEntries == 0; }
 
      bool full() { return usedEntries == numEntries; }
+
+    /** Writes the stack to a checkpoint.  Only the address of each
+     *  return target is kept.
+     */
+    void serialize(const std::string &base, std::ostream &os);
+
+    /** Restores a stack written by serialize(). */
+    void unserialize(const std::string &base, Checkpoint *cp,
+                     const std::string &section);
+
   private:
     /** Increments the top of stack index. */
     inline void incrTos()
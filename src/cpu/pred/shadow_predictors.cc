@@ -0,0 +1,72 @@
+/*
+ * Branch predictors evaluated alongside the one that steers fetch.
+ */
+
+#include "base/misc.hh"
+#include "cpu/pred/shadow_predictors.hh"
+
+ShadowPredictors::ShadowPredictors(const std::string &name,
+                                   const std::vector<BPredictor *> &_shadows,
+                                   const BPredictor *bpred)
+    : _name(name), shadows(_shadows)
+{
+    for (unsigned i = 0; i < shadows.size(); ++i) {
+        if (shadows[i] == bpred)
+            fatal("%s: the branch predictor can't also be a shadow "
+                  "predictor\n", name);
+        for (unsigned j = 0; j < i; ++j) {
+            if (shadows[j] == shadows[i])
+                fatal("%s: shadow predictor %s is listed twice\n",
+                      name, shadows[i]->name());
+        }
+    }
+}
+
+void
+ShadowPredictors::regStats()
+{
+    condPredicted
+        .init(shadows.size())
+        .name(name() + ".shadowCondPredicted")
+        .desc("Number of conditional branches predicted by each shadow "
+              "predictor")
+        ;
+
+    condIncorrect
+        .init(shadows.size())
+        .name(name() + ".shadowCondIncorrect")
+        .desc("Number of conditional branches incorrect for each shadow "
+              "predictor")
+        ;
+
+    accuracy
+        .name(name() + ".shadowAccuracy")
+        .desc("Fraction of conditional branches each shadow predictor "
+              "predicted correctly")
+        .precision(6)
+        ;
+    accuracy = (condPredicted - condIncorrect) / condPredicted;
+
+    for (unsigned i = 0; i < shadows.size(); ++i) {
+        // Entries are named after the predictor's own name within the
+        // CPU, which config.ini maps to its type and parameters.
+        std::string shadow_name = shadows[i]->name();
+        shadow_name = shadow_name.substr(shadow_name.rfind('.') + 1);
+        condPredicted.subname(i, shadow_name);
+        condIncorrect.subname(i, shadow_name);
+        accuracy.subname(i, shadow_name);
+    }
+}
+
+void
+ShadowPredictors::update(Addr branch_addr, bool taken, bool uncond)
+{
+    for (unsigned i = 0; i < shadows.size(); ++i) {
+        bool correct = shadows[i]->warm(branch_addr, taken, uncond);
+        if (!uncond) {
+            ++condPredicted[i];
+            if (!correct)
+                ++condIncorrect[i];
+        }
+    }
+}
@@ -0,0 +1,63 @@
+/*
+ * Branch predictors evaluated alongside the one that steers fetch.
+ */
+
+#ifndef __CPU_PRED_SHADOW_PREDICTORS_HH__
+#define __CPU_PRED_SHADOW_PREDICTORS_HH__
+
+#include <string>
+#include <vector>
+
+#include "base/statistics.hh"
+#include "base/types.hh"
+#include "cpu/pred/branch_predictor.hh"
+
+/**
+ * A set of shadow predictors owned by a BPredUnit.  Each is trained
+ * with the same resolved branches as the predictor that steers fetch,
+ * at the same points the BPredUnit updates it, but nothing it predicts
+ * reaches the pipeline.  A shadow predicts each branch when it resolves
+ * and is trained right away through BPredictor::warm(), so it always
+ * predicts with the history of the branches resolved before it, as in
+ * a trace replay, and its accuracy is counted per predictor.
+ */
+class ShadowPredictors
+{
+  public:
+    /**
+     * @param name Name of the owning BPredUnit, for stats and errors.
+     * @param shadows The shadow predictors.
+     * @param bpred The predictor that steers fetch, which may not be
+     * one of the shadows.
+     */
+    ShadowPredictors(const std::string &name,
+                     const std::vector<BPredictor *> &shadows,
+                     const BPredictor *bpred);
+
+    const std::string &name() const { return _name; }
+
+    /** Registers the accuracy stats of each shadow predictor. */
+    void regStats();
+
+    /**
+     * Trains each shadow predictor with a resolved branch.
+     * @param branch_addr The address of the branch.
+     * @param taken Whether the branch was taken.
+     * @param uncond Whether the branch is unconditional.
+     */
+    void update(Addr branch_addr, bool taken, bool uncond);
+
+  private:
+    const std::string _name;
+
+    std::vector<BPredictor *> shadows;
+
+    /** Stat for conditional branches each shadow predictor predicted. */
+    Stats::Vector condPredicted;
+    /** Stat for conditional branches each shadow predictor got wrong. */
+    Stats::Vector condIncorrect;
+    /** Stat for the fraction each shadow predictor got right. */
+    Stats::Formula accuracy;
+};
+
+#endif // __CPU_PRED_SHADOW_PREDICTORS_HH__
@@ -0,0 +1,511 @@
+/*
+ * TAGE branch predictor.
+ */
+
+#include <cmath>
+
+#include "base/cprintf.hh"
+#include "base/intmath.hh"
+#include "base/misc.hh"
+#include "base/random.hh"
+#include "base/trace.hh"
+#include "cpu/pred/tage.hh"
+#include "debug/Fetch.hh"
+
+TAGEBP::TAGEBP(const Params *params)
+    : BPredictor(params),
+      bimodalEntries(params->bimodalEntries),
+      numTables(params->numTables),
+      tableEntries(params->tableEntries),
+      tagBits(params->tagBits),
+      ctrBits(params->ctrBits),
+      usefulResetPeriod(params->usefulResetPeriod),
+      instShiftAmt(params->instShiftAmt),
+      globalHistReg(params->globalHistoryBits + 1)
+{
+    if (!isPowerOf2(bimodalEntries)) {
+        fatal("Invalid TAGE bimodal table size!\n");
+    }
+
+    // A single entry table leaves no index bits to fold the history to.
+    if (tableEntries < 2 || !isPowerOf2(tableEntries)) {
+        fatal("Invalid TAGE tagged table size!\n");
+    }
+
+    if (numTables < 1 || numTables > MaxTables) {
+        fatal("TAGE must have between 1 and %d tagged tables!\n",
+              MaxTables);
+    }
+
+    if (tagBits < 2 || tagBits > 16) {
+        fatal("TAGE tags must be between 2 and 16 bits!\n");
+    }
+
+    if (ctrBits < 2 || ctrBits > 7) {
+        fatal("TAGE counters must be between 2 and 7 bits!\n");
+    }
+
+    if (params->usefulBits < 1 || params->usefulBits > 8) {
+        fatal("TAGE usefulness counters must be between 1 and 8 bits!\n");
+    }
+
+    if (params->minHistory < 1 ||
+        params->minHistory > params->globalHistoryBits) {
+        fatal("TAGE history lengths must satisfy 1 <= minHistory <= "
+              "globalHistoryBits!\n");
+    }
+
+    bimodalMask = bimodalEntries - 1;
+    bimodalThreshold = (1 << (params->bimodalCtrBits - 1)) - 1;
+    bimodal.resize(bimodalEntries);
+    for (unsigned i = 0; i < bimodalEntries; ++i)
+        bimodal[i].setBits(params->bimodalCtrBits);
+
+    indexBits = floorLog2(tableEntries);
+    indexMask = tableEntries - 1;
+    tagMask = (1 << tagBits) - 1;
+    ctrMax = (1 << (ctrBits - 1)) - 1;
+    usefulMax = (1 << params->usefulBits) - 1;
+
+    // Geometric series of history lengths from minHistory to
+    // globalHistoryBits, the shortest going to table 1.
+    tables.resize(numTables + 1);
+    histLengths.resize(numTables + 1);
+    indexFold.resize(numTables + 1);
+    tagFold0.resize(numTables + 1);
+    tagFold1.resize(numTables + 1);
+    for (unsigned i = 1; i <= numTables; ++i) {
+        tables[i].resize(tableEntries);
+        if (numTables == 1) {
+            histLengths[i] = params->globalHistoryBits;
+        } else {
+            double ratio = (double)params->globalHistoryBits /
+                params->minHistory;
+            histLengths[i] = (unsigned)(params->minHistory *
+                pow(ratio, (double)(i - 1) / (numTables - 1)) + 0.5);
+        }
+        indexFold[i].init(histLengths[i], indexBits);
+        tagFold0[i].init(histLengths[i], tagBits);
+        tagFold1[i].init(histLengths[i], tagBits - 1);
+
+        DPRINTF(Fetch, "TAGE: table %d uses %d history bits\n",
+                i, histLengths[i]);
+    }
+
+    reset();
+}
+
+void
+TAGEBP::reset()
+{
+    for (unsigned i = 0; i < bimodalEntries; ++i)
+        bimodal[i].reset();
+
+    for (unsigned i = 1; i <= numTables; ++i) {
+        for (unsigned j = 0; j < tableEntries; ++j) {
+            tables[i][j].ctr = 0;
+            tables[i][j].tag = 0;
+            tables[i][j].u = 0;
+        }
+        indexFold[i].comp = 0;
+        tagFold0[i].comp = 0;
+        tagFold1[i].comp = 0;
+    }
+
+    globalHistReg.reset();
+    useAltOnNa = 0;
+    usefulResetCount = 0;
+}
+
+bool
+TAGEBP::tablePrediction(unsigned table, const BPHistory *history)
+{
+    if (table == 0)
+        return bimodal[history->bimodalIndex].read() > bimodalThreshold;
+    return entry(table, history).ctr >= 0;
+}
+
+bool
+TAGEBP::lookup(Addr &branch_addr, void * &bp_history)
+{
+    unsigned pc_bits = branch_addr >> instShiftAmt;
+
+    BPHistory *history = historyPool.allocate();
+    history->uncond = false;
+    history->bimodalIndex = pc_bits & bimodalMask;
+
+    for (unsigned i = 1; i <= numTables; ++i) {
+        unsigned shift = (indexBits > i ? indexBits - i : i - indexBits) + 1;
+        history->index[i] = (pc_bits ^ (pc_bits >> shift) ^
+                             indexFold[i].comp) & indexMask;
+        history->tag[i] = (pc_bits ^ tagFold0[i].comp ^
+                           (tagFold1[i].comp << 1)) & tagMask;
+    }
+
+    // The provider is the matching table with the longest history and
+    // the alternate is the next matching one, or the bimodal table.
+    history->provider = 0;
+    history->altProvider = 0;
+    for (unsigned i = numTables; i > 0; --i) {
+        if (entry(i, history).tag == history->tag[i]) {
+            if (!history->provider) {
+                history->provider = i;
+            } else {
+                history->altProvider = i;
+                break;
+            }
+        }
+    }
+
+    history->altPred = tablePrediction(history->altProvider, history);
+    if (history->provider) {
+        const TageEntry &provider = entry(history->provider, history);
+        history->providerPred = provider.ctr >= 0;
+        // A weak entry that has not proven useful yet was most likely
+        // just allocated, and the alternate is often the better guess.
+        history->usedAlt = useAltOnNa >= 0 && isWeak(provider.ctr) &&
+            provider.u == 0;
+        history->weak = isWeak(provider.ctr);
+    } else {
+        history->providerPred = history->altPred;
+        history->usedAlt = false;
+        unsigned ctr = bimodal[history->bimodalIndex].read();
+        history->weak = ctr == bimodalThreshold ||
+            ctr == bimodalThreshold + 1;
+    }
+    history->tagePred = history->usedAlt ? history->altPred :
+        history->providerPred;
+
+    bp_history = static_cast<void *>(history);
+
+    // Speculatively shift in the prediction; squash() and a squashing
+    // update() rewind to the histories saved here.
+    saveHistory(history);
+    updateHistory(history->tagePred);
+
+    DPRINTF(Fetch, "TAGE: lookup %#x provider %d alt %d prediction %d\n",
+            branch_addr, history->provider, history->altProvider,
+            history->tagePred);
+
+    return history->tagePred;
+}
+
+void
+TAGEBP::uncondBr(void * &bp_history)
+{
+    BPHistory *history = historyPool.allocate();
+    history->uncond = true;
+    history->tagePred = true;
+    history->weak = false;
+    bp_history = static_cast<void *>(history);
+
+    saveHistory(history);
+    updateHistory(true);
+}
+
+void
+TAGEBP::BTBUpdate(Addr &branch_addr, void * &bp_history)
+{
+    // The branch falls through for want of a target, so its speculative
+    // outcome is not taken after all.
+    BPHistory *history = static_cast<BPHistory *>(bp_history);
+    restoreHistory(history);
+    updateHistory(false);
+}
+
+bool
+TAGEBP::lowConfidence(const void *bp_history) const
+{
+    const BPHistory *history = static_cast<const BPHistory *>(bp_history);
+    return history && history->weak;
+}
+
+inline void
+TAGEBP::updateCtr(int8_t &ctr, bool taken)
+{
+    if (taken) {
+        if (ctr < ctrMax)
+            ++ctr;
+    } else {
+        if (ctr > -ctrMax - 1)
+            --ctr;
+    }
+}
+
+void
+TAGEBP::trainTable(unsigned table, const BPHistory *history, bool taken)
+{
+    if (table == 0) {
+        if (taken)
+            bimodal[history->bimodalIndex].increment();
+        else
+            bimodal[history->bimodalIndex].decrement();
+    } else {
+        updateCtr(entry(table, history).ctr, taken);
+    }
+}
+
+void
+TAGEBP::allocate(const BPHistory *history, bool taken)
+{
+    unsigned provider = history->provider;
+
+    // Skip the next table half of the time, so that two branches that
+    // keep mispredicting do not evict each other from the same table.
+    unsigned first = provider + 1;
+    if (first < numTables && random_mt.random<unsigned>(0, 1))
+        ++first;
+
+    for (unsigned i = first; i <= numTables; ++i) {
+        TageEntry &victim = entry(i, history);
+        if (victim.u == 0) {
+            victim.tag = history->tag[i];
+            victim.ctr = taken ? 0 : -1;
+            ++allocations;
+            return;
+        }
+    }
+
+    // Every candidate is useful; age them so a later miss can allocate.
+    for (unsigned i = provider + 1; i <= numTables; ++i) {
+        TageEntry &victim = entry(i, history);
+        if (victim.u > 0)
+            --victim.u;
+    }
+    ++allocationFailures;
+}
+
+void
+TAGEBP::update(Addr &branch_addr, bool taken, void *bp_history,
+               bool squashed)
+{
+    if (!bp_history)
+        return;
+
+    BPHistory *history = static_cast<BPHistory *>(bp_history);
+
+    if (!history->uncond) {
+        unsigned provider = history->provider;
+
+        ++providerHits[provider];
+        if (history->tagePred != taken)
+            ++providerIncorrect[provider];
+        if (history->usedAlt)
+            ++altUsed;
+
+        bool new_entry = false;
+        if (provider) {
+            const TageEntry &provider_entry = entry(provider, history);
+            new_entry = isWeak(provider_entry.ctr) && provider_entry.u == 0;
+
+            // Learn whether weak new entries or the alternate do better.
+            if (new_entry && history->providerPred != history->altPred) {
+                if (history->altPred == taken) {
+                    if (useAltOnNa < 7)
+                        ++useAltOnNa;
+                } else {
+                    if (useAltOnNa > -8)
+                        --useAltOnNa;
+                }
+            }
+        }
+
+        if (history->tagePred != taken && provider < numTables)
+            allocate(history, taken);
+
+        trainTable(provider, history, taken);
+        if (provider) {
+            // Until a new entry is trusted, keep the alternate trained.
+            if (new_entry)
+                trainTable(history->altProvider, history, taken);
+
+            TageEntry &provider_entry = entry(provider, history);
+            if (history->providerPred != history->altPred) {
+                if (history->providerPred == taken) {
+                    if (provider_entry.u < usefulMax)
+                        ++provider_entry.u;
+                } else if (provider_entry.u > 0) {
+                    --provider_entry.u;
+                }
+            }
+        }
+
+        // Periodically age the usefulness counters so entries that
+        // stopped being useful can be replaced.
+        if (++usefulResetCount >= usefulResetPeriod) {
+            usefulResetCount = 0;
+            for (unsigned i = 1; i <= numTables; ++i)
+                for (unsigned j = 0; j < tableEntries; ++j)
+                    tables[i][j].u >>= 1;
+        }
+    }
+
+    // The histories were updated speculatively at lookup; they only
+    // need repairing if this branch was mispredicted.
+    if (squashed) {
+        restoreHistory(history);
+        updateHistory(taken);
+    }
+
+    historyPool.release(history);
+}
+
+void
+TAGEBP::squash(void *bp_history)
+{
+    BPHistory *history = static_cast<BPHistory *>(bp_history);
+
+    // Restore the histories to their state prior to this branch.
+    restoreHistory(history);
+
+    // Return this BPHistory to the pool now that we're done with it.
+    historyPool.release(history);
+}
+
+void
+TAGEBP::updateHistory(bool taken)
+{
+    globalHistReg.push(taken);
+
+    for (unsigned i = 1; i <= numTables; ++i) {
+        indexFold[i].update(globalHistReg);
+        tagFold0[i].update(globalHistReg);
+        tagFold1[i].update(globalHistReg);
+    }
+}
+
+void
+TAGEBP::saveHistory(BPHistory *history)
+{
+    history->historyHead = globalHistReg.getHead();
+    for (unsigned i = 1; i <= numTables; ++i) {
+        history->indexComp[i] = indexFold[i].comp;
+        history->tagComp0[i] = tagFold0[i].comp;
+        history->tagComp1[i] = tagFold1[i].comp;
+    }
+}
+
+void
+TAGEBP::restoreHistory(const BPHistory *history)
+{
+    globalHistReg.restore(history->historyHead);
+    for (unsigned i = 1; i <= numTables; ++i) {
+        indexFold[i].comp = history->indexComp[i];
+        tagFold0[i].comp = history->tagComp0[i];
+        tagFold1[i].comp = history->tagComp1[i];
+    }
+}
+
+void
+TAGEBP::serialize(std::ostream &os)
+{
+    serializeCounters(os, "bimodal", bimodal);
+
+    std::vector<int8_t> ctr(tableEntries);
+    std::vector<uint16_t> tag(tableEntries);
+    std::vector<uint8_t> u(tableEntries);
+    std::vector<unsigned> index_fold(numTables + 1);
+    std::vector<unsigned> tag_fold0(numTables + 1);
+    std::vector<unsigned> tag_fold1(numTables + 1);
+    for (unsigned i = 1; i <= numTables; ++i) {
+        for (unsigned j = 0; j < tableEntries; ++j) {
+            ctr[j] = tables[i][j].ctr;
+            tag[j] = tables[i][j].tag;
+            u[j] = tables[i][j].u;
+        }
+        arrayParamOut(os, csprintf("table%d.ctr", i), ctr);
+        arrayParamOut(os, csprintf("table%d.tag", i), tag);
+        arrayParamOut(os, csprintf("table%d.u", i), u);
+
+        index_fold[i] = indexFold[i].comp;
+        tag_fold0[i] = tagFold0[i].comp;
+        tag_fold1[i] = tagFold1[i].comp;
+    }
+    arrayParamOut(os, "indexFold", index_fold);
+    arrayParamOut(os, "tagFold0", tag_fold0);
+    arrayParamOut(os, "tagFold1", tag_fold1);
+
+    globalHistReg.serialize("globalHistReg", os);
+    SERIALIZE_SCALAR(useAltOnNa);
+    SERIALIZE_SCALAR(usefulResetCount);
+}
+
+void
+TAGEBP::unserialize(Checkpoint *cp, const std::string &section)
+{
+    unserializeCounters(cp, section, "bimodal", bimodal);
+
+    std::vector<int8_t> ctr(tableEntries);
+    std::vector<uint16_t> tag(tableEntries);
+    std::vector<uint8_t> u(tableEntries);
+    std::vector<unsigned> index_fold(numTables + 1);
+    std::vector<unsigned> tag_fold0(numTables + 1);
+    std::vector<unsigned> tag_fold1(numTables + 1);
+    unserializeTable(cp, section, "indexFold", index_fold);
+    unserializeTable(cp, section, "tagFold0", tag_fold0);
+    unserializeTable(cp, section, "tagFold1", tag_fold1);
+    for (unsigned i = 1; i <= numTables; ++i) {
+        unserializeTable(cp, section, csprintf("table%d.ctr", i), ctr);
+        unserializeTable(cp, section, csprintf("table%d.tag", i), tag);
+        unserializeTable(cp, section, csprintf("table%d.u", i), u);
+        for (unsigned j = 0; j < tableEntries; ++j) {
+            tables[i][j].ctr = ctr[j];
+            tables[i][j].tag = tag[j];
+            tables[i][j].u = u[j];
+        }
+
+        indexFold[i].comp = index_fold[i];
+        tagFold0[i].comp = tag_fold0[i];
+        tagFold1[i].comp = tag_fold1[i];
+    }
+
+    globalHistReg.unserialize("globalHistReg", cp, section);
+    UNSERIALIZE_SCALAR(useAltOnNa);
+    UNSERIALIZE_SCALAR(usefulResetCount);
+}
+
+void
+TAGEBP::regStats()
+{
+    providerHits
+        .init(numTables + 1)
+        .name(name() + ".providerHits")
+        .desc("Number of conditional branches provided by each table")
+        .flags(Stats::total | Stats::pdf)
+        ;
+
+    providerIncorrect
+        .init(numTables + 1)
+        .name(name() + ".providerIncorrect")
+        .desc("Number of conditional branches mispredicted, by provider")
+        .flags(Stats::total)
+        ;
+
+    providerHits.subname(0, "bimodal");
+    providerIncorrect.subname(0, "bimodal");
+    for (unsigned i = 1; i <= numTables; ++i) {
+        providerHits.subname(i, csprintf("t%d", i));
+        providerIncorrect.subname(i, csprintf("t%d", i));
+    }
+
+    altUsed
+        .name(name() + ".altUsed")
+        .desc("Number of predictions taken from the alternate prediction")
+        ;
+
+    allocations
+        .name(name() + ".allocations")
+        .desc("Number of tagged entries allocated")
+        ;
+
+    allocationFailures
+        .name(name() + ".allocationFailures")
+        .desc("Number of mispredictions that found no entry to allocate")
+        ;
+}
+
+TAGEBP *
+TAGEBPParams::create()
+{
+    return new TAGEBP(this);
+}
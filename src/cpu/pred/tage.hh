@@ -0,0 +1,238 @@
+/*
+ * TAGE branch predictor.
+ */
+
+#ifndef __CPU_PRED_TAGE_HH__
+#define __CPU_PRED_TAGE_HH__
+
+#include <vector>
+
+#include "base/statistics.hh"
+#include "base/types.hh"
+#include "cpu/o3/sat_counter.hh"
+#include "cpu/pred/branch_predictor.hh"
+#include "cpu/pred/global_history.hh"
+#include "cpu/pred/history_pool.hh"
+#include "params/TAGEBP.hh"
+
+/**
+ * Implements a TAGE predictor (Seznec and Michaud, "A case for (partially)
+ * TAgged GEometric history length branch prediction").  A bimodal table
+ * of saturating counters gives the base prediction, and a number of
+ * tagged tables are indexed and tagged with hashes of the PC and of
+ * global histories whose lengths form a geometric series.  The tagged
+ * table with the longest history whose tag matches provides the
+ * prediction; the next one that matches, or the bimodal table, provides
+ * the alternate prediction used while a new entry is still weak.
+ *
+ * The history hashes are kept in folded registers that are updated as
+ * each outcome is shifted in, so lookups and updates cost a constant
+ * amount of work per table, however long the histories are.  The
+ * prediction is shifted in speculatively at lookup; each branch saves
+ * the global history head and the folded registers it was predicted
+ * with, so a squash or a misprediction can rewind them.
+ */
+class TAGEBP : public BPredictor
+{
+  public:
+    typedef TAGEBPParams Params;
+
+    /**
+     * Default branch predictor constructor.
+     * @param params The params object, with the size of the bimodal and
+     * tagged tables and the shortest and longest history lengths.
+     */
+    TAGEBP(const Params *params);
+
+    bool lookup(Addr &branch_addr, void * &bp_history);
+
+    void uncondBr(void * &bp_history);
+
+    void BTBUpdate(Addr &branch_addr, void * &bp_history);
+
+    void update(Addr &branch_addr, bool taken, void *bp_history,
+                bool squashed);
+
+    void squash(void *bp_history);
+
+    /** Clears all tables and the global history. */
+    void reset();
+
+    /** Returns the occupancy counters of the BPHistory pool. */
+    const HistoryPoolBase *getHistoryPool() const { return &historyPool; }
+
+    /** Whether the providing counter was in one of its weakest states. */
+    bool lowConfidence(const void *bp_history) const;
+
+    /** Writes the predictor tables and history to a checkpoint. */
+    void serialize(std::ostream &os);
+
+    /** Restores the predictor tables and history from a checkpoint. */
+    void unserialize(Checkpoint *cp, const std::string &section);
+
+    /** Registers the provider statistics. */
+    void regStats();
+
+  private:
+    /** Largest number of tagged tables supported. */
+    static const unsigned MaxTables = 15;
+
+    /** An entry of a tagged table. */
+    struct TageEntry {
+        /** Signed prediction counter; taken when not negative. */
+        int8_t ctr;
+        /** Partial tag. */
+        uint16_t tag;
+        /** Usefulness counter, guarding the entry from replacement. */
+        uint8_t u;
+    };
+
+    struct BPHistory {
+        /** Index into the bimodal table. */
+        unsigned bimodalIndex;
+        /** Index into each tagged table, starting at table 1. */
+        unsigned index[MaxTables + 1];
+        /** Tag computed for each tagged table. */
+        uint16_t tag[MaxTables + 1];
+        /** Table that provided the prediction, 0 being the bimodal. */
+        uint8_t provider;
+        /** Table that provided the alternate prediction. */
+        uint8_t altProvider;
+        /** Prediction of the provider. */
+        bool providerPred;
+        /** Alternate prediction. */
+        bool altPred;
+        /** Final prediction. */
+        bool tagePred;
+        /** Whether the alternate prediction was used. */
+        bool usedAlt;
+        /** Whether the provider's counter was weak. */
+        bool weak;
+        /** Whether this is an unconditional branch. */
+        bool uncond;
+        /** Head of globalHistReg before this branch was shifted in. */
+        unsigned historyHead;
+        /** Folded registers before this branch was shifted in. */
+        unsigned indexComp[MaxTables + 1];
+        unsigned tagComp0[MaxTables + 1];
+        unsigned tagComp1[MaxTables + 1];
+    };
+
+    /** Shifts a branch outcome into the global and folded histories. */
+    void updateHistory(bool taken);
+
+    /** Saves the global and folded histories in a record. */
+    void saveHistory(BPHistory *history);
+
+    /** Rewinds the global and folded histories to a saved record. */
+    void restoreHistory(const BPHistory *history);
+
+    /** Returns the prediction of a table for the given record. */
+    bool tablePrediction(unsigned table, const BPHistory *history);
+
+    /** Trains the counter of a table for the given record. */
+    void trainTable(unsigned table, const BPHistory *history, bool taken);
+
+    /** Allocates an entry for a mispredicted branch above its provider. */
+    void allocate(const BPHistory *history, bool taken);
+
+    /** Saturating update of a signed tagged table counter. */
+    inline void updateCtr(int8_t &ctr, bool taken);
+
+    /** Whether a tagged table counter is in its two weakest states. */
+    bool isWeak(int8_t ctr) const { return ctr == 0 || ctr == -1; }
+
+    /** Returns the tagged entry a record used in the given table. */
+    TageEntry &entry(unsigned table, const BPHistory *history)
+    { return tables[table][history->index[table]]; }
+
+    /** Number of bimodal counters. */
+    unsigned bimodalEntries;
+
+    /** Mask to get an index into the bimodal table. */
+    unsigned bimodalMask;
+
+    /** Bimodal counters give a prediction of taken above this. */
+    unsigned bimodalThreshold;
+
+    /** Number of tagged tables. */
+    unsigned numTables;
+
+    /** Number of entries in each tagged table. */
+    unsigned tableEntries;
+
+    /** log2 of tableEntries. */
+    unsigned indexBits;
+
+    /** Mask to get an index into a tagged table. */
+    unsigned indexMask;
+
+    /** Width of the partial tags. */
+    unsigned tagBits;
+
+    /** Mask to get a partial tag. */
+    unsigned tagMask;
+
+    /** Number of bits in the tagged table counters. */
+    unsigned ctrBits;
+
+    /** Largest value of a tagged table counter. */
+    int8_t ctrMax;
+
+    /** Largest value of a usefulness counter. */
+    uint8_t usefulMax;
+
+    /** Number of conditional branches between usefulness decays. */
+    unsigned usefulResetPeriod;
+
+    /** Conditional branches updated since the last usefulness decay. */
+    unsigned usefulResetCount;
+
+    /** Number of bits to shift the PC by before indexing. */
+    unsigned instShiftAmt;
+
+    /** Chooses the alternate prediction over weak new entries when
+     * not negative. */
+    int8_t useAltOnNa;
+
+    /** The bimodal counters. */
+    std::vector<SatCounter> bimodal;
+
+    /** The tagged tables; tables[0] is unused. */
+    std::vector<std::vector<TageEntry> > tables;
+
+    /** History length of each tagged table. */
+    std::vector<unsigned> histLengths;
+
+    /** Each table's history, folded to the index width. */
+    std::vector<FoldedHistory> indexFold;
+
+    /** Each table's history, folded to the tag width. */
+    std::vector<FoldedHistory> tagFold0;
+
+    /** Each table's history, folded to one bit less than the tag width. */
+    std::vector<FoldedHistory> tagFold1;
+
+    /** Global history register. */
+    GlobalHistory globalHistReg;
+
+    /** Pool the BPHistory records are allocated from. */
+    HistoryPool<BPHistory> historyPool;
+
+    /** Stat for conditional branches provided by each table. */
+    Stats::Vector providerHits;
+
+    /** Stat for mispredictions by the provider, per table. */
+    Stats::Vector providerIncorrect;
+
+    /** Stat for predictions taken from the alternate prediction. */
+    Stats::Scalar altUsed;
+
+    /** Stat for tagged entries allocated. */
+    Stats::Scalar allocations;
+
+    /** Stat for mispredictions that found no entry to allocate. */
+    Stats::Scalar allocationFailures;
+};
+
+#endif // __CPU_PRED_TAGE_HH__
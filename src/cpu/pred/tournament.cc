@@ -43,26 +43,18 @@
 #include "base/intmath.hh"
 #include "cpu/pred/tournament.hh"
 
-TournamentBP::TournamentBP(unsigned _localPredictorSize,
-                           unsigned _localCtrBits,
-                           unsigned _localHistoryTableSize,
-                           unsigned _localHistoryBits,
-                           unsigned _globalPredictorSize,
-                           unsigned _globalHistoryBits,
-                           unsigned _globalCtrBits,
-                           unsigned _choicePredictorSize,
-                           unsigned _choiceCtrBits,
-                           unsigned _instShiftAmt)
-    : localPredictorSize(_localPredictorSize),
-      localCtrBits(_localCtrBits),
-      localHistoryTableSize(_localHistoryTableSize),
-      localHistoryBits(_localHistoryBits),
-      globalPredictorSize(_globalPredictorSize),
-      globalCtrBits(_globalCtrBits),
-      globalHistoryBits(_globalHistoryBits),
-      choicePredictorSize(_globalPredictorSize),
-      choiceCtrBits(_choiceCtrBits),
-      instShiftAmt(_instShiftAmt)
+TournamentBP::TournamentBP(const Params *params)
+    : BPredictor(params),
+      localPredictorSize(params->localPredictorSize),
+      localCtrBits(params->localCtrBits),
+      localHistoryTableSize(params->localHistoryTableSize),
+      localHistoryBits(params->localHistoryBits),
+      globalPredictorSize(params->globalPredictorSize),
+      globalCtrBits(params->globalCtrBits),
+      globalHistoryBits(params->globalHistoryBits),
+      choicePredictorSize(params->globalPredictorSize),
+      choiceCtrBits(params->choiceCtrBits),
+      instShiftAmt(params->instShiftAmt)
 {
     if (!isPowerOf2(localPredictorSize)) {
         fatal("Invalid local predictor size!\n");
@@ -193,7 +185,7 @@ TournamentBP::lookup(Addr &branch_addr, void * &bp_history)
     choice_prediction = choiceCtrs[globalHistory].read() > threshold;
 
     // Create BPHistory and pass it back to be recorded.
-    BPHistory *history = new BPHistory;
+    BPHistory *history = historyPool.allocate();
     history->globalHistory = globalHistory;
     history->localPredTaken = local_prediction;
     history->globalPredTaken = global_prediction;
@@ -234,7 +226,7 @@ void
 TournamentBP::uncondBr(void * &bp_history)
 {
     // Create BPHistory and pass it back to be recorded.
-    BPHistory *history = new BPHistory;
+    BPHistory *history = historyPool.allocate();
     history->globalHistory = globalHistory;
     history->localPredTaken = true;
     history->globalPredTaken = true;
@@ -319,8 +311,8 @@ TournamentBP::update(Addr &branch_addr, bool taken, void *bp_history,
              }
 
         }
-        // We're done with this history, now delete it.
-        delete history;
+        // We're done with this history, now release it.
+        historyPool.release(history);
 
     }
 
@@ -339,11 +331,33 @@ TournamentBP::squash(void *bp_history)
     // Restore global history to state prior to this branch.
     globalHistory = history->globalHistory;
 
-    // Delete this BPHistory now that we're done with it.
-    delete history;
+    // Return this BPHistory to the pool now that we're done with it.
+    historyPool.release(history);
 }
 
-#ifdef DEBUG
-int
-TournamentBP::BPHistory::newCount = 0;
-#endif
+void
+TournamentBP::serialize(std::ostream &os)
+{
+    serializeCounters(os, "localCtrs", localCtrs);
+    arrayParamOut(os, "localHistoryTable", localHistoryTable);
+    serializeCounters(os, "globalCtrs", globalCtrs);
+    serializeCounters(os, "choiceCtrs", choiceCtrs);
+    SERIALIZE_SCALAR(globalHistory);
+}
+
+void
+TournamentBP::unserialize(Checkpoint *cp, const std::string &section)
+{
+    unserializeCounters(cp, section, "localCtrs", localCtrs);
+    unserializeTable(cp, section, "localHistoryTable", localHistoryTable);
+    unserializeCounters(cp, section, "globalCtrs", globalCtrs);
+    unserializeCounters(cp, section, "choiceCtrs", choiceCtrs);
+    UNSERIALIZE_SCALAR(globalHistory);
+    globalHistory &= globalHistoryMask;
+}
+
+TournamentBP *
+TournamentBPParams::create()
+{
+    return new TournamentBP(this);
+}
@@ -47,6 +47,9 @@
 
 #include "base/types.hh"
 #include "cpu/o3/sat_counter.hh"
+#include "cpu/pred/branch_predictor.hh"
+#include "cpu/pred/history_pool.hh"
+#include "params/TournamentBP.hh"
 
 /**
  * Implements a tournament branch predictor, hopefully identical to the one
@@ -57,22 +60,15 @@
  * is speculatively updated, the rest are updated upon branches committing
  * or misspeculating.
  */
-class TournamentBP
+class TournamentBP : public BPredictor
 {
   public:
+    typedef TournamentBPParams Params;
+
     /**
      * Default branch predictor constructor.
      */
-    TournamentBP(unsigned localPredictorSize,
-                 unsigned localCtrBits,
-                 unsigned localHistoryTableSize,
-                 unsigned localHistoryBits,
-                 unsigned globalPredictorSize,
-                 unsigned globalHistoryBits,
-                 unsigned globalCtrBits,
-                 unsigned choicePredictorSize,
-                 unsigned choiceCtrBits,
-                 unsigned instShiftAmt);
+    TournamentBP(const Params *params);
 
     /**
      * Looks up the given address in the branch predictor and returns
@@ -120,6 +116,14 @@ class TournamentBP
     /** Returns the global history. */
     inline unsigned readGlobalHist() { return globalHistory; }
 
+    /** Returns the occupancy counters of the BPHistory pool. */
+    const HistoryPoolBase *getHistoryPool() const { return &historyPool; }
+
+    /** Writes the predictor tables and history to a checkpoint. */
+    void serialize(std::ostream &os);
+
+    /** Restores the predictor tables and history from a checkpoint. */
+    void unserialize(Checkpoint *cp, const std::string &section);
   private:
     /**
      * Returns if the branch should be taken or not, given a counter
@@ -161,14 +165,6 @@ class TournamentBP
      * state properly.
      */
     struct BPHistory {
-#ifdef DEBUG
-        BPHistory()
-        { newCount++; }
-        ~BPHistory()
-        { newCount--; }
-
-        static int newCount;
-#endif
         unsigned globalHistory;
         unsigned localHistory;
         bool localPredTaken;
@@ -176,6 +172,9 @@ class TournamentBP
         bool globalUsed;
     };
 
+    /** Pool the BPHistory records are allocated from. */
+    HistoryPool<BPHistory> historyPool;
+
     /** Flag for invalid predictor index */
     static const int invalidPredictorIndex = -1;
     /** Local counters. */
@@ -0,0 +1,75 @@
+/*
+ * Trace-driven replay of a branch stream through one of the direction
+ * predictors in cpu/pred, without a CPU or memory system.
+ */
+
+#include <cstdio>
+#include <cstring>
+#include <vector>
+
+#include "base/misc.hh"
+#include "cpu/pred/branch_predictor.hh"
+#include "cpu/pred/branch_trace.hh"
+#include "cpu/pred/trace_replay.hh"
+
+BranchTraceReplay::BranchTraceReplay(BPredictor *_bpred)
+    : branches(0), condPredicted(0), condIncorrect(0), bpred(_bpred)
+{
+}
+
+uint64_t
+BranchTraceReplay::run(const std::string &filename, uint64_t maxBranches)
+{
+    FILE *trace = fopen(filename.c_str(), "rb");
+    if (!trace)
+        fatal("Could not open branch trace %s\n", filename);
+
+    BranchTraceHeader hdr;
+    if (fread(&hdr, sizeof(hdr), 1, trace) != 1 ||
+        memcmp(hdr.magic, BranchTraceHeader::magicString,
+               sizeof(hdr.magic)) != 0) {
+        fatal("%s is not a branch trace\n", filename);
+    }
+    if (hdr.version != BranchTraceHeader::currentVersion) {
+        fatal("Branch trace %s has version %d, expected %d\n", filename,
+              hdr.version, BranchTraceHeader::currentVersion);
+    }
+    if (hdr.recordSize < sizeof(BranchTraceRecord))
+        fatal("Branch trace %s has a corrupt header\n", filename);
+
+    // Only the fixed part of each record matters here; the optional
+    // fields that follow it are skipped over.
+    const size_t blockSize = 4096;
+    std::vector<uint8_t> block(blockSize * hdr.recordSize);
+    uint64_t replayed = 0;
+
+    size_t count;
+    while ((count = fread(&block[0], hdr.recordSize, blockSize,
+                          trace)) > 0) {
+        if (maxBranches && replayed + count > maxBranches)
+            count = maxBranches - replayed;
+
+        for (size_t i = 0; i < count; ++i) {
+            BranchTraceRecord rec;
+            memcpy(&rec, &block[i * hdr.recordSize], sizeof(rec));
+            bool taken = rec.flags & BranchTraceRecord::Taken;
+
+            if (rec.flags & BranchTraceRecord::Uncond) {
+                bpred->warm(rec.pc, true, true);
+            } else {
+                ++condPredicted;
+                if (!bpred->warm(rec.pc, taken, false))
+                    ++condIncorrect;
+            }
+        }
+
+        replayed += count;
+        if (maxBranches && replayed >= maxBranches)
+            break;
+    }
+
+    fclose(trace);
+
+    branches += replayed;
+    return replayed;
+}
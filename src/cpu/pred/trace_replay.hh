@@ -0,0 +1,52 @@
+/*
+ * Trace-driven replay of a branch stream through one of the direction
+ * predictors in cpu/pred, without a CPU or memory system.
+ */
+
+#ifndef __CPU_PRED_TRACE_REPLAY_HH__
+#define __CPU_PRED_TRACE_REPLAY_HH__
+
+#include <string>
+
+#include "base/types.hh"
+
+class BPredictor;
+
+/**
+ * Replays a branch trace written by the branch predictor unit through a
+ * predictor.  Every branch is predicted and then immediately updated
+ * with its resolved outcome, in the same way the predictor unit updates
+ * a branch at commit or on a mispredict squash.
+ */
+class BranchTraceReplay
+{
+  public:
+    /**
+     * @param bpred The predictor to replay traces through, usually a
+     * BranchPredictor SimObject instantiated by the replay script.
+     */
+    BranchTraceReplay(BPredictor *bpred);
+
+    /**
+     * Replays the records in a trace file.  Counters accumulate across
+     * calls, so several traces can be fed through the same predictor.
+     * @param filename The trace file to read.
+     * @param maxBranches Stop after this many records (0 for no limit).
+     * @return The number of records replayed by this call.
+     */
+    uint64_t run(const std::string &filename, uint64_t maxBranches = 0);
+
+    /** Number of branches replayed. */
+    uint64_t branches;
+
+    /** Number of conditional branches predicted. */
+    uint64_t condPredicted;
+
+    /** Number of conditional branches predicted incorrectly. */
+    uint64_t condIncorrect;
+
+  private:
+    BPredictor *bpred;
+};
+
+#endif // __CPU_PRED_TRACE_REPLAY_HH__
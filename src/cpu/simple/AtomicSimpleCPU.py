@@ -47,3 +47,6 @@ class AtomicSimpleCPU(BaseSimpleCPU):
     simulate_data_stalls = Param.Bool(False, "Simulate dcache stall cycles")
     simulate_inst_stalls = Param.Bool(False, "Simulate icache stall cycles")
     fastmem = Param.Bool(False, "Access memory directly")
+    branchPred = Param.BranchPredictor(NULL,
+        "Branch predictor to warm with committed branches (no timing "
+        "effect); share it with the CPU switched in to keep it warm")
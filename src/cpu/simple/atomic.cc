@@ -45,6 +45,7 @@
 #include "arch/utility.hh"
 #include "base/bigint.hh"
 #include "config/the_isa.hh"
+#include "cpu/pred/branch_predictor.hh"
 #include "cpu/simple/atomic.hh"
 #include "cpu/exetrace.hh"
 #include "debug/ExecFaulting.hh"
@@ -107,7 +108,7 @@ AtomicSimpleCPU::AtomicSimpleCPU(AtomicSimpleCPUParams *p)
       simulate_inst_stalls(p->simulate_inst_stalls),
       icachePort(name() + ".icache_port", this),
       dcachePort(name() + ".dcache_port", this),
-      fastmem(p->fastmem)
+      fastmem(p->fastmem), branchPred(p->branchPred)
 {
     _status = Idle;
 }
@@ -120,6 +121,40 @@ AtomicSimpleCPU::~AtomicSimpleCPU()
     }
 }
 
+void
+AtomicSimpleCPU::regStats()
+{
+    BaseSimpleCPU::regStats();
+
+    bpredWarmCondBranches
+        .name(name() + ".bpredWarmCondBranches")
+        .desc("Number of conditional branches the branch predictor was "
+              "warmed with")
+        ;
+
+    bpredWarmCondIncorrect
+        .name(name() + ".bpredWarmCondIncorrect")
+        .desc("Number of warming conditional branches mispredicted")
+        ;
+}
+
+void
+AtomicSimpleCPU::warmBranchPred()
+{
+    // The instruction has executed, so the PC it leaves behind already
+    // points at the next instruction it is going to.
+    TheISA::PCState pc = thread->pcState();
+
+    if (!curStaticInst->isCondCtrl()) {
+        branchPred->warm(pc.instAddr(), true, true);
+        return;
+    }
+
+    ++bpredWarmCondBranches;
+    if (!branchPred->warm(pc.instAddr(), pc.branching(), false))
+        ++bpredWarmCondIncorrect;
+}
+
 void
 AtomicSimpleCPU::serialize(ostream &os)
 {
@@ -503,6 +538,10 @@ AtomicSimpleCPU::tick()
                 }
 
                 postExecute();
+
+                if (branchPred && fault == NoFault &&
+                    curStaticInst->isControl())
+                    warmBranchPred();
             }
 
             // @todo remove me after debugging with legion done
@@ -46,6 +46,8 @@
 #include "cpu/simple/base.hh"
 #include "params/AtomicSimpleCPU.hh"
 
+class BPredictor;
+
 class AtomicSimpleCPU : public BaseSimpleCPU
 {
   public:
@@ -55,6 +57,8 @@ class AtomicSimpleCPU : public BaseSimpleCPU
 
     virtual void init();
 
+    virtual void regStats();
+
   private:
 
     struct TickEvent : public Event
@@ -110,6 +114,23 @@ class AtomicSimpleCPU : public BaseSimpleCPU
     bool dcache_access;
     Tick dcache_latency;
 
+    /**
+     * Branch predictor trained with each committed branch, with no
+     * effect on timing.  It is normally shared with the detailed CPU
+     * that is switched in after fast-forwarding, which then starts with
+     * warm tables.  NULL if no predictor is warmed.
+     */
+    BPredictor *branchPred;
+
+    /** Trains branchPred with the control instruction just executed. */
+    void warmBranchPred();
+
+    /** Stat for conditional branches used to warm branchPred. */
+    Stats::Scalar bpredWarmCondBranches;
+
+    /** Stat for warming branches branchPred mispredicted. */
+    Stats::Scalar bpredWarmCondIncorrect;
+
   protected:
 
     /** Return a reference to the data port. */
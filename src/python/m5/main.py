@@ -91,6 +91,9 @@ def parse_options():
         help="Create JSON output of the configuration [Default: %default]")
     option("--dot-config", metavar="FILE", default="config.dot",
         help="Create DOT & pdf outputs of the configuration [Default: %default]")
+    option("--result-cache", metavar="DIR", default=None,
+        help="Reuse the stats of an identical run stored in DIR instead "
+             "of simulating; see m5.util.resultcache")
 
     # Debugging options
     group("Debugging Options")
@@ -99,6 +99,9 @@ def instantiate(ckpt_dir=None):
 
     do_dot(root, options.outdir, options.dot_config)
 
+    if options.result_cache:
+        reuseCachedResult(root, ckpt_dir)
+
     # Initialize the global statistics
     stats.initSimStats()
 
@@ -131,6 +134,35 @@ def instantiate(ckpt_dir=None):
     # Reset to put the stats in a consistent state.
     stats.reset()
 
+# Name of the file in the output directory instantiate() writes the
+# result cache key of the run to.
+result_key_file = 'config.hash'
+
+def reuseCachedResult(root, ckpt_dir):
+    '''Writes the result cache key of the run to the output directory,
+    and if the cache has stats for it, copies them there and exits
+    without simulating.'''
+    from m5 import options
+    from m5.util.resultcache import ResultCache, configHash
+    import shutil
+
+    key = configHash(root.get_config_as_dict(), ckpt_dir)
+    key_file = file(os.path.join(options.outdir, result_key_file), 'w')
+    print >>key_file, key
+    key_file.close()
+
+    cached = ResultCache(options.result_cache).lookup(key)
+    if not cached:
+        return
+
+    shutil.copy(cached, os.path.join(options.outdir, options.stats_file))
+    print "Reusing cached stats %s" % cached
+    sys.stdout.flush()
+    sys.stderr.flush()
+    # Nothing was simulated, so skip the exit handlers, which would
+    # dump empty stats over the cached ones.
+    os._exit(0)
+
 need_resume = []
 need_startup = True
 def simulate(*args, **kwargs):
@@ -192,6 +224,52 @@ def checkpoint(dir):
     internal.core.serializeAll(dir)
     resume(root)
 
+fork_count = 0
+def fork(simout="%(parent)s.f%(fork_seq)i"):
+    '''Forks the simulator, so that the simulation can continue in
+    several ways from the state it has reached.  Returns the child's
+    pid in the parent and 0 in the child.
+
+    The child's output, including its stats, goes to the directory
+    named by simout, which can use the parent's output directory
+    (parent), the number of the fork (fork_seq) and the child's pid.
+    The child inherits the stats of the parent; reset them for stats of
+    the child's own simulation only.'''
+    global fork_count
+    from m5 import options
+
+    sys.stdout.flush()
+    sys.stderr.flush()
+
+    pid = os.fork()
+    if pid:
+        fork_count += 1
+        return pid
+
+    options.outdir = simout % { 'parent' : options.outdir,
+                                'fork_seq' : fork_count,
+                                'pid' : os.getpid() }
+    if not os.path.isdir(options.outdir):
+        os.makedirs(options.outdir)
+    core.setOutputDir(options.outdir)
+
+    if options.redirect_stdout:
+        fd = os.open(os.path.join(options.outdir, options.stdout_file),
+                     os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+        os.dup2(fd, sys.stdout.fileno())
+        if not options.redirect_stderr:
+            os.dup2(fd, sys.stderr.fileno())
+    if options.redirect_stderr:
+        fd = os.open(os.path.join(options.outdir, options.stderr_file),
+                     os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+        os.dup2(fd, sys.stderr.fileno())
+
+    # Reconnect the stats output, which now opens the stats file in the
+    # new directory
+    del stats.outputList[:]
+    stats.initText(options.stats_file)
+    return 0
+
 def changeToAtomic(system):
     if not isinstance(system, (objects.Root, objects.System)):
         raise TypeError, "Parameter of type '%s'.  Must be type %s or %s." % \
@@ -0,0 +1,386 @@
+# Storage model of the branch predictors in src/cpu/pred.
+#
+# Counts the bits of state each predictor keeps for a set of parameters,
+# following the sizing done in the C++ constructors, and searches the
+# legal parameter sets for the largest one that fits a storage budget,
+# so predictors can be compared at equal storage:
+#
+#     from m5.util.bpredstorage import storageBits, bestConfiguration
+#
+#     storageBits('GshareBP', { 'globalPredictorSize' : 8192 })
+#     params = bestConfiguration('TAGEBP', 64 * 1024 * 8)
+#
+# All sizes and budgets are in bits.  Parameters that are left out take
+# the defaults of the SimObjects in src/cpu/pred/BranchPredictor.py.
+#
+# Each predictor's parameters are split into its shape, such as history
+# lengths, counter widths and the number of tables, and the table sizes
+# that scale it.  A search only varies the table sizes; the shape comes
+# from the defaults or from the parameters the caller fixes.
+
+def _floorLog2(x):
+    return int(x).bit_length() - 1
+
+def _ceilLog2(x):
+    if x == 1:
+        return 0
+    return _floorLog2(x - 1) + 1
+
+def _isPowerOf2(x):
+    return x > 0 and (x & (x - 1)) == 0
+
+def _powersOf2(low, high):
+    return [ 1 << i for i in range(low, high + 1) ]
+
+class PredictorModel(object):
+    '''Storage model of one predictor type.
+
+    defaults  the SimObject's parameter defaults
+    knobs     the parameters a search varies'''
+
+    type = None
+    defaults = {}
+    knobs = ()
+
+    def params(self, params):
+        '''The full parameter set, with defaults for those left out.'''
+        unknown = set(params) - set(self.defaults)
+        if unknown:
+            raise ValueError("%s has no parameter %s" %
+                             (self.type, ', '.join(sorted(unknown))))
+        p = dict(self.defaults)
+        p.update(params)
+        return p
+
+    def check(self, p):
+        '''Raises ValueError if the C++ predictor would reject p.'''
+        pass
+
+    def breakdown(self, p):
+        '''List of (component, bits) making up the predictor's state.'''
+        raise NotImplementedError
+
+    def settings(self, p):
+        '''Yields dicts of knob values to try; p holds the shape and any
+        fixed knobs.'''
+        raise NotImplementedError
+
+models = {}
+
+def _model(cls):
+    models[cls.type] = cls()
+    return cls
+
+def _getModel(pred_type):
+    try:
+        return models[pred_type]
+    except KeyError:
+        raise ValueError("no storage model for %s" % pred_type)
+
+@_model
+class LocalModel(PredictorModel):
+    type = 'LocalBP'
+    defaults = { 'localPredictorSize' : 2048, 'localCtrBits' : 2,
+                 'instShiftAmt' : 2 }
+    knobs = ('localPredictorSize',)
+
+    # localPredictorSize is the size of the table in bits.
+    def check(self, p):
+        if not _isPowerOf2(p['localPredictorSize']):
+            raise ValueError("localPredictorSize must be a power of 2")
+        if p['localPredictorSize'] % p['localCtrBits'] or \
+               not _isPowerOf2(p['localPredictorSize'] // p['localCtrBits']):
+            raise ValueError("localCtrBits must leave a power of 2 counters")
+
+    def breakdown(self, p):
+        sets = p['localPredictorSize'] // p['localCtrBits']
+        return [ ('counters', sets * p['localCtrBits']) ]
+
+    def settings(self, p):
+        for size in _powersOf2(6, 26):
+            yield { 'localPredictorSize' : size }
+
+@_model
+class TournamentModel(PredictorModel):
+    type = 'TournamentBP'
+    defaults = { 'localPredictorSize' : 2048, 'localCtrBits' : 2,
+                 'localHistoryTableSize' : 2048, 'localHistoryBits' : 11,
+                 'globalPredictorSize' : 8192, 'globalCtrBits' : 2,
+                 'globalHistoryBits' : 13, 'choicePredictorSize' : 8192,
+                 'choiceCtrBits' : 2, 'instShiftAmt' : 2 }
+    knobs = ('localPredictorSize', 'localHistoryBits',
+             'localHistoryTableSize', 'globalPredictorSize',
+             'globalHistoryBits')
+
+    # The local and global counters are indexed by histories, so their
+    # tables are sized by the history lengths.  The C++ sizes the choice
+    # table like the global one, whatever choicePredictorSize says.
+    def check(self, p):
+        for param in ('localPredictorSize', 'localHistoryTableSize',
+                      'globalPredictorSize'):
+            if not _isPowerOf2(p[param]):
+                raise ValueError("%s must be a power of 2" % param)
+        if p['globalPredictorSize'] < 1 << p['globalHistoryBits']:
+            raise ValueError("globalPredictorSize must have an entry for "
+                             "each global history")
+
+    def breakdown(self, p):
+        return [
+            ('local counters', p['localPredictorSize'] * p['localCtrBits']),
+            ('local histories',
+             p['localHistoryTableSize'] * p['localHistoryBits']),
+            ('global counters',
+             p['globalPredictorSize'] * p['globalCtrBits']),
+            ('choice counters',
+             p['globalPredictorSize'] * p['choiceCtrBits']),
+            ('global history', p['globalHistoryBits']),
+        ]
+
+    def settings(self, p):
+        for local_bits in range(4, 17):
+            for table_size in _powersOf2(4, 14):
+                for global_bits in range(4, 21):
+                    yield { 'localHistoryBits' : local_bits,
+                            'localPredictorSize' : 1 << local_bits,
+                            'localHistoryTableSize' : table_size,
+                            'globalHistoryBits' : global_bits,
+                            'globalPredictorSize' : 1 << global_bits }
+
+@_model
+class GshareModel(PredictorModel):
+    type = 'GshareBP'
+    defaults = { 'globalPredictorSize' : 8192, 'globalCtrBits' : 2,
+                 'globalHistoryBits' : 13 }
+    knobs = ('globalPredictorSize', 'globalHistoryBits')
+
+    # globalPredictorSize is the size of the table in bits.  History
+    # beyond the index width is masked off, so the search never goes
+    # past it.
+    def check(self, p):
+        if not _isPowerOf2(p['globalPredictorSize']):
+            raise ValueError("globalPredictorSize must be a power of 2")
+        if p['globalPredictorSize'] % p['globalCtrBits'] or \
+               not _isPowerOf2(p['globalPredictorSize'] //
+                               p['globalCtrBits']):
+            raise ValueError("globalCtrBits must leave a power of 2 "
+                             "counters")
+        if not 1 <= p['globalHistoryBits'] <= 32:
+            raise ValueError("globalHistoryBits must be between 1 and 32")
+
+    def breakdown(self, p):
+        sets = p['globalPredictorSize'] // p['globalCtrBits']
+        return [ ('counters', sets * p['globalCtrBits']),
+                 ('global history', p['globalHistoryBits']) ]
+
+    def settings(self, p):
+        for size in _powersOf2(6, 26):
+            index_bits = _floorLog2(size // p['globalCtrBits'])
+            for history in range(1, min(index_bits, 32) + 1):
+                yield { 'globalPredictorSize' : size,
+                        'globalHistoryBits' : history }
+
+class _PerceptronTableModel(PredictorModel):
+    '''Tables of perceptrons of globalHistoryBits weights, the first
+    being the bias, as built by PerceptronBP_Top and HybridpgBP.'''
+
+    knobs = ('globalPredictorSize',)
+
+    # Both read globalPredictorSize as a budget, and keep
+    # floorPow2(budget / (history * weightBits)) perceptrons.
+    maxHistory = 64
+
+    def entries(self, p):
+        h = p['globalHistoryBits']
+        return p['globalPredictorSize'] // (h * p['weightBits'])
+
+    def check(self, p):
+        if not _isPowerOf2(p['globalPredictorSize']):
+            raise ValueError("globalPredictorSize must be a power of 2")
+        if not 2 <= p['globalHistoryBits'] <= self.maxHistory:
+            raise ValueError("globalHistoryBits must be between 2 and %d" %
+                             self.maxHistory)
+        if not 2 <= p['weightBits'] <= 8:
+            raise ValueError("weightBits must be between 2 and 8")
+        if not 2 <= p['thetaCtrBits'] <= 16:
+            raise ValueError("thetaCtrBits must be between 2 and 16")
+        if self.entries(p) == 0:
+            raise ValueError("globalPredictorSize is too small for a single "
+                             "perceptron")
+
+    def breakdown(self, p):
+        entries = 1 << _floorLog2(self.entries(p))
+        parts = [ ('weights',
+                   entries * p['globalHistoryBits'] * p['weightBits']),
+                  ('global history', self.historyBits(p)) ]
+        if p['adaptiveTheta']:
+            parts.append(('threshold counter', p['thetaCtrBits']))
+        return parts
+
+    def settings(self, p):
+        for size in _powersOf2(6, 30):
+            yield { 'globalPredictorSize' : size }
+
+@_model
+class PerceptronModel(_PerceptronTableModel):
+    type = 'PerceptronBP'
+    defaults = { 'globalPredictorSize' : 8192, 'globalHistoryBits' : 13,
+                 'weightBits' : 8, 'theta' : 0, 'adaptiveTheta' : True,
+                 'thetaCtrBits' : 7 }
+
+    def historyBits(self, p):
+        # The bias weight takes one of the history bits.
+        return p['globalHistoryBits'] - 1
+
+@_model
+class HybridpgModel(_PerceptronTableModel):
+    type = 'HybridpgBP'
+    defaults = { 'globalPredictorSize' : 8192, 'globalHistoryBits' : 13,
+                 'weightBits' : 8, 'theta' : 0, 'adaptiveTheta' : True,
+                 'thetaCtrBits' : 7 }
+    # The index history is an unsigned.
+    maxHistory = 32
+
+    def historyBits(self, p):
+        # The perceptrons see the last globalHistoryBits - 1 outcomes of
+        # the globalHistoryBits the index hashes in.
+        return p['globalHistoryBits']
+
+@_model
+class HashedPerceptronModel(PredictorModel):
+    type = 'HashedPerceptronBP'
+    defaults = { 'numTables' : 8, 'tableEntries' : 1024,
+                 'globalHistoryBits' : 64, 'theta' : 0, 'instShiftAmt' : 2 }
+    knobs = ('tableEntries',)
+
+    def check(self, p):
+        if not 2 <= p['numTables'] <= 16:
+            raise ValueError("numTables must be between 2 and 16")
+        if p['tableEntries'] < 2 or not _isPowerOf2(p['tableEntries']):
+            raise ValueError("tableEntries must be a power of 2 of at "
+                             "least 2")
+        if p['globalHistoryBits'] < p['numTables'] - 1:
+            raise ValueError("globalHistoryBits must give each table at "
+                             "least one bit")
+
+    def breakdown(self, p):
+        index_bits = _floorLog2(p['tableEntries'])
+        return [
+            ('weights', p['numTables'] * p['tableEntries'] * 8),
+            # One more outcome than the history length is kept, for the
+            # bit leaving the last segment.
+            ('global history', p['globalHistoryBits'] + 1),
+            ('folded histories', (p['numTables'] - 1) * index_bits),
+        ]
+
+    def settings(self, p):
+        for entries in _powersOf2(4, 20):
+            yield { 'tableEntries' : entries }
+
+@_model
+class TAGEModel(PredictorModel):
+    type = 'TAGEBP'
+    defaults = { 'bimodalEntries' : 4096, 'bimodalCtrBits' : 2,
+                 'numTables' : 7, 'tableEntries' : 1024, 'tagBits' : 9,
+                 'ctrBits' : 3, 'usefulBits' : 2, 'minHistory' : 5,
+                 'globalHistoryBits' : 130,
+                 'usefulResetPeriod' : 256 * 1024, 'instShiftAmt' : 2 }
+    knobs = ('bimodalEntries', 'tableEntries')
+
+    def check(self, p):
+        if not _isPowerOf2(p['bimodalEntries']):
+            raise ValueError("bimodalEntries must be a power of 2")
+        if p['tableEntries'] < 2 or not _isPowerOf2(p['tableEntries']):
+            raise ValueError("tableEntries must be a power of 2 of at "
+                             "least 2")
+        if not 1 <= p['numTables'] <= 15:
+            raise ValueError("numTables must be between 1 and 15")
+        if not 2 <= p['tagBits'] <= 16:
+            raise ValueError("tagBits must be between 2 and 16")
+        if not 2 <= p['ctrBits'] <= 7:
+            raise ValueError("ctrBits must be between 2 and 7")
+        if not 1 <= p['usefulBits'] <= 8:
+            raise ValueError("usefulBits must be between 1 and 8")
+        if not 1 <= p['minHistory'] <= p['globalHistoryBits']:
+            raise ValueError("minHistory must be between 1 and "
+                             "globalHistoryBits")
+
+    def breakdown(self, p):
+        n = p['numTables']
+        index_bits = _floorLog2(p['tableEntries'])
+        entry_bits = p['ctrBits'] + p['tagBits'] + p['usefulBits']
+        return [
+            ('bimodal counters', p['bimodalEntries'] * p['bimodalCtrBits']),
+            ('tagged entries', n * p['tableEntries'] * entry_bits),
+            ('global history', p['globalHistoryBits'] + 1),
+            ('folded histories', n * (index_bits + 2 * p['tagBits'] - 1)),
+            ('useAltOnNa', 4),
+            ('useful reset counter', _ceilLog2(p['usefulResetPeriod'])),
+        ]
+
+    def settings(self, p):
+        for table_entries in _powersOf2(6, 16):
+            for bimodal_entries in _powersOf2(8, 18):
+                yield { 'tableEntries' : table_entries,
+                        'bimodalEntries' : bimodal_entries }
+
+def storageBreakdown(pred_type, params={}):
+    '''List of (component, bits) of a predictor's state.  Raises
+    ValueError if the predictor would reject the parameters.'''
+    model = _getModel(pred_type)
+    p = model.params(params)
+    model.check(p)
+    return model.breakdown(p)
+
+def storageBits(pred_type, params={}):
+    '''Total bits of state of a predictor.'''
+    return sum(bits for name, bits in storageBreakdown(pred_type, params))
+
+def configurations(pred_type, fixed={}):
+    '''Yields the legal parameter sets of a predictor, as complete
+    parameter dicts, varying the table sizes not given in fixed.'''
+    model = _getModel(pred_type)
+    base = model.params(fixed)
+    seen = set()
+    for setting in model.settings(base):
+        # Knobs the caller fixed stay fixed; a setting tying them to
+        # other knobs only applies if it agrees.
+        if any(k in fixed and fixed[k] != v for k, v in setting.items()):
+            continue
+        p = dict(base)
+        p.update(setting)
+        try:
+            model.check(p)
+        except ValueError:
+            continue
+        key = tuple(sorted(p.items()))
+        if key in seen:
+            continue
+        seen.add(key)
+        yield p
+
+def bestConfiguration(pred_type, budget, fixed={}):
+    '''The legal parameter set with the most storage that fits in
+    budget bits.  Raises ValueError if none fits.'''
+    best = None
+    best_bits = -1
+    for p in configurations(pred_type, fixed):
+        bits = storageBits(pred_type, p)
+        if best_bits < bits <= budget:
+            best = p
+            best_bits = bits
+    if best is None:
+        raise ValueError("no %s configuration fits in %d bits" %
+                         (pred_type, budget))
+    return best
+
+def formatBreakdown(pred_type, params={}):
+    '''The storage breakdown as printable lines.'''
+    lines = []
+    breakdown = storageBreakdown(pred_type, params)
+    total = sum(bits for name, bits in breakdown)
+    for name, bits in breakdown:
+        lines.append("%-24s %12d bits %10.2f KiB" %
+                     (name, bits, bits / 8192.0))
+    lines.append("%-24s %12d bits %10.2f KiB" %
+                 ("total", total, total / 8192.0))
+    return lines
@@ -0,0 +1,126 @@
+# Reader for the binary branch traces written by BranchTracer.  The
+# layout must match src/cpu/pred/branch_trace.hh.
+#
+# A trace is memory mapped and exposed as a NumPy structured array, so
+# scanning even a multi-GB trace allocates no per-record objects:
+#
+#     trace = BranchTrace('m5out/branch.trace')
+#     taken = trace.records['flags'] & TAKEN
+#     for chunk in trace.chunks(1 << 20):
+#         ...
+
+import mmap
+import os
+import struct
+
+MAGIC = 'GEM5BRTR'
+VERSION = 1
+
+# Header flags
+HAS_SEQ_NUM = 0x1
+HAS_TICK = 0x2
+
+# Record flags
+TAKEN = 0x1
+UNCOND = 0x2
+
+_header = struct.Struct('<8sIIII')
+HEADER_SIZE = _header.size
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("reading branch traces requires NumPy")
+    return numpy
+
+def recordDtype(flags=0):
+    '''NumPy dtype of one record in a trace with the given header flags.'''
+    numpy = _numpy()
+    fields = [ ('pc', '<u8'), ('target', '<u8'), ('flags', '<u4'),
+               ('pad', '<u4') ]
+    if flags & HAS_SEQ_NUM:
+        fields.append(('seq_num', '<u8'))
+    if flags & HAS_TICK:
+        fields.append(('tick', '<u8'))
+    return numpy.dtype(fields)
+
+class BranchTrace(object):
+    '''A branch trace file, memory mapped read only.
+
+    records is a structured array with fields pc, target, flags and,
+    if they were recorded, seq_num and tick.  It is a view of the
+    mapping, so nothing is read until it is touched.'''
+
+    def __init__(self, filename):
+        numpy = _numpy()
+
+        self.filename = filename
+        self._file = open(filename, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        if size < HEADER_SIZE:
+            raise ValueError("%s is not a branch trace" % filename)
+
+        magic, version, record_size, flags, pad = \
+            _header.unpack(self._file.read(HEADER_SIZE))
+        if magic != MAGIC:
+            raise ValueError("%s is not a branch trace" % filename)
+        if version != VERSION:
+            raise ValueError("%s has version %d, expected %d" % \
+                             (filename, version, VERSION))
+
+        self.flags = flags
+        self.dtype = recordDtype(flags)
+        if record_size != self.dtype.itemsize:
+            raise ValueError("%s has a corrupt header" % filename)
+
+        count = (size - HEADER_SIZE) // record_size
+        if count:
+            self._map = mmap.mmap(self._file.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+            self.records = numpy.frombuffer(self._map, dtype=self.dtype,
+                                            count=count, offset=HEADER_SIZE)
+        else:
+            # mmap refuses to map an empty file
+            self._map = None
+            self.records = numpy.zeros(0, dtype=self.dtype)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, index):
+        return self.records[index]
+
+    def chunks(self, size):
+        '''Yield successive views of at most size records.'''
+        for start in xrange(0, len(self.records), size):
+            yield self.records[start:start + size]
+
+    def taken(self):
+        return (self.records['flags'] & TAKEN) != 0
+
+    def uncond(self):
+        return (self.records['flags'] & UNCOND) != 0
+
+    def close(self):
+        self.records = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+def write(filename, records):
+    '''Write a structured array built with recordDtype() as a trace.'''
+    numpy = _numpy()
+
+    flags = 0
+    if 'seq_num' in records.dtype.names:
+        flags |= HAS_SEQ_NUM
+    if 'tick' in records.dtype.names:
+        flags |= HAS_TICK
+    dtype = recordDtype(flags)
+
+    f = open(filename, 'wb')
+    f.write(_header.pack(MAGIC, VERSION, dtype.itemsize, flags, 0))
+    numpy.ascontiguousarray(records, dtype=dtype).tofile(f)
+    f.close()
@@ -0,0 +1,257 @@
+# Job state database for jobfile studies.
+#
+# One SQLite file records the state of every job of a study, so that
+# submitting or resubmitting a study is a single query rather than a
+# walk over every job directory, and so that any number of workers can
+# pull jobs from it:
+#
+#     db = JobDB('study/jobs.db')
+#     db.queue([ job.name for job in conf.alljobs() ])
+#     ...
+#     name = db.claim()              # in each worker
+#     ...
+#     db.finish(name, exitcode)
+#
+# A job is queued, running, done or failed; a job the database does not
+# know is 'none'.  For each job it also records the job it depends on,
+# the host and pid running it, the batch system job id and queue, when
+# it was queued, started and finished, its exit code and the cause of a
+# failure.
+#
+# Every state change is a single transaction, and claim() takes the
+# database write lock before picking a job, so two workers never claim
+# the same one.  This relies on the file locks of the file system the
+# database is on, which some NFS setups do not provide.
+
+import errno
+import os
+import socket
+import sqlite3
+import time
+
+states = ('queued', 'running', 'done', 'failed')
+
+_schema = '''
+CREATE TABLE IF NOT EXISTS jobs (
+    name TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    depend TEXT,
+    host TEXT,
+    pid INTEGER,
+    batchid TEXT,
+    batchqueue TEXT,
+    queued REAL,
+    started REAL,
+    finished REAL,
+    exitcode INTEGER,
+    cause TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state);
+'''
+
+def pidAlive(pid):
+    '''Whether a process with the given pid exists on this host.'''
+    try:
+        os.kill(pid, 0)
+    except OSError, e:
+        return e.errno == errno.EPERM
+    return True
+
+class JobDB(object):
+    def __init__(self, filename, timeout=60.0):
+        self.filename = filename
+        # Transactions are begun explicitly, so that claim() can take
+        # the write lock before it reads.
+        self.conn = sqlite3.connect(filename, timeout=timeout,
+                                    isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(_schema)
+
+        # Databases made before the batch queue was recorded
+        columns = [ row['name'] for row in
+                    self.conn.execute('PRAGMA table_info(jobs)') ]
+        if 'batchqueue' not in columns:
+            self.conn.execute('ALTER TABLE jobs ADD COLUMN batchqueue TEXT')
+
+    def close(self):
+        self.conn.close()
+
+    def _transaction(self, func, *args):
+        cursor = self.conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            result = func(cursor, *args)
+        except:
+            cursor.execute('ROLLBACK')
+            raise
+        cursor.execute('COMMIT')
+        return result
+
+    def queue(self, names, depend=None, batchid=None, force=False):
+        '''Queues jobs.  names is a job name or a list of them, and depend
+        is the name of the job they wait for, if any.  Jobs that are
+        already queued, running or done are left alone unless force is
+        given; failed jobs are always requeued.  Returns the names of the
+        jobs that were queued.'''
+        if isinstance(names, basestring):
+            names = [ names ]
+
+        def queue(cursor):
+            now = time.time()
+            queued = []
+            for name in names:
+                row = cursor.execute('SELECT state, attempts FROM jobs '
+                                     'WHERE name = ?', (name,)).fetchone()
+                if row and row['state'] != 'failed' and not force:
+                    continue
+                cursor.execute('INSERT OR REPLACE INTO jobs '
+                               '(name, state, depend, batchid, queued, '
+                               ' attempts) '
+                               'VALUES (?, ?, ?, ?, ?, ?)',
+                               (name, 'queued', depend, batchid, now,
+                                row['attempts'] if row else 0))
+                queued.append(name)
+            return queued
+
+        return self._transaction(queue)
+
+    def setbatchid(self, name, batchid, batchqueue=None):
+        '''Records the batch system id of a job, and the batch queue it
+        was submitted to, leaving its state alone.'''
+        self.conn.execute('UPDATE jobs SET batchid = ?, batchqueue = ? '
+                          'WHERE name = ?', (batchid, batchqueue, name))
+
+    def claim(self, host=None, pid=None):
+        '''Atomically takes the oldest queued job whose dependency is
+        done and marks it running.  Returns its name, or None if no job
+        can run now.'''
+        if host is None:
+            host = socket.gethostname()
+        if pid is None:
+            pid = os.getpid()
+
+        def claim(cursor):
+            row = cursor.execute(
+                'SELECT j.name FROM jobs j LEFT JOIN jobs d '
+                'ON j.depend = d.name WHERE j.state = ? AND '
+                '(j.depend IS NULL OR d.state = ?) '
+                'ORDER BY j.queued, j.name LIMIT 1',
+                ('queued', 'done')).fetchone()
+            if row is None:
+                return None
+            self._start(cursor, row['name'], host, pid)
+            return row['name']
+
+        return self._transaction(claim)
+
+    def start(self, name, host=None, pid=None):
+        '''Marks a job running, for jobs started by a batch system rather
+        than claimed.  Returns False if the job was not queued.'''
+        if host is None:
+            host = socket.gethostname()
+        if pid is None:
+            pid = os.getpid()
+
+        def start(cursor):
+            row = cursor.execute('SELECT state FROM jobs WHERE name = ?',
+                                 (name,)).fetchone()
+            if row is None:
+                cursor.execute('INSERT INTO jobs (name, state, queued) '
+                               'VALUES (?, ?, ?)',
+                               (name, 'queued', time.time()))
+            elif row['state'] != 'queued':
+                return False
+            self._start(cursor, name, host, pid)
+            return True
+
+        return self._transaction(start)
+
+    def _start(self, cursor, name, host, pid):
+        cursor.execute('UPDATE jobs SET state = ?, host = ?, pid = ?, '
+                       'started = ?, finished = NULL, exitcode = NULL, '
+                       'cause = NULL, attempts = attempts + 1 '
+                       'WHERE name = ?',
+                       ('running', host, pid, time.time(), name))
+
+    def finish(self, name, exitcode, cause=None):
+        '''Marks a running job done if exitcode is 0 and failed
+        otherwise, with cause describing the failure.'''
+        state = 'done' if exitcode == 0 else 'failed'
+        if state == 'failed' and cause is None:
+            cause = 'exit code %d' % exitcode
+        self.conn.execute('UPDATE jobs SET state = ?, finished = ?, '
+                          'exitcode = ?, cause = ? WHERE name = ?',
+                          (state, time.time(), exitcode, cause, name))
+
+    def cancelBlocked(self):
+        '''Fails the queued jobs whose dependency failed, which could
+        otherwise never be claimed.  Returns their names.'''
+        def cancel(cursor):
+            rows = cursor.execute('SELECT j.name, j.depend FROM jobs j '
+                                  'JOIN jobs d ON j.depend = d.name '
+                                  'WHERE j.state = ? AND d.state = ?',
+                                  ('queued', 'failed')).fetchall()
+            now = time.time()
+            for row in rows:
+                cursor.execute('UPDATE jobs SET state = ?, finished = ?, '
+                               'cause = ? WHERE name = ?',
+                               ('failed', now,
+                                'dependency %s failed' % row['depend'],
+                                row['name']))
+            return [ row['name'] for row in rows ]
+
+        return self._transaction(cancel)
+
+    def recover(self, host=None):
+        '''Requeues the jobs marked running on host whose process is
+        gone, such as those of a worker that was killed.  Returns their
+        names.'''
+        if host is None:
+            host = socket.gethostname()
+
+        def recover(cursor):
+            rows = cursor.execute('SELECT name, pid FROM jobs '
+                                  'WHERE state = ? AND host = ?',
+                                  ('running', host)).fetchall()
+            lost = [ row['name'] for row in rows
+                     if row['pid'] is None or not pidAlive(row['pid']) ]
+            for name in lost:
+                cursor.execute('UPDATE jobs SET state = ?, host = NULL, '
+                               'pid = NULL WHERE name = ?', ('queued', name))
+            return lost
+
+        return self._transaction(recover)
+
+    def state(self, name):
+        '''The state of a job, 'none' if it is not in the database.'''
+        row = self.conn.execute('SELECT state FROM jobs WHERE name = ?',
+                                (name,)).fetchone()
+        return row['state'] if row else 'none'
+
+    def states(self):
+        '''A dict of the state of every job in the database.'''
+        return dict((row['name'], row['state']) for row in
+                    self.conn.execute('SELECT name, state FROM jobs'))
+
+    def info(self, name):
+        '''A dict of everything recorded about a job, with its wall clock
+        time as 'seconds', or None.'''
+        row = self.conn.execute('SELECT * FROM jobs WHERE name = ?',
+                                (name,)).fetchone()
+        if row is None:
+            return None
+        info = dict(zip(row.keys(), row))
+        if info['started'] is not None and info['finished'] is not None:
+            info['seconds'] = info['finished'] - info['started']
+        else:
+            info['seconds'] = None
+        return info
+
+    def counts(self):
+        '''A dict of the number of jobs in each state.'''
+        counts = dict((state, 0) for state in states)
+        for row in self.conn.execute('SELECT state, COUNT(*) AS n FROM jobs '
+                                     'GROUP BY state'):
+            counts[row['state']] = row['n']
+        return counts
@@ -43,6 +43,10 @@ class Data(object):
                 continue
 
             if key not in self.__dict__:
+                # Copy dicts, which are merged into below, so that a job
+                # does not add to the dicts of its configuration
+                if isinstance(val, dict):
+                    val = dict(val)
                 self.__dict__[key] = val
                 continue
 
@@ -327,6 +331,9 @@ class Configuration(Data):
         if not optgroups:
             return
 
+        # Without checkpoint groups, every job is a plain run
+        plain = not [ grp for grp in groups if grp._checkpoint ]
+
         import m5.util
         for options in m5.util.crossproduct(optgroups):
             for opt in options:
@@ -337,7 +344,7 @@ class Configuration(Data):
                     else:
                         yield options
             else:
-                if checkpoint:
+                if checkpoint or plain:
                     yield options
 
     def addfilter(self, filt, pos=True):
@@ -0,0 +1,259 @@
+# Batch perceptron engine for offline predictor studies.
+#
+# Replays a branch stream through a perceptron predictor with the same
+# semantics as PerceptronBP_Top and HybridpgBP in src/cpu/pred, but
+# operates on a whole chunk of branches at a time with NumPy instead of
+# on one branch and one weight at a time:
+#
+#     from m5.util.branchtrace import BranchTrace
+#     from m5.util.perceptron import BatchPerceptron
+#
+#     engine = BatchPerceptron.fromPerceptronTop(8192, 13)
+#     predicted = engine.replay(BranchTrace('m5out/branch.trace'))
+#     print engine.condIncorrect, engine.weights
+#
+# Because branches are replayed in commit order, the global history
+# seen by every branch is fixed by the outcomes in the trace.  Only the
+# weights carry a dependence from one branch to the next, and only
+# between branches that map to the same table entry.  A chunk is
+# therefore split into waves, where wave k holds the k-th occurrence of
+# each entry in the chunk; all branches in a wave are predicted and
+# trained together, and the waves are applied in order.
+#
+# The fitted training threshold is shared by all entries, so it is the
+# one place where the engine differs from the predictors: it is fitted
+# once per wave from the wave's totals rather than after every branch.
+
+from numpy.lib.stride_tricks import as_strided
+import numpy
+
+from branchtrace import TAKEN, UNCOND
+
+def _floorLog2(x):
+    return int(x).bit_length() - 1
+
+def _ceilLog2(x):
+    if x == 1:
+        return 0
+    return _floorLog2(x - 1) + 1
+
+def _floorPow2(x):
+    return 1 << _floorLog2(x)
+
+def _isPowerOf2(x):
+    return x != 0 and (x & (x - 1)) == 0
+
+class BatchPerceptron(object):
+    '''A table of perceptrons over a global history register.
+
+    weights has shape (entries, history + 1); column 0 is the bias
+    weight, column j the weight of the j-th most recent outcome.  The
+    history is kept bit packed between chunks.
+
+    entries        number of perceptrons, a power of two
+    history        number of global history bits each perceptron sees
+    threshold      train when |y| <= threshold
+    weight_bits    weights saturate at this signed width, at most 8
+    adaptive       fit the threshold as the predictors' adaptiveTheta
+    ctr_bits       width of the threshold fitting counter
+    index_history  if non-zero, index the table gshare style with this
+                   many history bits xored into the PC (HybridpgBP);
+                   otherwise with the PC alone (PerceptronBP_Top)
+    inst_shift_amt PC bits dropped before PC-only indexing
+    '''
+
+    def __init__(self, entries, history, threshold, weight_bits=8,
+                 adaptive=False, ctr_bits=7, index_history=0,
+                 inst_shift_amt=2):
+        if not _isPowerOf2(entries):
+            raise ValueError("perceptron table size must be a power of 2")
+        if not 2 <= weight_bits <= 8:
+            raise ValueError("weights must be between 2 and 8 bits")
+        if not 2 <= ctr_bits <= 16:
+            raise ValueError("threshold counter must be between 2 and 16 "
+                             "bits")
+
+        self.entries = entries
+        self.history = history
+        self.threshold = threshold
+        self.weightMax = (1 << (weight_bits - 1)) - 1
+        self.weightMin = -(1 << (weight_bits - 1))
+        self.adaptive = adaptive
+        self._ctr = 0
+        self._ctrMax = (1 << (ctr_bits - 1)) - 1
+        self._ctrMin = -(1 << (ctr_bits - 1))
+        self.index_history = index_history
+        self.inst_shift_amt = inst_shift_amt
+
+        self.weights = numpy.zeros((entries, history + 1), dtype=numpy.int8)
+
+        # Enough outcomes to build both the perceptron inputs and the
+        # gshare index of the next branch.
+        self._width = max(history, index_history, 1)
+        self._packed = numpy.packbits(numpy.zeros(self._width, numpy.uint8))
+
+        self.branches = 0
+        self.condPredicted = 0
+        self.condIncorrect = 0
+
+    @staticmethod
+    def _entries(globalPredictorSize, globalHistoryBits, weightBits):
+        if globalPredictorSize < globalHistoryBits * weightBits:
+            raise ValueError("perceptron table budget too small for a "
+                             "single perceptron")
+        return _floorPow2(globalPredictorSize //
+                          (globalHistoryBits * weightBits))
+
+    @classmethod
+    def fromPerceptronTop(cls, globalPredictorSize, globalHistoryBits,
+                          weightBits=8, theta=0, adaptiveTheta=True,
+                          thetaCtrBits=7):
+        '''An engine sized and indexed like PerceptronBP_Top for the given
+        PerceptronBP params.'''
+        if not _isPowerOf2(globalPredictorSize):
+            raise ValueError("Invalid perceptron table size!")
+        entries = cls._entries(globalPredictorSize, globalHistoryBits,
+                               weightBits)
+        return cls(entries, globalHistoryBits - 1,
+                   theta or 2 * globalHistoryBits + 14, weightBits,
+                   adaptiveTheta, thetaCtrBits)
+
+    @classmethod
+    def fromHybridpg(cls, globalPredictorSize, globalHistoryBits,
+                     weightBits=8, theta=0, adaptiveTheta=True,
+                     thetaCtrBits=7):
+        '''An engine sized and indexed like HybridpgBP for the given
+        HybridpgBP params.'''
+        if not _isPowerOf2(globalPredictorSize):
+            raise ValueError("Invalid global predictor size!")
+        entries = cls._entries(globalPredictorSize, globalHistoryBits,
+                               weightBits)
+        # The global history register is an unsigned.
+        return cls(entries, globalHistoryBits - 1,
+                   theta or 2 * globalHistoryBits + 14, weightBits,
+                   adaptiveTheta, thetaCtrBits,
+                   index_history=min(globalHistoryBits, 32))
+
+    def _inputs(self, taken):
+        '''Per-branch outcome windows, most recent outcome first.'''
+        n = len(taken)
+        width = self._width
+        bits = numpy.empty(width + n, dtype=numpy.uint8)
+        bits[:width] = numpy.unpackbits(self._packed)[:width]
+        bits[width:] = taken
+        self._packed = numpy.packbits(bits[n:])
+
+        # Row i covers the width outcomes before branch i, which sits at
+        # bits[width + i].
+        windows = as_strided(bits, shape=(n, width),
+                             strides=(bits.strides[0], bits.strides[0]))
+        return windows[:, ::-1]
+
+    def _indices(self, pc, windows):
+        mask = numpy.uint64(self.entries - 1)
+        if not self.index_history:
+            return (pc >> numpy.uint64(self.inst_shift_amt)) & mask
+
+        bits = self.index_history
+        powers = numpy.uint64(1) << numpy.arange(bits, dtype=numpy.uint64)
+        ghist = numpy.dot(windows[:, :bits].astype(numpy.uint64), powers)
+        return (pc ^ ghist) & mask
+
+    def _waves(self, idx):
+        '''Split branch positions into waves with unique table entries.'''
+        order = numpy.argsort(idx, kind='mergesort')
+        sorted_idx = idx[order]
+        n = len(idx)
+
+        starts = numpy.ones(n, dtype=bool)
+        starts[1:] = sorted_idx[1:] != sorted_idx[:-1]
+        group_start = numpy.maximum.accumulate(
+            numpy.where(starts, numpy.arange(n), 0))
+        rank = numpy.arange(n) - group_start
+
+        by_rank = numpy.argsort(rank, kind='mergesort')
+        counts = numpy.bincount(rank)
+        return numpy.split(order[by_rank], numpy.cumsum(counts)[:-1])
+
+    def predict(self, pc, taken, uncond=None):
+        '''Predict and train one chunk of branches.
+
+        pc, taken and uncond are equal length arrays; uncond may be None
+        if the chunk holds only conditional branches.  Returns the
+        per-branch taken predictions.'''
+        pc = numpy.asarray(pc, dtype=numpy.uint64)
+        taken = numpy.asarray(taken, dtype=bool)
+        if uncond is None:
+            uncond = numpy.zeros(len(pc), dtype=bool)
+        else:
+            uncond = numpy.asarray(uncond, dtype=bool)
+
+        n = len(pc)
+        predicted = numpy.empty(n, dtype=bool)
+        if not n:
+            return predicted
+
+        windows = self._inputs(taken)
+        inputs = numpy.empty((n, self.history + 1), dtype=numpy.int32)
+        inputs[:, 0] = 1
+        inputs[:, 1:] = windows[:, :self.history].astype(numpy.int32) * 2 - 1
+        idx = self._indices(pc, windows).astype(numpy.intp)
+        outcome = numpy.where(taken, 1, -1).astype(numpy.int32)
+
+        for wave in self._waves(idx):
+            rows = idx[wave]
+            x = inputs[wave]
+            w = self.weights[rows].astype(numpy.int32)
+
+            y = (w * x).sum(axis=1)
+            # Unconditional branches are recorded as predicted taken
+            # without consulting the perceptron.
+            y[uncond[wave]] = 1
+
+            t = outcome[wave]
+            wrong = numpy.where(y >= 0, 1, -1) != t
+            low = numpy.abs(y) <= self.threshold
+            train = wrong | low
+            w[train] += t[train, None] * x[train]
+            numpy.clip(w, self.weightMin, self.weightMax, out=w)
+            self.weights[rows] = w
+
+            predicted[wave] = y >= 0
+
+            if self.adaptive:
+                cond = ~uncond[wave]
+                self._fitThreshold(int((wrong & cond).sum()),
+                                   int((low & ~wrong & cond).sum()))
+
+        cond = ~uncond
+        self.branches += n
+        self.condPredicted += int(cond.sum())
+        self.condIncorrect += int((predicted[cond] != taken[cond]).sum())
+        return predicted
+
+    def _fitThreshold(self, wrong, low):
+        '''Moves the fitting counter by a wave's mispredictions and
+        correct low confidence predictions, adjusting the threshold each
+        time it saturates.'''
+        ctr = self._ctr + wrong - low
+        while ctr >= self._ctrMax:
+            self.threshold += 1
+            ctr -= self._ctrMax
+        while ctr <= self._ctrMin:
+            if self.threshold > 0:
+                self.threshold -= 1
+            ctr -= self._ctrMin
+        self._ctr = ctr
+
+    def replay(self, trace, chunk_size=1 << 16):
+        '''Replay a BranchTrace; returns the per-branch predictions.'''
+        predicted = numpy.empty(len(trace), dtype=bool)
+        start = 0
+        for chunk in trace.chunks(chunk_size):
+            end = start + len(chunk)
+            flags = chunk['flags']
+            predicted[start:end] = self.predict(chunk['pc'],
+                                                (flags & TAKEN) != 0,
+                                                (flags & UNCOND) != 0)
+            start = end
+        return predicted
@@ -0,0 +1,157 @@
+# Cache of simulation results keyed by what determines them.
+#
+# A run is identified by a hash of its fully unproxied configuration
+# (the content --json-config writes), the gem5 binary, the contents of
+# the files the configuration names, such as workload binaries and
+# their inputs, the checkpoint it restores and the config script
+# command line.  Two runs with the same key simulate the same thing,
+# so the second can reuse the stats of the first:
+#
+#     cache = ResultCache('~/.gem5-results')
+#     key = configHash(root.get_config_as_dict(), ckpt_dir)
+#     stats = cache.lookup(key)
+#     ...
+#     cache.store(key, [ 'm5out/stats.txt' ])
+#
+# The cache is a directory of <key[:2]>/<key>/ entries, each holding
+# the files stored for a run.  Entries are written to a temporary
+# directory and renamed into place, so concurrent runs never see a
+# partial entry.
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+from os.path import basename, exists, expanduser, getmtime, getsize, \
+     isdir, isfile, join as joinpath, realpath
+
+# Files at least this large, such as disk images, are identified by
+# their size and modification time rather than by their contents.
+hashLimit = 64 * 1024 * 1024
+
+def fileIdentity(path):
+    '''A string that changes when the file at path does.'''
+    size = getsize(path)
+    if size >= hashLimit:
+        return 'size %d mtime %d' % (size, getmtime(path))
+
+    digest = hashlib.sha1()
+    f = open(path, 'rb')
+    while True:
+        block = f.read(1 << 20)
+        if not block:
+            break
+        digest.update(block)
+    f.close()
+    return 'sha1 %s' % digest.hexdigest()
+
+def dirIdentity(path):
+    '''A string that changes when any file under path does.'''
+    digest = hashlib.sha1()
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            filename = joinpath(root, name)
+            digest.update('%s %s\n' % (filename[len(path):],
+                                       fileIdentity(filename)))
+    return 'dir %s' % digest.hexdigest()
+
+def configFiles(config):
+    '''The existing files named by string values anywhere in a config
+    dict, sorted.'''
+    files = set()
+    def walk(value):
+        if isinstance(value, dict):
+            for v in value.itervalues():
+                walk(v)
+        elif isinstance(value, (list, tuple)):
+            for v in value:
+                walk(v)
+        elif isinstance(value, basestring) and value and isfile(value):
+            files.add(value)
+    walk(config)
+    return sorted(files)
+
+def binaryPath():
+    '''The path of the running gem5 binary.'''
+    if exists('/proc/self/exe'):
+        return realpath('/proc/self/exe')
+    return realpath(sys.executable)
+
+def configHash(config, ckpt_dir=None, argv=None, binary=None):
+    '''The cache key of a run.
+
+    config    the run's root.get_config_as_dict()
+    ckpt_dir  the checkpoint the run restores, if any
+    argv      the config script command line, which holds settings such
+              as the simulated time that are not in the configuration
+              (default: sys.argv)
+    binary    the gem5 binary (default: the running one)'''
+
+    if argv is None:
+        argv = sys.argv
+    if binary is None:
+        binary = binaryPath()
+
+    digest = hashlib.sha1()
+    digest.update(json.dumps(config, sort_keys=True))
+    digest.update('\0binary %s\n' % fileIdentity(binary))
+    for filename in configFiles(config):
+        digest.update('file %s %s\n' % (filename, fileIdentity(filename)))
+    if ckpt_dir:
+        digest.update('checkpoint %s\n' % dirIdentity(ckpt_dir))
+    digest.update('argv %s\n' % json.dumps(list(argv)))
+    return digest.hexdigest()
+
+class ResultCache(object):
+    '''A directory of stored results, by cache key.'''
+
+    def __init__(self, dir):
+        self.dir = expanduser(dir)
+
+    def path(self, key):
+        return joinpath(self.dir, key[:2], key)
+
+    def lookup(self, key, name='stats.txt'):
+        '''The path of the named file stored for key, or None.'''
+        filename = joinpath(self.path(key), name)
+        if isfile(filename):
+            return filename
+        return None
+
+    def store(self, key, files):
+        '''Stores copies of the files for key, unless key already has
+        an entry.  Returns whether an entry was added.'''
+        final = self.path(key)
+        if isdir(final):
+            return False
+
+        parent = joinpath(self.dir, key[:2])
+        if not isdir(parent):
+            try:
+                os.makedirs(parent)
+            except OSError:
+                # made by a concurrent store
+                if not isdir(parent):
+                    raise
+
+        tmp = tempfile.mkdtemp(prefix='.%s.' % key, dir=parent)
+        try:
+            for filename in files:
+                shutil.copy(filename, joinpath(tmp, basename(filename)))
+        except:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+
+        try:
+            os.rename(tmp, final)
+        except OSError:
+            # another run stored the same key first
+            shutil.rmtree(tmp, ignore_errors=True)
+            if not isdir(final):
+                raise
+            return False
+        return True
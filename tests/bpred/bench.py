@@ -0,0 +1,204 @@
+# Branch predictor benchmark suite.
+#
+# Replays the synthetic streams of streams.py through each branch
+# predictor in src/cpu/pred, with the same trace replay as
+# configs/example/bpred_replay.py, and writes a JSON report of the
+# accuracy and host throughput of every predictor on every stream:
+#
+# "gem5.opt tests/bpred/bench.py --report=bench.json"
+# "gem5.opt tests/bpred/bench.py --pred-types=tage,hashed \
+#      --compare=baseline.json"
+#
+# The streams are seeded, so accuracies only change when a predictor
+# does.  With --compare, each result is checked against a previous
+# report and the script exits with status 1 if a predictor lost more
+# than --max-accuracy-drop of accuracy or more than --max-slowdown of
+# its throughput on any stream.
+
+import json
+import optparse
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+import m5
+from m5.objects import *
+from m5.util import addToPath, fatal
+
+addToPath('../../configs/common')
+
+import Options
+import Simulation
+import streams
+
+try:
+    from m5.internal.bpred_replay import BranchTraceReplay
+except ImportError:
+    BranchTraceReplay = None
+
+parser = optparse.OptionParser()
+
+# The predictor options size every predictor that has them, as for
+# --shadow-pred-types.
+Options.addBranchPredictorOptions(parser)
+parser.add_option("--pred-types", type="string",
+                  default=','.join(sorted(Simulation.bpredClasses)),
+                  help="Comma separated list of predictor types to "
+                       "benchmark (default: all)")
+parser.add_option("--streams", type="string",
+                  default=','.join(sorted(streams.generators)),
+                  help="Comma separated list of streams to replay "
+                       "(default: all)")
+parser.add_option("--branches", type="int", default=1000000,
+                  help="Branches per stream")
+parser.add_option("--seed", type="int", default=1,
+                  help="Seed of the stream generators")
+parser.add_option("--trace-dir", type="string", default=None,
+                  help="Keep the stream traces in this directory "
+                       "(default: a temporary one)")
+parser.add_option("--report", type="string", default="bpred_bench.json",
+                  help="JSON report, relative to the output directory")
+parser.add_option("--compare", type="string", default=None,
+                  help="Check the results against this earlier report")
+parser.add_option("--max-accuracy-drop", type="float", default=0.001,
+                  help="Accuracy a predictor may lose on a stream with "
+                       "--compare")
+parser.add_option("--max-slowdown", type="float", default=0.25,
+                  help="Fraction of its throughput a predictor may lose "
+                       "on a stream with --compare")
+
+(options, args) = parser.parse_args()
+
+if args:
+    parser.error("unexpected arguments %s" % ' '.join(args))
+
+if BranchTraceReplay is None:
+    fatal("This gem5 binary was built without the branch predictors "
+          "(InOrderCPU or O3CPU)")
+
+pred_types = options.pred_types.split(',')
+for t in pred_types:
+    if t not in Simulation.bpredClasses:
+        fatal("unknown branch predictor type %s" % t)
+stream_names = options.streams.split(',')
+for s in stream_names:
+    if s not in streams.generators:
+        fatal("unknown branch stream %s" % s)
+
+if options.trace_dir:
+    trace_dir = options.trace_dir
+    if not os.path.isdir(trace_dir):
+        os.makedirs(trace_dir)
+else:
+    trace_dir = tempfile.mkdtemp(prefix="bpred_bench")
+
+traces = {}
+for s in stream_names:
+    traces[s] = os.path.join(trace_dir, "%s.bt" % s)
+    pcs, taken, uncond = streams.generate(s, options.branches, options.seed)
+    streams.writeTrace(traces[s], pcs, taken, uncond)
+
+# Every run needs a cold predictor, and SimObjects can only be
+# instantiated once, so there is one predictor per predictor and stream.
+root = Root(full_system=False)
+bpreds = {}
+for t in pred_types:
+    for s in stream_names:
+        bpred = Simulation.getBranchPredictor(options, t)
+        if options.loop_pred:
+            bpred = LoopBP(basePredictor=bpred)
+        setattr(root, "%s_%s" % (t, s), bpred)
+        bpreds[(t, s)] = bpred
+
+m5.instantiate()
+
+results = []
+for t in pred_types:
+    for s in stream_names:
+        replay = BranchTraceReplay(bpreds[(t, s)].getCCObject())
+        start = time.time()
+        replay.run(traces[s])
+        elapsed = time.time() - start
+
+        result = {
+            "predictor" : t,
+            "stream" : s,
+            "branches" : replay.branches,
+            "condPredicted" : replay.condPredicted,
+            "condIncorrect" : replay.condIncorrect,
+            "seconds" : elapsed,
+        }
+        if replay.condPredicted:
+            result["accuracy"] = \
+                1.0 - float(replay.condIncorrect) / replay.condPredicted
+        if elapsed > 0:
+            result["predictionsPerSec"] = replay.branches / elapsed
+        results.append(result)
+        print "%-12s %-12s accuracy %.6f  %.0f predictions/s" % \
+            (t, s, result.get("accuracy", 0.0),
+             result.get("predictionsPerSec", 0.0))
+
+if not options.trace_dir:
+    shutil.rmtree(trace_dir)
+
+report = {
+    "host" : {
+        "platform" : platform.platform(),
+        "machine" : platform.machine(),
+        "node" : platform.node(),
+    },
+    "config" : {
+        "branches" : options.branches,
+        "seed" : options.seed,
+        "loopPred" : bool(options.loop_pred),
+        "bpredBudget" : options.bpred_budget,
+    },
+    "results" : results,
+}
+
+report_file = os.path.join(m5.options.outdir, options.report)
+f = open(report_file, 'w')
+json.dump(report, f, indent=2, sort_keys=True)
+f.write('\n')
+f.close()
+print "Wrote %s" % report_file
+
+if options.compare:
+    f = open(options.compare)
+    baseline = json.load(f)
+    f.close()
+
+    if baseline["config"] != report["config"]:
+        print "Warning: %s was made with a different configuration" % \
+            options.compare
+
+    previous = {}
+    for result in baseline["results"]:
+        previous[(result["predictor"], result["stream"])] = result
+
+    regressions = []
+    for result in results:
+        key = (result["predictor"], result["stream"])
+        if key not in previous:
+            continue
+        old = previous[key]
+        if "accuracy" in result and "accuracy" in old and \
+           old["accuracy"] - result["accuracy"] > options.max_accuracy_drop:
+            regressions.append("%s on %s: accuracy %.6f, was %.6f" %
+                               (key + (result["accuracy"], old["accuracy"])))
+        if "predictionsPerSec" in result and "predictionsPerSec" in old and \
+           result["predictionsPerSec"] < \
+           old["predictionsPerSec"] * (1.0 - options.max_slowdown):
+            regressions.append("%s on %s: %.0f predictions/s, was %.0f" %
+                               (key + (result["predictionsPerSec"],
+                                       old["predictionsPerSec"])))
+
+    if regressions:
+        print "Regressions against %s:" % options.compare
+        for r in regressions:
+            print "    " + r
+        sys.exit(1)
+    print "No regressions against %s" % options.compare
@@ -0,0 +1,142 @@
+# Synthetic branch streams for the branch predictor benchmarks.
+#
+# Each generator builds a stream of n branches with a known structure
+# from a seeded NumPy RandomState, so a stream is the same on every host
+# and for every predictor it is replayed through:
+#
+#     from streams import generate, writeTrace
+#
+#     pc, taken, uncond = generate('periodic', 1000000, seed=1)
+#     writeTrace('periodic.bt', pc, taken, uncond)
+#
+# The streams are written in the BranchTracer format, so they can also
+# be fed to configs/example/bpred_replay.py.
+
+import zlib
+
+import numpy
+
+from m5.util import branchtrace
+
+# All streams place their branches in their own part of the address
+# space, 4 byte aligned as for the instShiftAmt default of 2.
+_base = 0x400000
+
+def _rng(name, seed):
+    # Each stream gets its own generator, so that a stream does not
+    # depend on which other streams were generated before it.
+    return numpy.random.RandomState((seed + zlib.crc32(name)) & 0xffffffff)
+
+def _pcs(count, spacing=0x40):
+    return _base + numpy.arange(count, dtype=numpy.uint64) * spacing
+
+def biased(n, rng):
+    '''64 branches visited at random, each going one way 90 to 100% of
+    the time.  Any counter based predictor should do well.'''
+    count = 64
+    pcs = _pcs(count)
+    bias = rng.uniform(0.9, 1.0, count)
+    flip = rng.randint(0, 2, count).astype(bool)
+    idx = rng.randint(0, count, n)
+    taken = rng.random_sample(n) < bias[idx]
+    taken ^= flip[idx]
+    return pcs[idx], taken
+
+def periodic(n, rng):
+    '''16 branches visited in turn, each repeating a random pattern with
+    a period of 2 to 32 outcomes.  Needs history up to the periods.'''
+    count = 16
+    maxPeriod = 32
+    pcs = _pcs(count)
+    period = rng.randint(2, maxPeriod + 1, count)
+    patterns = rng.randint(0, 2, (count, maxPeriod)).astype(bool)
+    idx = numpy.arange(n) % count
+    occurrence = numpy.arange(n) // count
+    taken = patterns[idx, occurrence % period[idx]]
+    return pcs[idx], taken
+
+def correlated(n, rng):
+    '''Groups of four branches: two random ones, one that goes the way
+    of the first, and one that is the xor of the first two.  The third
+    is learnt from global history by any global predictor; the fourth
+    is not linearly separable, so it defeats a single perceptron.'''
+    groups = 8
+    pcs = _pcs(groups * 4)
+    rounds = (n + 3) // 4
+    group = rng.randint(0, groups, rounds)
+    a = rng.randint(0, 2, rounds).astype(bool)
+    b = rng.randint(0, 2, rounds).astype(bool)
+    taken = numpy.column_stack((a, b, a, a ^ b)).ravel()[:n]
+    idx = (group[:, None] * 4 + numpy.arange(4)).ravel()[:n]
+    return pcs[idx], taken
+
+def random(n, rng):
+    '''256 branches visited at random with random outcomes.  No
+    predictor can beat 50%; it measures the cost of thrashing.'''
+    count = 256
+    pcs = _pcs(count)
+    idx = rng.randint(0, count, n)
+    taken = rng.randint(0, 2, n).astype(bool)
+    return pcs[idx], taken
+
+def loop_nested(n, rng):
+    '''Three nested loops with fixed trip counts, each loop closed by a
+    backward branch and the outer loop entered through a jump.  The
+    inner exits need a history as long as the inner trip count.'''
+    outer_trip, middle_trip, inner_trip = sorted(rng.randint(3, 40, 3))
+    jump, outer, middle, inner = _pcs(4)
+
+    pcs = []
+    taken = []
+    uncond = []
+    def branch(pc, t, u=False):
+        pcs.append(pc)
+        taken.append(t)
+        uncond.append(u)
+
+    branch(jump, True, True)
+    for i in xrange(int(outer_trip)):
+        for j in xrange(int(middle_trip)):
+            for k in xrange(int(inner_trip)):
+                branch(inner, k != inner_trip - 1)
+            branch(middle, j != middle_trip - 1)
+        branch(outer, i != outer_trip - 1)
+
+    reps = (n + len(pcs) - 1) // len(pcs)
+    pcs = numpy.tile(numpy.array(pcs, dtype=numpy.uint64), reps)[:n]
+    taken = numpy.tile(numpy.array(taken), reps)[:n]
+    uncond = numpy.tile(numpy.array(uncond), reps)[:n]
+    return pcs, taken, uncond
+
+generators = {
+    'biased' : biased,
+    'periodic' : periodic,
+    'correlated' : correlated,
+    'random' : random,
+    'loop_nested' : loop_nested,
+}
+
+def generate(name, n, seed=1):
+    '''Returns the pc, taken and uncond arrays of n branches of the named
+    stream.'''
+    if name not in generators:
+        raise ValueError("unknown branch stream %s" % name)
+    result = generators[name](n, _rng(name, seed))
+    if len(result) == 2:
+        pcs, taken = result
+        uncond = numpy.zeros(n, dtype=bool)
+    else:
+        pcs, taken, uncond = result
+    return pcs, taken, uncond
+
+def writeTrace(filename, pcs, taken, uncond):
+    '''Writes a stream as a branch trace.'''
+    records = numpy.zeros(len(pcs), dtype=branchtrace.recordDtype())
+    records['pc'] = pcs
+    # Taken branches in these streams jump back a few instructions, as
+    # loop branches do; the predictors only look at the direction.
+    records['target'] = numpy.where(taken, pcs - numpy.uint64(0x20),
+                                    pcs + numpy.uint64(4))
+    records['flags'] = numpy.where(taken, branchtrace.TAKEN, 0) | \
+                       numpy.where(uncond, branchtrace.UNCOND, 0)
+    branchtrace.write(filename, records)
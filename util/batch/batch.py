@@ -102,6 +102,7 @@ class oarsub:
         self.notify = None
         self.stderr = None
         self.stdout = None
+        self.directory = None
 
 
         self.oarhost = None
@@ -124,6 +125,15 @@ class oarsub:
         if self.walltime:
             self.cmd.append('-l walltime=%s' % self.walltime)
 
+        if self.name:
+            self.cmd.append('--name=%s' % self.name)
+
+        if self.afterok:
+            self.cmd.append('--anterior=%s' % self.afterok)
+
+        if self.directory:
+            self.cmd.append('--directory=%s' % self.directory)
+
         if script[0] != "/":
             self.script = os.getcwd()
         else:
@@ -31,6 +31,8 @@ import os, os.path, shutil, signal, socket, sys
 from os import environ as env
 from os.path import join as joinpath, expanduser
 
+from jobdb import JobDB
+
 def date():
     import time
     return time.strftime('%a %b %e %H:%M:%S %Z %Y', time.localtime())
@@ -115,29 +117,6 @@ class JobDir(object):
         f.close()
         return value
 
-    def setstatus(self, string):
-        filename = self.file('.status')
-        try:
-            f = file(filename, 'a')
-            print >>f, string
-            f.flush()
-            f.close()
-        except IOError,e:
-            sys.exit(e)
-
-    def getstatus(self):
-        filename = self.file('.status')
-        try:
-            f = file(filename, 'r')
-        except IOError, e:
-            return 'none'
-
-        # fast forward to the end
-        for line in f: pass
-
-        # the first word on the last line is the status
-        return line.split(' ')[0]
-
     def __str__(self):
         return self.dir
 
@@ -156,6 +135,7 @@ if __name__ == '__main__':
     jobname = env.setdefault('JOBNAME', oar_jobname)
     jobfile = env.setdefault('JOBFILE', joinpath(rootdir, 'Test.py'))
     outdir = env.setdefault('OUTPUT_DIR', cwd)
+    jobdb = env.setdefault('JOBDB', joinpath(rootdir, 'jobs.db'))
     env['POOLJOB'] = 'True'
 
     if os.path.isdir("/work"):
@@ -169,13 +149,11 @@ if __name__ == '__main__':
     os.umask(0022)
 
     jobdir = JobDir(outdir)
+    db = JobDB(jobdb)
 
     started = date()
-    jobdir.echofile('.running', started)
-    jobdir.rmfile('.queued')
-    jobdir.echofile('.host', host)
-
-    jobdir.setstatus('running on %s on %s' % (host, started))
+    if not db.start(jobname, host):
+        sys.exit('job %s is %s, not queued' % (jobname, db.state(jobname)))
 
     if os.path.isdir(workdir):
         cleandir(workdir)
@@ -230,17 +208,18 @@ if __name__ == '__main__':
     while not done:
         try:
             thepid,ec = os.waitpid(childpid, 0)
-            if ec:
-                print 'Exit code ', ec
-                status = 'failure'
+            if os.WIFSIGNALED(ec):
+                code = -os.WTERMSIG(ec)
+                cause = 'killed by signal %d' % os.WTERMSIG(ec)
             else:
-                status = 'success'
+                code = os.WEXITSTATUS(ec)
+                cause = None
+            if code:
+                print 'Exit code ', code
             done = 1
         except OSError:
             pass
 
     complete = date()
     print '\njob complete... %s' % complete
-    jobdir.echofile('.%s' % status, complete)
-    jobdir.rmfile('.running')
-    jobdir.setstatus('%s on %s' % (status, complete))
+    db.finish(jobname, code, cause)
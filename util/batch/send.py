@@ -152,9 +152,11 @@ for arg in args:
     exprs.append(re.compile(arg))
 
 import jobfile, batch
-from job import JobDir, date
+from job import JobDir
+from jobdb import JobDB
 
 conf = jobfile.JobFile(jfile)
+dbfile = env.get('JOBDB', joinpath(conf.rootdir, 'jobs.db'))
 
 if update and not listonly and not onlyecho and isdir(conf.linkdir):
     if verbose:
@@ -195,25 +197,23 @@ if listonly:
     sys.exit(0)
 
 if not onlyecho:
+    db = JobDB(dbfile)
+    # one query for the states of all jobs, rather than a look in every
+    # job directory
+    states = db.states()
     newlist = []
     for job in joblist:
-        jobdir = JobDir(joinpath(conf.rootdir, job.name))
-        if jobdir.exists():
-            if not force:
-                status = jobdir.getstatus()
-                if status == 'queued':
-                    continue
+        status = states.get(job.name, 'none')
+        if status != 'none':
+            if not force and status in ('queued', 'running', 'done'):
+                continue
 
-                if status == 'running':
-                    continue
+            jobdir = JobDir(joinpath(conf.rootdir, job.name))
+            if jobdir.exists():
+                if not clean:
+                    sys.exit('job directory %s not clean!' % jobdir)
 
-                if status == 'success':
-                    continue
-
-            if not clean:
-                sys.exit('job directory %s not clean!' % jobdir)
-
-            jobdir.clean()
+                jobdir.clean()
         newlist.append(job)
     joblist = newlist
 
@@ -250,20 +250,26 @@ namehack = NameHack()
 rootdir = conf.rootdir
 script = joinpath(rootdir, 'Base', 'job.py')
 
+unsent = []
 for job in joblist:
     jobdir = JobDir(joinpath(rootdir, job.name))
+    cptname = None
     if depend:
-        cptdir = JobDir(joinpath(rootdir, job.checkpoint.name))
-        path = str(cptdir)
-        if not isdir(path) or not isfile(joinpath(path, '.success')):
+        cptname = job._checkpoint.name
+        if not onlyecho and db.state(cptname) != 'done':
+            print >>sys.stderr, \
+                'Not sending %s, checkpoint %s is %s, not done' % \
+                (job.name, cptname, db.state(cptname))
+            unsent.append(job.name)
             continue
 
-        cptjob = cptdir.readval('.batch_jobid')
-
     if not onlyecho:
         jobdir.create()
         os.chdir(str(jobdir))
         os.environ['PWD'] = str(jobdir)
+        # Queue the job before submitting it, so that it cannot start
+        # and then be put back in the queue
+        db.queue(job.name, depend=cptname, force=True)
 
     print 'Job name:       %s' % job.name
     print 'Job directory:  %s' % jobdir
@@ -295,12 +301,13 @@ for job in joblist:
             jobid = qsub.result
             print 'OAR Jobid:      %s' % jobid
             #namehack.setname(jobid, job.name)
-            queued = date()
-            jobdir.echofile('.batch_jobid', jobid)
-            jobdir.echofile('.batch_jobname', job.name)
-            jobdir.echofile('.queued', queued)
-            jobdir.setstatus('queued on %s' % queued)
+            db.setbatchid(job.name, jobid)
         else:
             print 'OAR Failed'
+            db.finish(job.name, ec, 'submission failed')
+            unsent.append(job.name)
     print
     print
+
+if unsent:
+    sys.exit('%d jobs not sent: %s' % (len(unsent), ', '.join(unsent)))
@@ -0,0 +1,200 @@
+#! /usr/bin/env python
+
+# Prints the per-branch profiles written by BranchProfiler
+# (--branch-profile), naming each branch after the function it is in
+# using the symbol table of the workload's ELF binary.
+#
+#     util/branch_profile.py -e bzip2 -n 50 m5out/branch_profile.txt
+#
+# Each branch is shown with the share of all mispredictions it caused
+# and the running total, so the handful of branches behind most of them
+# stand out.
+
+import bisect
+import optparse
+import re
+import struct
+import sys
+
+begin_re = re.compile(r'^-+ Begin Branch Profile (\d+) -+$')
+end_re = re.compile(r'^-+ End Branch Profile (\d+) -+$')
+
+class Dump(object):
+    '''One dump of a branch profile.'''
+    def __init__(self, number):
+        self.number = number
+        self.header = {}
+        # (pc, executions, mispredicts, error, rate, lowconf)
+        self.branches = []
+
+def readProfile(filename):
+    '''Returns the list of dumps in a profile file.'''
+    dumps = []
+    dump = None
+    for line in open(filename):
+        line = line.strip()
+        if not line:
+            continue
+        match = begin_re.match(line)
+        if match:
+            dump = Dump(int(match.group(1)))
+            continue
+        if end_re.match(line):
+            dumps.append(dump)
+            dump = None
+            continue
+        if dump is None or line.startswith('#'):
+            continue
+        fields = line.split()
+        if fields[0].startswith('0x'):
+            dump.branches.append((int(fields[0], 16), int(fields[1]),
+                                  int(fields[2]), int(fields[3]),
+                                  float(fields[4]), float(fields[5])))
+        else:
+            dump.header[fields[0]] = fields[1:]
+    return dumps
+
+STT_FUNC = 2
+
+class SymbolTable(object):
+    '''The function symbols of an ELF file, read from .symtab, or from
+    .dynsym if the binary is stripped.'''
+
+    def __init__(self, filename):
+        f = open(filename, 'rb')
+        data = f.read()
+        f.close()
+
+        if data[:4] != '\x7fELF':
+            raise ValueError("%s is not an ELF file" % filename)
+        is64 = ord(data[4]) == 2
+        endian = '<' if ord(data[5]) == 1 else '>'
+
+        if is64:
+            shoff, = struct.unpack_from(endian + 'Q', data, 0x28)
+            shentsize, shnum = struct.unpack_from(endian + 'HH', data, 0x3a)
+            shdr = endian + 'IIQQQQIIQQ'
+            sym = endian + 'IBBHQQ'
+        else:
+            shoff, = struct.unpack_from(endian + 'I', data, 0x20)
+            shentsize, shnum = struct.unpack_from(endian + 'HH', data, 0x2e)
+            shdr = endian + 'IIIIIIIIII'
+            sym = endian + 'IIIBBH'
+
+        sections = [ struct.unpack_from(shdr, data, shoff + i * shentsize)
+                     for i in xrange(shnum) ]
+
+        SHT_SYMTAB, SHT_DYNSYM = 2, 11
+        tables = [ s for s in sections if s[1] == SHT_SYMTAB ] or \
+                 [ s for s in sections if s[1] == SHT_DYNSYM ]
+
+        symbols = {}
+        for s in tables:
+            offset, size, link, entsize = s[4], s[5], s[6], s[9]
+            strtab = sections[link][4]
+            for i in xrange(size / entsize):
+                fields = struct.unpack_from(sym, data, offset + i * entsize)
+                if is64:
+                    name, info, other, shndx, value, symsize = fields
+                else:
+                    name, value, symsize, info, other, shndx = fields
+                if info & 0xf != STT_FUNC or not value:
+                    continue
+                end = data.index('\0', strtab + name)
+                symbols[value] = (data[strtab + name:end], symsize)
+
+        self.addrs = sorted(symbols)
+        self.symbols = [ symbols[a] for a in self.addrs ]
+
+    def lookup(self, addr):
+        '''Returns "function+offset" for an address, or None.'''
+        i = bisect.bisect_right(self.addrs, addr) - 1
+        if i < 0:
+            return None
+        name, size = self.symbols[i]
+        offset = addr - self.addrs[i]
+        # Symbols without a size extend to the next one, but the last
+        # one is not taken to extend forever.
+        if offset >= size and (size or i == len(self.addrs) - 1):
+            return None
+        return '%s+%#x' % (name, offset)
+
+def main():
+    parser = optparse.OptionParser(usage="%prog [options] <profile>")
+    parser.add_option("-e", "--elf", default=None,
+                      help="Workload binary to take symbols from")
+    parser.add_option("-n", "--num", type="int", default=20,
+                      help="Number of branches to print (default: 20, "
+                           "0 for all)")
+    parser.add_option("-d", "--dump", type="int", default=None,
+                      help="Dump to print (default: the last one)")
+    parser.add_option("-f", "--functions", action="store_true",
+                      help="Add up the branches of each function")
+    (options, args) = parser.parse_args()
+
+    if len(args) != 1:
+        parser.error("expected one profile file")
+
+    dumps = readProfile(args[0])
+    if not dumps:
+        print >>sys.stderr, "%s holds no complete profile" % args[0]
+        sys.exit(1)
+
+    if options.dump is None:
+        dump = dumps[-1]
+    else:
+        matching = [ d for d in dumps if d.number == options.dump ]
+        if not matching:
+            print >>sys.stderr, "no dump %d in %s" % (options.dump, args[0])
+            sys.exit(1)
+        dump = matching[0]
+
+    symtab = SymbolTable(options.elf) if options.elf else None
+
+    def symbolize(pc):
+        name = symtab.lookup(pc) if symtab else None
+        return name or '%#x' % pc
+
+    total = max(int(dump.header['mispredicts'][0]), 1)
+    print "dump %d: %s branches, %s mispredicts, %s of %s tracked" % \
+        (dump.number, dump.header['branches'][0],
+         dump.header['mispredicts'][0], dump.header['tracked'][0],
+         dump.header['tracked'][2])
+
+    if options.functions:
+        funcs = {}
+        for pc, execs, mispreds, error, rate, lowconf in dump.branches:
+            name = symbolize(pc).split('+')[0]
+            f = funcs.setdefault(name, [0, 0, 0])
+            f[0] += 1
+            f[1] += execs
+            f[2] += mispreds
+        rows = sorted(funcs.iteritems(), key=lambda f: -f[1][2])
+        if options.num:
+            rows = rows[:options.num]
+        print "%-40s %8s %14s %14s %7s %7s" % \
+            ("function", "branches", "executions", "mispredicts", "share",
+             "cumul")
+        cumul = 0
+        for name, (branches, execs, mispreds) in rows:
+            cumul += mispreds
+            print "%-40s %8d %14d %14d %6.2f%% %6.2f%%" % \
+                (name, branches, execs, mispreds, 100.0 * mispreds / total,
+                 100.0 * cumul / total)
+        return
+
+    rows = dump.branches
+    if options.num:
+        rows = rows[:options.num]
+    print "%-18s %-40s %14s %14s %8s %8s %7s %7s" % \
+        ("pc", "symbol", "executions", "mispredicts", "rate", "lowconf",
+         "share", "cumul")
+    cumul = 0
+    for pc, execs, mispreds, error, rate, lowconf in rows:
+        cumul += mispreds
+        print "%-18s %-40s %14d %14d %8.4f %8.4f %6.2f%% %6.2f%%" % \
+            ('%#x' % pc, symbolize(pc), execs, mispreds, rate, lowconf,
+             100.0 * mispreds / total, 100.0 * cumul / total)
+
+if __name__ == '__main__':
+    main()
@@ -153,9 +153,11 @@ for arg in args:
     exprs.append(re.compile(arg))
 
 import jobfile, pbs
-from job import JobDir, date
+from job import JobDir
+from jobdb import JobDB
 
 conf = jobfile.JobFile(jfile)
+dbfile = env.get('JOBDB', joinpath(conf.rootdir, 'jobs.db'))
 
 if update and not listonly and not onlyecho and isdir(conf.linkdir):
     if verbose:
@@ -196,25 +198,23 @@ if listonly:
     sys.exit(0)
 
 if not onlyecho:
+    db = JobDB(dbfile)
+    # one query for the states of all jobs, rather than a look in every
+    # job directory
+    states = db.states()
     newlist = []
     for job in joblist:
-        jobdir = JobDir(joinpath(conf.rootdir, job.name))
-        if jobdir.exists():
-            if not force:
-                status = jobdir.getstatus()
-                if status == 'queued':
-                    continue
+        status = states.get(job.name, 'none')
+        if status != 'none':
+            if not force and status in ('queued', 'running', 'done'):
+                continue
 
-                if status == 'running':
-                    continue
+            jobdir = JobDir(joinpath(conf.rootdir, job.name))
+            if jobdir.exists():
+                if not clean:
+                    sys.exit('job directory %s not clean!' % jobdir)
 
-                if status == 'success':
-                    continue
-
-            if not clean:
-                sys.exit('job directory %s not clean!' % jobdir)
-
-            jobdir.clean()
+                jobdir.clean()
         newlist.append(job)
     joblist = newlist
 
@@ -248,14 +248,28 @@ class NameHack(object):
 
 namehack = NameHack()
 
+unsent = []
 for job in joblist:
     jobdir = JobDir(joinpath(conf.rootdir, job.name))
+    cptname = None
     if depend:
-        cptdir = JobDir(joinpath(conf.rootdir, job.checkpoint.name))
-        cptjob = cptdir.readval('.pbs_jobid')
+        cptname = job._checkpoint.name
+        cptjob = None
+        if not onlyecho:
+            info = db.info(cptname)
+            if info is None or info['batchid'] is None:
+                print >>sys.stderr, \
+                    'Not sending %s, checkpoint %s was never submitted' % \
+                    (job.name, cptname)
+                unsent.append(job.name)
+                continue
+            cptjob = info['batchid']
 
     if not onlyecho:
         jobdir.create()
+        # Queue the job before submitting it, so that it cannot start
+        # and then be put back in the queue
+        db.queue(job.name, depend=cptname, force=True)
 
     print 'Job name:       %s' % job.name
     print 'Job directory:  %s' % jobdir
@@ -268,6 +282,7 @@ for job in joblist:
     qsub.node_type = node_type
     qsub.env['ROOTDIR'] = conf.rootdir
     qsub.env['JOBNAME'] = job.name
+    qsub.env['JOBDB'] = dbfile
     if depend:
         qsub.afterok = cptjob
     if queue:
@@ -283,10 +298,11 @@ for job in joblist:
             jobid = qsub.result
             print 'PBS Jobid:      %s' % jobid
             namehack.setname(jobid, job.name)
-            queued = date()
-            jobdir.echofile('.pbs_jobid', jobid)
-            jobdir.echofile('.pbs_jobname', job.name)
-            jobdir.echofile('.queued', queued)
-            jobdir.setstatus('queued on %s' % queued)
+            db.setbatchid(job.name, jobid, queue or None)
         else:
             print 'PBS Failed'
+            db.finish(job.name, ec, 'submission failed')
+            unsent.append(job.name)
+
+if unsent:
+    sys.exit('%d jobs not sent: %s' % (len(unsent), ', '.join(unsent)))
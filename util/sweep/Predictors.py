@@ -0,0 +1,51 @@
+# Branch predictor design space sweep over SPEC CPU2006, for
+# util/sweep/sweep.py.  Run it from the top of the gem5 tree:
+#
+#     util/sweep/sweep.py -j util/sweep/Predictors.py
+#
+# Every job is a benchmark crossed with one predictor configuration,
+# run on the inorder CPU for the first 10M instructions.
+
+from m5.util.jobfile import Configuration
+
+conf = Configuration('predictors', 'branch predictor design space',
+                     binary='build/ALPHA_MESI_CMP_directory/gem5.opt',
+                     script='configs/spec2k6/run.py',
+                     rootdir='sweep/predictors',
+                     args={ 'cpu-type' : 'inorder', 'caches' : True,
+                            'maxinsts' : 10000000 })
+
+bench = conf.group('bench', 'benchmark')
+for name in ('bzip2', 'gcc', 'mcf', 'gobmk', 'hmmer', 'sjeng'):
+    bench.option(name, name, args={ 'benchmark' : name })
+
+pred = conf.group('pred', 'branch predictor')
+
+# The local and gshare sizes are in bits, of 2-bit counters
+for size in (1024, 4096, 16384):
+    pred.option('local%d' % size, 'local, %d bit budget' % size,
+                args={ 'pred-type' : 'local', 'local-pred-size' : size })
+
+for size in (4096, 16384):
+    for hist in (8, 12, 16):
+        pred.option('gshare%d_h%d' % (size, hist),
+                    'gshare, %d bit budget, %d history bits' % (size, hist),
+                    args={ 'pred-type' : 'gshare',
+                           'global-pred-size' : size,
+                           'global-hist-size' : hist })
+
+for size in (4096, 16384):
+    for hist in (4, 12, 24):
+        pred.option('hybridpg%d_h%d' % (size, hist),
+                    'hybridpg, %d bit budget, %d history bits' % (size, hist),
+                    args={ 'pred-type' : 'hybridpg',
+                           'global-pred-size' : size,
+                           'global-hist-size' : hist })
+
+for hist in (12, 24, 34):
+    pred.option('perceptron_h%d' % hist,
+                'perceptron, %d history bits' % hist,
+                args={ 'pred-type' : 'perceptron',
+                       'global-hist-size' : hist })
+
+pred.option('tage', 'TAGE', args={ 'pred-type' : 'tage' })
@@ -0,0 +1,339 @@
+# Backends that run the jobs of a sweep.py sweep.
+#
+#     local    a pool of processes on this host
+#     workers  worker processes pulling jobs from the job database of the
+#              sweep; run sweep.py -w with the same jobfile on other hosts
+#              that share the file system to add workers there
+#     pbs      one PBS job (qsub) per sweep job
+#     oar      one OAR job (oarsub) per sweep job
+#     fake     a stand-in batch system on this host, which takes the same
+#              submissions as pbs and oar, so the batch path of a sweep
+#              can be tried out without a cluster
+#
+# The batch backends submit runs of sweep.py -r <job>, which runs the
+# job on the node and records it in the job database, and make each job
+# depend on its checkpoint job.  They assume the sweep directories and
+# the gem5 tree are on a file system the nodes share.
+#
+# Every backend takes the jobs to run, with the checkpoint jobs first,
+# and has a run(jobs) method; synchronous backends return once the
+# jobs are done.
+
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from multiprocessing.pool import ThreadPool
+from os.path import dirname, isdir, join as joinpath, realpath
+
+import runner
+
+current_dir = dirname(realpath(__file__))
+sweep_script = joinpath(current_dir, 'sweep.py')
+
+class Local(object):
+    '''Runs the jobs in a pool of processes on this host.  The checkpoint
+    jobs run first, and jobs whose checkpoint failed are skipped.'''
+    synchronous = True
+
+    def __init__(self, processes, cache=None, verbose=False):
+        self.processes = processes
+        self.cache = cache
+        self.verbose = verbose
+
+    def runpool(self, jobs):
+        def work(job):
+            return job, runner.execute(job, self.cache)
+
+        results = {}
+        pool = ThreadPool(self.processes)
+        done = 0
+        for job, result in pool.imap_unordered(work, jobs):
+            done += 1
+            results[job.name] = result
+            runner.report(job, result, '[%*d/%d] ' %
+                          (len(str(len(jobs))), done, len(jobs)))
+            if self.verbose and result and result[0]:
+                print '    see %s' % joinpath(runner.outdir(job), 'sweep.log')
+            sys.stdout.flush()
+        pool.close()
+        pool.join()
+        return results
+
+    def run(self, jobs):
+        runner.queue(jobs, force=True)
+        results = self.runpool([ job for job in jobs if job._is_checkpoint ])
+        failed = set(name for name, result in results.iteritems()
+                     if result is None or result[0])
+        runs = []
+        for job in jobs:
+            if job._is_checkpoint:
+                continue
+            if job._checkpoint and job._checkpoint.name in failed:
+                print 'skipping %s, checkpoint %s failed' % \
+                    (job.name, job._checkpoint.name)
+                continue
+            runs.append(job)
+        self.runpool(runs)
+
+class Workers(object):
+    '''Queues the jobs in the job database of the sweep and runs worker
+    processes that claim them until none are left.  Any number of
+    workers, on any host that shares the sweep directory, can work on
+    the same database; each only runs jobs it finds in its jobfile.'''
+    synchronous = True
+
+    def __init__(self, processes, cache=None, verbose=False, poll=10.0):
+        self.processes = processes
+        self.cache = cache
+        self.verbose = verbose
+        self.poll = poll
+        self.lock = threading.Lock()
+
+    def rootdir(self, jobs):
+        rootdirs = set(job.rootdir for job in jobs)
+        if len(rootdirs) != 1:
+            sys.exit('workers need all jobs in one rootdir, not %s' %
+                     ', '.join(sorted(rootdirs)))
+        return rootdirs.pop()
+
+    def worker(self, rootdir, byname):
+        db = runner.jobdb(rootdir)
+        while True:
+            name = db.claim()
+            if name is None:
+                db.cancelBlocked()
+                if not db.counts()['queued']:
+                    break
+                # the remaining jobs wait for jobs that are running
+                time.sleep(self.poll)
+                continue
+
+            job = byname.get(name)
+            if job is None:
+                db.finish(name, 1, 'not in the jobfile of worker %d on %s' %
+                          (os.getpid(), os.uname()[1]))
+                continue
+
+            result = runner.execute(job, self.cache, claimed=True)
+            self.lock.acquire()
+            try:
+                runner.report(job, result)
+                if self.verbose and result[0]:
+                    print '    see %s' % \
+                        joinpath(runner.outdir(job), 'sweep.log')
+                sys.stdout.flush()
+            finally:
+                self.lock.release()
+        db.close()
+
+    def work(self, jobs):
+        '''Works on the queued jobs of the sweep, whose jobs are jobs,
+        until there are none left.'''
+        rootdir = self.rootdir(jobs)
+        db = runner.jobdb(rootdir)
+        lost = db.recover()
+        db.close()
+        if lost:
+            print 'requeued %s, left running by a dead worker' % \
+                ', '.join(lost)
+
+        byname = dict((job.name, job) for job in jobs)
+        threads = [ threading.Thread(target=self.worker,
+                                     args=(rootdir, byname))
+                    for i in xrange(self.processes) ]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            # join with a timeout, which leaves the main thread able to
+            # take a KeyboardInterrupt
+            while thread.isAlive():
+                thread.join(1.0)
+
+    def run(self, jobs):
+        self.rootdir(jobs)
+        runner.queue(jobs, force=True)
+        self.work(jobs)
+
+class Batch(object):
+    '''Submits one batch job per sweep job, each running sweep.py -r on
+    the job and depending on its checkpoint job.'''
+    synchronous = False
+
+    def __init__(self, jobfile, cache=None, queue=None, verbose=False):
+        self.jobfile = realpath(jobfile)
+        self.cache = cache
+        self.queue = queue
+        self.verbose = verbose
+
+    def runargs(self, job):
+        '''The sweep.py command line that runs job.'''
+        args = [ sweep_script, '-j', self.jobfile, '-r', job.name ]
+        if self.cache:
+            args += [ '-c', realpath(self.cache) ]
+        return args
+
+    def submit(self, job, afterok):
+        '''Submits job, to start after the batch job afterok, if any,
+        succeeded.  Returns its batch job id, or None.'''
+        raise NotImplementedError
+
+    def run(self, jobs):
+        runner.queue(jobs, force=True)
+        names = set(job.name for job in jobs)
+        batchids = {}
+        for job in jobs:
+            dep = runner.dependency(job, names)
+            if dep and dep not in batchids:
+                print 'skipping %s, checkpoint %s was not submitted' % \
+                    (job.name, dep)
+                db = runner.jobdb(job.rootdir)
+                db.finish(job.name, 1, 'checkpoint %s was not submitted' % dep)
+                db.close()
+                continue
+
+            dir = runner.outdir(job)
+            if not isdir(dir):
+                os.makedirs(dir)
+
+            batchid = self.submit(job, batchids.get(dep))
+            db = runner.jobdb(job.rootdir)
+            if batchid is None:
+                print '%s: submission failed' % job.name
+                db.finish(job.name, 1, 'submission failed')
+            else:
+                print '%s: batch job %s' % (job.name, batchid)
+                db.setbatchid(job.name, batchid, self.queue)
+                batchids[job.name] = batchid
+            db.close()
+            sys.stdout.flush()
+
+class Pbs(Batch):
+    def submit(self, job, afterok):
+        import pbs
+
+        # qsub runs a script without arguments, so the job is passed to
+        # sweep.py in the environment
+        qsub = pbs.qsub()
+        qsub.name = job.name[:15]
+        qsub.stdout = joinpath(realpath(runner.outdir(job)), 'batch.out')
+        qsub.join = True
+        qsub.env['SWEEP_DIR'] = os.getcwd()
+        qsub.env['SWEEP_JOBFILE'] = self.jobfile
+        qsub.env['SWEEP_JOB'] = job.name
+        if self.cache:
+            qsub.env['SWEEP_CACHE'] = realpath(self.cache)
+        qsub.afterok = afterok
+        if self.queue:
+            qsub.queue = self.queue
+        qsub.build(sweep_script)
+        if self.verbose:
+            print 'PBS Command:    %s' % qsub.command
+
+        if qsub.do():
+            return None
+        return qsub.result.strip()
+
+class Oar(Batch):
+    def submit(self, job, afterok):
+        import batch
+
+        oarsub = batch.oarsub()
+        oarsub.name = job.name
+        oarsub.afterok = afterok
+        oarsub.queue = self.queue
+        oarsub.directory = os.getcwd()
+        oarsub.build(' '.join(self.runargs(job)))
+        if self.verbose:
+            print 'OAR Command:    %s' % oarsub.command
+
+        # oarsub.do() exits if it cannot find the job id
+        oarsub.do()
+        return oarsub.result
+
+class FakeScheduler(object):
+    '''A batch system on this host.  Submitted commands run in up to
+    slots processes at a time, each once the job it has to start after
+    has succeeded; jobs whose dependency failed are cancelled.'''
+
+    def __init__(self, slots):
+        self.slots = slots
+        self.nextid = 0
+        self.pending = []
+        self.running = {}
+        self.status = {}
+
+    def submit(self, cmd, stdout, afterok=None):
+        self.nextid += 1
+        jobid = '%d.fake' % self.nextid
+        self.pending.append((jobid, cmd, stdout, afterok))
+        return jobid
+
+    def start(self, jobid, cmd, stdout):
+        out = open(stdout, 'w')
+        self.running[jobid] = subprocess.Popen(cmd, stdin=open(os.devnull),
+                                               stdout=out,
+                                               stderr=subprocess.STDOUT)
+        out.close()
+
+    def wait(self, poll=0.1):
+        '''Runs the submitted jobs, returning a dict of their exit codes
+        by job id, which is None for cancelled jobs.'''
+        while self.pending or self.running:
+            for jobid, proc in self.running.items():
+                if proc.poll() is not None:
+                    self.status[jobid] = proc.returncode
+                    del self.running[jobid]
+
+            pending = []
+            for job in self.pending:
+                jobid, cmd, stdout, afterok = job
+                if afterok is not None and afterok in self.status and \
+                   self.status[afterok] != 0:
+                    self.status[jobid] = None
+                elif len(self.running) < self.slots and \
+                     (afterok is None or afterok in self.status):
+                    self.start(jobid, cmd, stdout)
+                else:
+                    pending.append(job)
+            self.pending = pending
+            if self.running:
+                time.sleep(poll)
+        return self.status
+
+class Fake(Batch):
+    synchronous = True
+
+    def __init__(self, jobfile, processes, cache=None, queue=None,
+                 verbose=False):
+        super(Fake, self).__init__(jobfile, cache, queue, verbose)
+        self.scheduler = FakeScheduler(processes)
+
+    def submit(self, job, afterok):
+        cmd = [ sys.executable ] + self.runargs(job)
+        if self.verbose:
+            print 'Fake Command:   %s' % ' '.join(cmd)
+        return self.scheduler.submit(cmd, joinpath(runner.outdir(job),
+                                                   'batch.out'), afterok)
+
+    def run(self, jobs):
+        super(Fake, self).run(jobs)
+        self.scheduler.wait()
+
+        # as the real batch systems do, the jobs whose checkpoint
+        # failed never ran
+        for rootdir in set(job.rootdir for job in jobs):
+            db = runner.jobdb(rootdir)
+            db.cancelBlocked()
+            db.close()
+
+backends = {
+    'local' : Local,
+    'workers' : Workers,
+    'pbs' : Pbs,
+    'oar' : Oar,
+    'fake' : Fake,
+}
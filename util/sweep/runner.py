@@ -0,0 +1,190 @@
+# Running single jobs of a jobfile sweep, shared by sweep.py and the
+# backends that run its jobs.
+#
+# Every job runs in <rootdir>/<job name>, and its state is recorded in
+# the m5.util.jobdb database <rootdir>/jobs.db, whichever backend runs
+# it.
+
+import os
+import re
+import subprocess
+import time
+
+from os.path import getsize, isdir, isfile, join as joinpath
+
+from m5.util.jobdb import JobDB
+from m5.util.resultcache import ResultCache
+
+default_stats = [ r'sim_seconds$', r'sim_insts$', r'host_seconds$',
+                  r'.*\.condPredicted$', r'.*\.condIncorrect$' ]
+
+def jobargs(job):
+    '''Config script options of a job, in a stable order.'''
+    opts = dict(getattr(job, 'args', {}))
+    if job._checkpoint and 'checkpoint-dir' not in opts:
+        opts['checkpoint-dir'] = outdir(job._checkpoint)
+
+    args = []
+    for key, val in sorted(opts.iteritems()):
+        if val is False:
+            continue
+        if val is True or val is None:
+            args.append('--%s' % key)
+        else:
+            args.append('--%s=%s' % (key, val))
+    return args
+
+def outdir(job):
+    return joinpath(job.rootdir, job.name)
+
+def cachedir(job, cache=None):
+    '''The result cache directory of a job, if it uses one.'''
+    return cache or getattr(job, 'cache', None)
+
+def command(job, cache=None):
+    '''The gem5 command line of a job.'''
+    gem5args = [ '-d', outdir(job) ]
+    if cachedir(job, cache):
+        gem5args.append('--result-cache=%s' % cachedir(job, cache))
+    return [ job.binary ] + gem5args + [ job.script ] + jobargs(job)
+
+def isdone(job):
+    stats = joinpath(outdir(job), 'stats.txt')
+    return isfile(stats) and getsize(stats) > 0
+
+def dependency(job, names):
+    '''The name of the job that job has to wait for, which is its
+    checkpoint job if that is one of names, the jobs being run.'''
+    if job._checkpoint and job._checkpoint.name in names:
+        return job._checkpoint.name
+    return None
+
+def jobdb(rootdir):
+    '''The job database of the jobs in rootdir.'''
+    if not isdir(rootdir):
+        try:
+            os.makedirs(rootdir)
+        except OSError:
+            if not isdir(rootdir):
+                raise
+    return JobDB(joinpath(rootdir, 'jobs.db'))
+
+def queue(jobs, force=False):
+    '''Queues jobs in their job databases, each depending on its
+    checkpoint job if that is queued too.  Returns the names of the jobs
+    that were queued.'''
+    names = set(job.name for job in jobs)
+    queued = []
+    byroot = {}
+    for job in jobs:
+        byroot.setdefault(job.rootdir, []).append(job)
+    for rootdir, rootjobs in byroot.iteritems():
+        db = jobdb(rootdir)
+        for job in rootjobs:
+            queued += db.queue(job.name, dependency(job, names), force=force)
+        db.close()
+    return queued
+
+def readstats(filename, patterns):
+    '''The stats of the first dump in a stats file matching any of the
+    patterns, as a dict of name to value.'''
+    matchers = [ re.compile(p) for p in patterns ]
+    stats = {}
+    try:
+        f = open(filename)
+    except IOError:
+        return stats
+
+    started = False
+    for line in f:
+        if line.startswith('---------- Begin'):
+            started = True
+            continue
+        if line.startswith('---------- End'):
+            break
+        if not started:
+            continue
+        fields = line.split()
+        if len(fields) < 2:
+            continue
+        name = fields[0]
+        if not any(m.match(name) for m in matchers):
+            continue
+        try:
+            stats[name] = float(fields[1])
+        except ValueError:
+            stats[name] = fields[1]
+    f.close()
+    return stats
+
+def storeresult(job, cache):
+    '''Adds the stats of a finished job to the result cache, under the
+    key gem5 wrote to its output directory.'''
+    dir = outdir(job)
+    try:
+        f = open(joinpath(dir, 'config.hash'))
+        key = f.read().strip()
+        f.close()
+    except IOError:
+        return False
+    if not key or not isdone(job):
+        return False
+
+    files = [ joinpath(dir, name)
+              for name in ('stats.txt', 'config.ini', 'config.json') ]
+    files = [ name for name in files if isfile(name) ]
+    return ResultCache(cache).store(key, files)
+
+def runjob(job, cache=None):
+    '''Runs one job to completion, returning its exit code and wall
+    clock time.'''
+    dir = outdir(job)
+    if not isdir(dir):
+        os.makedirs(dir)
+
+    log = open(joinpath(dir, 'sweep.log'), 'w')
+    print >>log, ' '.join(command(job, cache))
+    log.flush()
+    start = time.time()
+    try:
+        code = subprocess.call(command(job, cache), stdin=open(os.devnull),
+                               stdout=log, stderr=subprocess.STDOUT)
+    except OSError, e:
+        # as the shell does for a command it cannot run
+        print >>log, e
+        code = 127
+    if code == 0 and cachedir(job, cache):
+        try:
+            storeresult(job, cachedir(job, cache))
+        except (IOError, OSError), e:
+            print >>log, 'could not cache the result: %s' % e
+    log.close()
+    return code, time.time() - start
+
+def execute(job, cache=None, claimed=False):
+    '''Runs a queued job, recording it in its job database.  Returns
+    its exit code and wall clock time, or None if the job was not
+    queued, such as when another worker took it.'''
+    db = jobdb(job.rootdir)
+    if not claimed and not db.start(job.name):
+        db.close()
+        return None
+
+    code, seconds = runjob(job, cache)
+    cause = None
+    if code < 0:
+        # subprocess gives the signal that killed the process as a
+        # negative exit code
+        cause = 'killed by signal %d' % -code
+    db.finish(job.name, code, cause)
+    db.close()
+    return code, seconds
+
+def report(job, result, prefix=''):
+    '''Prints the result of a job as returned by execute().'''
+    if result is None:
+        print '%s%s skipped, not queued' % (prefix, job.name)
+        return
+    code, seconds = result
+    status = 'done' if code == 0 else 'failed (%d)' % code
+    print '%s%s %s in %.0fs' % (prefix, job.name, status, seconds)
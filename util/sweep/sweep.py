@@ -0,0 +1,281 @@
+#!/usr/bin/env python
+
+# Runs the jobs of a jobfile as a sweep, one gem5 process per job, on
+# this host or through a batch system:
+#
+#     util/sweep/sweep.py -j util/sweep/Predictors.py
+#     util/sweep/sweep.py -j util/sweep/Predictors.py -n 16 'bzip2:.*'
+#     util/sweep/sweep.py -j util/sweep/Predictors.py -b pbs -q long
+#
+# The jobfile is an m5.util.jobfile Configuration.  Besides the usual
+# groups and options, the sweep reads these attributes of each job:
+#
+#     binary   the gem5 binary
+#     script   the config script it runs
+#     rootdir  directory the job output directories are made in
+#     args     dict of config script options, merged over the
+#              configuration, its groups and options; a value of True
+#              (or None) gives a bare flag and False leaves it out
+#     stats    optional list of regexps of the stats to collect
+#     cache    optional result cache directory, overridden by -c
+#
+# If the configuration has checkpoint groups, the checkpoint jobs are
+# run first, and each job is then passed its checkpoint job's
+# directory as --checkpoint-dir.
+#
+# Each job runs in <rootdir>/<job name> and leaves its gem5 output
+# there, and its state is kept in <rootdir>/jobs.db (see
+# m5.util.jobdb).  Jobs whose directory already has a stats.txt are not
+# rerun unless -f is given.  When all jobs are done, the selected stats
+# of the first dump of each job are collected in <rootdir>/results.json.
+#
+# -b picks the backend that runs the jobs (see backends.py): a local
+# pool of processes, workers pulling from the job database, which more
+# hosts can join with -w, PBS or OAR, or a stand-in batch system on
+# this host.  Batch jobs return at once; collect their results with -s
+# once they are done.
+#
+# With -c <cachedir>, or a cache attribute on the job, each job is run
+# with --result-cache, so gem5 copies the stats of an earlier run of
+# the same configuration, binary and inputs out of the cache instead of
+# simulating it again (see m5.util.resultcache).  The stats of every
+# job that succeeds are added to the cache.
+
+import getopt
+import json
+import multiprocessing
+import os
+import re
+import sys
+
+from os.path import dirname, join as joinpath, realpath
+
+current_dir = dirname(realpath(__file__))
+sys.path.insert(1, joinpath(dirname(dirname(current_dir)), 'src', 'python'))
+sys.path.insert(1, joinpath(dirname(current_dir), 'batch'))
+sys.path.insert(1, joinpath(dirname(current_dir), 'pbs'))
+
+from m5.util.jobfile import JobFile
+
+import backends
+import runner
+
+def collect(jobs):
+    '''Writes the results of all jobs, as their job databases record
+    them, to <rootdir>/results.json.  Returns the entries.'''
+    dbs = {}
+    byroot = {}
+    for job in jobs:
+        if job.rootdir not in dbs:
+            dbs[job.rootdir] = runner.jobdb(job.rootdir)
+        info = dbs[job.rootdir].info(job.name) or {}
+
+        status = info.get('state')
+        if status is None:
+            status = 'done' if runner.isdone(job) else 'missing'
+        patterns = getattr(job, 'stats', runner.default_stats)
+        entry = {
+            'name' : job.name,
+            'desc' : job.desc,
+            'outdir' : runner.outdir(job),
+            'args' : getattr(job, 'args', {}),
+            'status' : status,
+            'exitcode' : info.get('exitcode'),
+            'cause' : info.get('cause'),
+            'host' : info.get('host'),
+            'seconds' : info.get('seconds'),
+            'stats' : runner.readstats(joinpath(runner.outdir(job),
+                                                'stats.txt'), patterns),
+        }
+        byroot.setdefault(job.rootdir, []).append(entry)
+
+    for db in dbs.itervalues():
+        db.close()
+
+    entries = []
+    for rootdir, rootentries in byroot.iteritems():
+        filename = joinpath(rootdir, 'results.json')
+        f = open(filename, 'w')
+        json.dump(rootentries, f, indent=2, sort_keys=True)
+        f.write('\n')
+        f.close()
+        print 'Results in %s' % filename
+        entries += rootentries
+    return entries
+
+def runone(conf, name, cache):
+    '''Runs the named job, as a batch job submitted by a batch backend
+    does.  Returns its exit code.'''
+    try:
+        job = conf.find(name)
+    except AttributeError, e:
+        sys.exit(e)
+
+    result = runner.execute(job, cache)
+    runner.report(job, result)
+    if result is None:
+        return 1
+    return result[0]
+
+usage = """\
+Usage:
+    %(progname)s [-b <backend>] [-c <cachedir>] [-e] [-f] [-j <jobfile>]
+        [-n <procs>] [-q <queue>] [-v] [<regexp> ...]
+    -b <backend> run the jobs with local (default), workers, pbs, oar
+                 or fake
+    -c <cachedir> reuse and store results in this result cache
+    -e           only echo the gem5 commands, don't run them
+    -f           rerun jobs that already have stats
+    -j <jobfile> specify the jobfile (default is Sweep.py)
+    -n <procs>   number of jobs to run at a time on this host (default:
+                 host cores)
+    -q <queue>   submit batch jobs to the named queue
+    -v           be verbose
+
+    %(progname)s [-c <cachedir>] [-j <jobfile>] [-n <procs>] -w [-v]
+    -w           work on the queued jobs of a workers sweep of the jobfile
+
+    %(progname)s [-c <cachedir>] [-j <jobfile>] -r <job>
+    -r <job>     run the named job, as the batch backends do; the job can
+                 also be given by the SWEEP_JOB environment variable
+
+    %(progname)s [-j <jobfile>] -s [<regexp> ...]
+    -s           only collect the results of the jobs
+
+    %(progname)s [-j <jobfile>] -l [-v] [<regexp> ...]
+    -l           list job names, don't run
+    -v           be verbose (list job parameters)
+
+    %(progname)s -h
+    -h           display this help
+""" % { 'progname' : os.path.basename(sys.argv[0]) }
+
+def main():
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], 'b:c:efhj:ln:q:r:svw')
+    except getopt.GetoptError:
+        sys.exit(usage)
+
+    backend = 'local'
+    cache = None
+    onlyecho = False
+    force = False
+    jfile = 'Sweep.py'
+    listonly = False
+    processes = multiprocessing.cpu_count()
+    queue = None
+    runname = None
+    collectonly = False
+    verbose = False
+    workonly = False
+
+    # set by the pbs backend, whose jobs cannot take arguments
+    env = os.environ
+    if 'SWEEP_JOB' in env:
+        if 'SWEEP_DIR' in env:
+            os.chdir(env['SWEEP_DIR'])
+        runname = env['SWEEP_JOB']
+        jfile = env.get('SWEEP_JOBFILE', jfile)
+        cache = env.get('SWEEP_CACHE')
+
+    for opt, arg in opts:
+        if opt == '-b':
+            backend = arg
+        if opt == '-c':
+            cache = arg
+        if opt == '-e':
+            onlyecho = True
+        if opt == '-f':
+            force = True
+        if opt == '-h':
+            print usage
+            sys.exit(0)
+        if opt == '-j':
+            jfile = arg
+        if opt == '-l':
+            listonly = True
+        if opt == '-n':
+            processes = int(arg)
+        if opt == '-q':
+            queue = arg
+        if opt == '-r':
+            runname = arg
+        if opt == '-s':
+            collectonly = True
+        if opt == '-v':
+            verbose = True
+        if opt == '-w':
+            workonly = True
+
+    if backend not in backends.backends:
+        sys.exit('unknown backend %s, use one of %s' %
+                 (backend, ', '.join(sorted(backends.backends))))
+    if processes < 1:
+        sys.exit('-n needs at least one process')
+
+    conf = JobFile(jfile)
+
+    if runname:
+        sys.exit(runone(conf, runname, cache))
+
+    if workonly:
+        # the jobs were selected when the sweep queued them
+        workers = backends.Workers(processes, cache, verbose)
+        workers.work(list(conf.alljobs()))
+        sys.exit(0)
+
+    exprs = [ re.compile(arg) for arg in args ]
+
+    def selected(job):
+        return not exprs or any(expr.match(job.name) for expr in exprs)
+
+    # The selected checkpoint jobs run first, along with those the
+    # selected jobs need
+    jobs = [ job for job in conf.jobs() if selected(job) ]
+    needed = set(job._checkpoint.name for job in jobs if job._checkpoint)
+    checkpoints = [ job for job in conf.checkpoints()
+                    if job.name in needed or selected(job) ]
+    jobs = checkpoints + jobs
+
+    for job in jobs:
+        for attr in ('binary', 'script', 'rootdir'):
+            if attr not in job:
+                sys.exit('job %s has no %s' % (job.name, attr))
+
+    if listonly:
+        for job in jobs:
+            if verbose:
+                job.printinfo()
+            else:
+                print job.name
+        sys.exit(0)
+
+    if onlyecho:
+        for job in jobs:
+            print ' '.join(runner.command(job, cache))
+        sys.exit(0)
+
+    if not collectonly:
+        torun = [ job for job in jobs if force or not runner.isdone(job) ]
+        print '%d jobs, %d to run with the %s backend' % \
+            (len(jobs), len(torun), backend)
+        sys.stdout.flush()
+
+        if backend in ('local', 'workers'):
+            runjobs = backends.backends[backend](processes, cache, verbose)
+        elif backend == 'fake':
+            runjobs = backends.Fake(jfile, processes, cache, queue, verbose)
+        else:
+            runjobs = backends.backends[backend](jfile, cache, queue, verbose)
+        runjobs.run(torun)
+
+        if not runjobs.synchronous:
+            print 'Collect the results with -s when the jobs are done'
+            sys.exit(0)
+
+    entries = collect(jobs)
+    if any(entry['status'] != 'done' for entry in entries):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()